@@ -3,104 +3,375 @@ API routes for chat and generation.
 """
 from fastapi import APIRouter, HTTPException, Depends, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
+from typing import Any, Dict, List
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
+from app.database import get_read_db
 from app.services.ollama_service import ollama_service
 from app.services.session_service import SessionService
+from app.services.message_writer import message_writer
+from app.services.response_cache import response_cache
+from app.services.scheduler import scheduler, QueueFullError
+from app.services.stream_registry import stream_registry, relay_batches, until_cancelled, StreamCancelled
+from app.services.metrics import GenerationMetrics
+from app.services import ndjson
+from app.services.ndjson import chunk_content
+from app.services.shared_state import shared_state
+from app.services.context_manager import ContextManager
 from app.models.schemas import GenerateRequest, GenerateResponse, MessageSchema
-import json
+from app.config import settings
+import anyio
+import asyncio
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
 
+async def build_server_context(
+    session_service: SessionService,
+    request: GenerateRequest
+) -> List[MessageSchema]:
+    """
+    Build the conversation context from stored session messages.
+    
+    The stored history is packed, together with the new turn, into the
+    prompt budget (num_ctx - num_predict) using stored token counts. The
+    new turn itself is taken from the request since its write may still
+    be queued.
+    
+    Args:
+        session_service: Session service bound to the request DB session
+        request: Generation request with server_context enabled
+    
+    Returns:
+        Messages to send to Ollama, oldest first
+    """
+    new_turn = request.messages[-1]
+    max_messages = ContextManager.get_max_messages(request.context_size)
+    budget = ContextManager.get_token_budget(
+        request.parameters.num_ctx,
+        request.parameters.num_predict
+    )
+    
+    # Earlier turns of this session may still be in the write-behind queue
+    await message_writer.sync(request.session_id)
+    history = await session_service.get_context_window(
+        request.session_id,
+        budget - ContextManager.message_tokens(new_turn),
+        max_messages - 1
+    )
+    context_messages = ContextManager.get_budget_messages(history + [new_turn], budget)
+    return ContextManager.to_message_schemas(context_messages)
+
+
 @router.post("/generate")
 async def generate(
     request: GenerateRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Generate a response (streaming or non-streaming)."""
+    if request.server_context and not request.session_id:
+        raise HTTPException(status_code=400, detail="session_id is required when server_context is enabled")
+    if not request.messages:
+        raise HTTPException(status_code=400, detail="messages must contain at least one message")
+    # Messages of an unknown session could never be written
+    if request.session_id and await SessionService(db).get_session(request.session_id) is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    # Reject before storing anything when the model's queue is full
+    try:
+        scheduler.check(request.model)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    
     try:
         session_service = SessionService(db)
         
-        # Save user message if session_id provided
+        # Queue user message for saving if session_id provided
         if request.session_id:
             user_message = request.messages[-1]
-            logger.info(f"Saving user message for session {request.session_id}, length: {len(user_message.content)}")
-            await session_service.add_message(
+            
+            # Replace the client-sent turn with the stored history
+            if request.server_context:
+                request.messages = await build_server_context(session_service, request)
+                logger.info(f"Built server context with {len(request.messages)} messages")
+            
+            logger.info(f"Queueing user message for session {request.session_id}, length: {len(user_message.content)}")
+            await message_writer.add_message(
                 request.session_id,
                 user_message.role,
                 user_message.content,
                 request.parameters.dict()
             )
-            logger.info(f"Successfully saved user message")
+        
+        if not request.server_context and request.endpoint_type == "chat":
+            # Keep client-shipped history inside num_ctx so Ollama does not truncate it
+            request.messages = ContextManager.get_budget_messages(
+                request.messages,
+                ContextManager.get_token_budget(request.parameters.num_ctx, request.parameters.num_predict)
+            )
+        
+        # Return the pooled connection before a possibly long generation
+        await db.close()
         
         # Choose endpoint based on type and streaming
         if request.parameters.stream:
             # Streaming response
+            stream_id = str(uuid.uuid4())
+            
             async def generate_stream():
-                full_content = ""
+                parts = []
+                final_chunk = None
+                cached = False
+                completed = False
+                outcome = "cancelled"
+                ticket = None
+                gen_metrics = GenerationMetrics(await ollama_service.model_label(request.model))
+                # Register the stream so every worker can list and cancel it
+                cancelled = await stream_registry.register(stream_id, {
+                    "session_id": request.session_id,
+                    "model": request.model
+                })
                 try:
-                    if request.endpoint_type == "chat":
-                        async for chunk in ollama_service.stream_chat(request):
-                            # Accumulate content for saving
-                            if "message" in chunk and "content" in chunk["message"]:
-                                full_content += chunk["message"]["content"]
-                            yield json.dumps(chunk) + "\n"
-                    else:
-                        async for chunk in ollama_service.stream_generate(request):
-                            if "response" in chunk:
-                                full_content += chunk["response"]
-                            yield json.dumps(chunk) + "\n"
+                    # Report the queue position until a slot is free
+                    ticket = scheduler.enqueue(request.model, request.session_id, request.priority)
+                    async for position in ticket.positions():
+                        yield ndjson.dumps_line({"status": "queued", "queue_position": position})
+                    gen_metrics.admitted()
                     
-                    # Save assistant response if session_id provided - use new DB session
-                    if request.session_id and full_content:
-                        try:
-                            from app.database import AsyncSessionLocal
-                            async with AsyncSessionLocal() as new_db:
-                                new_session_service = SessionService(new_db)
-                                logger.info(f"Saving assistant message for session {request.session_id}, length: {len(full_content)}")
-                                await new_session_service.add_message(
-                                    request.session_id,
-                                    "assistant",
-                                    full_content
-                                )
-                                logger.info(f"Successfully saved assistant message")
-                        except Exception as save_error:
-                            logger.error(f"Failed to save assistant message: {str(save_error)}", exc_info=True)
+                    # Relay Ollama's bytes unchanged, several lines per write when
+                    # tokens arrive quickly; stops on cancel or client disconnect
+                    frames = relay_batches(
+                        ollama_service.stream_lines(request, ticket.backend),
+                        cancelled,
+                        interval=settings.STREAM_FRAME_INTERVAL,
+                        max_bytes=settings.STREAM_FRAME_MAX_BYTES
+                    )
+                    async for frame in frames:
+                        for line in frame:
+                            # Accumulate content for saving
+                            # without decoding the intermediate lines
+                            content, chunk = ndjson.scan_chunk(line)
+                            cached = cached or b'"cached":true' in line
+                            if content:
+                                parts.append(content)
+                                gen_metrics.token()
+                            if chunk is not None and chunk.get("done"):
+                                final_chunk = chunk
+                        yield b"\n".join(frame) + b"\n"
+                    completed = True
+                    outcome = "completed"
+                except StreamCancelled:
+                    logger.info(f"Stream {stream_id} cancelled")
+                    yield ndjson.dumps_line({"done": True, "truncated": True})
+                except QueueFullError as e:
+                    yield ndjson.dumps_line({"error": str(e)})
                 except Exception as e:
-                    # Log the error but don't fail the stream
+                    outcome = "error"
+                    # Log the error and end the stream with it instead of failing it
                     logger.error(f"Error in generate_stream: {str(e)}", exc_info=True)
+                    yield ndjson.dumps_line({"error": str(e)})
+                finally:
+                    if ticket is not None:
+                        if cached:
+                            gen_metrics.cache_hit()
+                        elif ticket.granted:
+                            gen_metrics.finish(final_chunk, outcome)
+                        scheduler.release(ticket)
+                    # A client disconnect cancels this generator, awaits in
+                    # finally included; shield the cleanup from it
+                    with anyio.CancelScope(shield=True):
+                        # Queue assistant response for saving if session_id provided;
+                        # partial output of a cancelled or failed stream is kept too
+                        full_content = "".join(parts)
+                        if request.session_id and full_content:
+                            logger.info(f"Queueing assistant message for session {request.session_id}, length: {len(full_content)}")
+                            await message_writer.add_message(
+                                request.session_id,
+                                "assistant",
+                                full_content,
+                                token_count=final_chunk.get("eval_count") if completed and final_chunk else None,
+                                truncated=not completed,
+                                model=request.model,
+                                # Replayed timings would skew the analytics
+                                stats=None if cached else {
+                                    **(final_chunk or {}),
+                                    "time_to_first_token": gen_metrics.time_to_first_token
+                                }
+                            )
+                        await stream_registry.unregister(stream_id)
             
-            return StreamingResponse(generate_stream(), media_type="application/x-ndjson")
+            return StreamingResponse(
+                generate_stream(),
+                media_type="application/x-ndjson",
+                headers={"X-Stream-Id": stream_id}
+            )
         else:
             # Non-streaming response
-            if request.endpoint_type == "chat":
-                response = await ollama_service.chat(request)
-            else:
-                response = await ollama_service.generate(request)
+            gen_metrics = GenerationMetrics(await ollama_service.model_label(request.model))
+            ticket = scheduler.enqueue(request.model, request.session_id, request.priority)
+            try:
+                await ticket.wait()
+                gen_metrics.admitted()
+                try:
+                    if request.endpoint_type == "chat":
+                        response = await ollama_service.chat(request, ticket.backend)
+                    else:
+                        response = await ollama_service.generate(request, ticket.backend)
+                except Exception:
+                    gen_metrics.finish(outcome="error")
+                    raise
+                if response.get("cached"):
+                    gen_metrics.cache_hit()
+                else:
+                    gen_metrics.finish(response)
+            finally:
+                scheduler.release(ticket)
             
             # Save assistant response if session_id provided
             if request.session_id:
                 content = response.get("message", {}).get("content") or response.get("response", "")
                 if content:
-                    await session_service.add_message(
+                    await message_writer.add_message(
                         request.session_id,
                         "assistant",
-                        content
+                        content,
+                        token_count=response.get("eval_count"),
+                        model=request.model,
+                        stats=None if response.get("cached") else response
                     )
             
             return response
     
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
 
 
+@router.get("/streams")
+async def list_streams() -> Dict[str, Any]:
+    """Get generations currently streaming on any worker, keyed by stream id."""
+    return await shared_state.hgetall("streams")
+
+
+@router.post("/{stream_id}/cancel")
+async def cancel_stream(stream_id: str):
+    """Stop a streaming generation running on any worker; the partial reply is saved."""
+    if not await stream_registry.cancel(stream_id):
+        raise HTTPException(status_code=404, detail="Stream not found")
+    return {"success": True, "message": "Stream cancelled"}
+
+
+@router.get("/queue")
+async def get_queue_stats() -> Dict[str, Any]:
+    """Get running and queued generations per model in this worker."""
+    return scheduler.stats()
+
+
+@router.get("/cache")
+async def get_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss counters of the response cache in this worker."""
+    return response_cache.stats()
+
+
+async def _websocket_generate(websocket: WebSocket, data: dict, cancelled: asyncio.Event) -> None:
+    """Run one generation for the WebSocket endpoint."""
+    request = None
+    ticket = None
+    gen_metrics = None
+    parts = []
+    final_chunk = None
+    cached = False
+    completed = False
+    outcome = "cancelled"
+    try:
+        request = GenerateRequest(**data)
+        
+        gen_metrics = GenerationMetrics(await ollama_service.model_label(request.model))
+        ticket = scheduler.enqueue(request.model, request.session_id, request.priority)
+        if request.session_id and request.messages:
+            user_message = request.messages[-1]
+            await message_writer.add_message(
+                request.session_id,
+                user_message.role,
+                user_message.content,
+                request.parameters.dict()
+            )
+        async for position in ticket.positions():
+            await websocket.send_json({"type": "queued", "position": position})
+        gen_metrics.admitted()
+        
+        # Stream response
+        if request.endpoint_type == "chat":
+            chunks = ollama_service.stream_chat(request, ticket.backend)
+        else:
+            chunks = ollama_service.stream_generate(request, ticket.backend)
+        async for chunk in until_cancelled(chunks, cancelled):
+            cached = cached or chunk.get("cached", False)
+            content = chunk_content(chunk)
+            if content:
+                parts.append(content)
+                gen_metrics.token()
+            if chunk.get("done"):
+                final_chunk = chunk
+            await websocket.send_json({
+                "type": "chunk",
+                "data": chunk
+            })
+        
+        # Send completion
+        completed = True
+        outcome = "completed"
+        await websocket.send_json({"type": "done"})
+    
+    except StreamCancelled:
+        await websocket.send_json({"type": "cancelled"})
+    except Exception as e:
+        if not completed:
+            outcome = "error"
+        await websocket.send_json({
+            "type": "error",
+            "message": str(e)
+        })
+    finally:
+        if ticket is not None:
+            if cached:
+                gen_metrics.cache_hit()
+            elif ticket.granted:
+                gen_metrics.finish(final_chunk, outcome)
+            scheduler.release(ticket)
+        # Save the reply like the HTTP stream does, partial output of a
+        # cancelled, disconnected or failed generation included
+        full_content = "".join(parts)
+        if request is not None and request.session_id and full_content:
+            with anyio.CancelScope(shield=True):
+                await message_writer.add_message(
+                    request.session_id,
+                    "assistant",
+                    full_content,
+                    token_count=final_chunk.get("eval_count") if completed and final_chunk else None,
+                    truncated=not completed,
+                    model=request.model,
+                    stats=None if cached else {
+                        **(final_chunk or {}),
+                        "time_to_first_token": gen_metrics.time_to_first_token
+                    }
+                )
+
+
 @router.websocket("/stream")
 async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for streaming chat."""
+    """
+    WebSocket endpoint for streaming chat.
+    
+    Generations run in the background so the connection keeps listening:
+    a {"action": "cancel"} message stops the running generation, and a
+    disconnect stops it as well.
+    """
     await websocket.accept()
+    task = None
+    cancelled = None
     
     try:
         while True:
@@ -109,31 +380,25 @@ async def websocket_endpoint(websocket: WebSocket):
             
             action = data.get("action")
             if action == "generate":
-                try:
-                    request = GenerateRequest(**data)
-                    
-                    # Stream response
-                    if request.endpoint_type == "chat":
-                        async for chunk in ollama_service.stream_chat(request):
-                            await websocket.send_json({
-                                "type": "chunk",
-                                "data": chunk
-                            })
-                    else:
-                        async for chunk in ollama_service.stream_generate(request):
-                            await websocket.send_json({
-                                "type": "chunk",
-                                "data": chunk
-                            })
-                    
-                    # Send completion
-                    await websocket.send_json({"type": "done"})
-                    
-                except Exception as e:
+                if task is not None and not task.done():
                     await websocket.send_json({
                         "type": "error",
-                        "message": str(e)
+                        "message": "A generation is already running"
                     })
+                    continue
+                cancelled = asyncio.Event()
+                task = asyncio.create_task(_websocket_generate(websocket, data, cancelled))
+            elif action == "cancel":
+                if cancelled is not None:
+                    cancelled.set()
             
     except WebSocketDisconnect:
         pass
+    finally:
+        # Nobody is listening anymore; stop reading from Ollama
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
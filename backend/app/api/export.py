@@ -1,23 +1,23 @@
 """
 API routes for exporting conversations.
 """
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import Response
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
+from app.config import settings
+from app.database import get_read_db, AsyncReadSessionLocal
 from app.services.session_service import SessionService
-from app.services.export_service import ExportService
+from app.services.export_jobs import export_jobs
+from app.services.bulk_export import EXPORTERS, export_query, export_stream
+from app.services.message_writer import message_writer
 from datetime import datetime
+from typing import List, Literal, Optional
 
 router = APIRouter(prefix="/api/export", tags=["export"])
 
 
-@router.post("/pdf")
-async def export_pdf(
-    request: dict,
-    db: AsyncSession = Depends(get_db)
-):
-    """Export a conversation session to PDF."""
+async def _submit(request: dict, db: AsyncSession) -> dict:
+    """Validate an export request and start (or find) its job."""
     session_id = request.get("session_id")
     if not session_id:
         raise HTTPException(status_code=400, detail="session_id is required")
@@ -29,20 +29,128 @@ async def export_pdf(
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    # Get all messages
-    messages = await session_service.get_messages(session_id)
-    
-    # Generate PDF
-    pdf_bytes = ExportService.export_to_pdf(session, messages)
-    
+    job_id = await export_jobs.job_id_for(db, session)
+    # Rendering reads through its own connection
+    await db.close()
+    return await export_jobs.submit(session, job_id)
+
+
+def _pdf_response(job_id: str) -> FileResponse:
     # Generate filename
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"conversation_{timestamp}.pdf"
+    return FileResponse(export_jobs.path_for(job_id), media_type="application/pdf", filename=filename)
+
+
+@router.post("/pdf")
+async def export_pdf(
+    request: dict,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Export a conversation session to PDF.
     
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
-        headers={
-            "Content-Disposition": f'attachment; filename="{filename}"'
-        }
+    Waits for the rendering, which runs in a worker process; repeated
+    exports of an unchanged session are served from the cache.
+    """
+    job = await _submit(request, db)
+    job = await export_jobs.wait(job["job_id"])
+    if job is None or job["status"] != "completed":
+        detail = job.get("error", "unknown error") if job else "job lost"
+        raise HTTPException(status_code=500, detail=f"Export failed: {detail}")
+    return _pdf_response(job["job_id"])
+
+
+@router.post("/jobs", status_code=202)
+async def submit_export_job(
+    request: dict,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Start a PDF export in the background; poll the job, then download it."""
+    job = await _submit(request, db)
+    return {**job, "download_url": f"/api/export/jobs/{job['job_id']}/download"}
+
+
+@router.get("/jobs/{job_id}")
+async def get_export_job(job_id: str):
+    """Get the status of an export job: running, completed or failed."""
+    job = await export_jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}/download")
+async def download_export(job_id: str):
+    """Download the PDF of a completed export job."""
+    job = await export_jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Export job is {job['status']}")
+    return _pdf_response(job_id)
+
+
+def _bulk_response(query, format: str, compression: Optional[str], name: str) -> StreamingResponse:
+    """Stream an export of the query's sessions as a file download."""
+    exporter = EXPORTERS[format]()
+
+    async def generate():
+        # Own connection: the cursor stays open for the whole response
+        async with AsyncReadSessionLocal() as db:
+            async for chunk in export_stream(db, query, exporter, compression, settings.EXPORT_CHUNK_SIZE):
+                yield chunk
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{name}_{timestamp}.{exporter.extension}"
+    media_type = f"{exporter.media_type}; charset=utf-8"
+    if compression == "gzip":
+        filename += ".gz"
+        media_type = "application/gzip"
+    elif compression == "zip":
+        filename = f"{name}_{timestamp}.zip"
+        media_type = "application/zip"
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
+
+
+@router.get("/bulk")
+async def export_bulk(
+    format: Literal["jsonl", "markdown", "html"] = "jsonl",
+    compression: Optional[Literal["gzip", "zip"]] = None,
+    model: Optional[str] = None,
+    endpoint_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    session_id: Optional[List[str]] = Query(None)
+):
+    """
+    Export many sessions as JSONL, Markdown or HTML.
+    
+    Sessions are filtered by model, endpoint type, creation time
+    (since inclusive, until exclusive) and/or ids, and streamed oldest
+    first straight from the database, optionally gzipped or zipped
+    (one file per session for Markdown and HTML).
+    """
+    for sid in session_id or []:
+        await message_writer.sync(sid)
+    query = export_query(model, endpoint_type, since, until, session_id)
+    return _bulk_response(query, format, compression, "conversations")
+
+
+@router.get("/sessions/{session_id}")
+async def export_session(
+    session_id: str,
+    format: Literal["jsonl", "markdown", "html"] = "markdown",
+    compression: Optional[Literal["gzip", "zip"]] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Export one session as JSONL, Markdown or HTML."""
+    if not await SessionService(db).get_session(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    await db.close()
+    await message_writer.sync(session_id)
+    return _bulk_response(export_query(session_ids=[session_id]), format, compression, "conversation")
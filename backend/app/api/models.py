@@ -1,49 +1,150 @@
 """
 API routes for model management.
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import StreamingResponse
-from typing import List
+from typing import List, Optional
 from app.services.ollama_service import ollama_service
-from app.models.schemas import Model, ModelInfo
+from app.services.download_manager import download_manager
+from app.models.schemas import Model, ModelInfo, LoadModelRequest
+from typing import Any, Dict
+import hashlib
 import json
 
 router = APIRouter(prefix="/api/models", tags=["models"])
 
 
+def _etag_response(request: Request, data: Any) -> Response:
+    """
+    Serialize data as JSON with an ETag, answering 304 if the client has it.
+    
+    Args:
+        request: Incoming request (for If-None-Match)
+        data: Response data
+    
+    Returns:
+        200 JSON response or empty 304 response
+    """
+    body = json.dumps(jsonable_encoder(data), separators=(",", ":")).encode()
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    # no-cache: clients may store the response but must revalidate it
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.get("", response_model=List[Model])
-async def list_models():
+async def list_models(request: Request):
     """Get list of all available models."""
     try:
         models = await ollama_service.list_models()
-        return models
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Failed to connect to Ollama: {str(e)}")
+    return _etag_response(request, models)
+
+
+@router.get("/downloads")
+async def list_downloads() -> Dict[str, Any]:
+    """Get download jobs of all workers, running and recently finished, keyed by model."""
+    return await download_manager.list_jobs()
+
+
+@router.get("/downloads/{model_name}")
+async def get_download(model_name: str) -> Dict[str, Any]:
+    """Get the state of the latest download job of a model."""
+    job = await download_manager.get(model_name)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Download not found")
+    return job
+
+
+@router.get("/downloads/{model_name}/events")
+async def follow_download(model_name: str):
+    """Follow a download job as Server-Sent Events until it finishes."""
+    if await download_manager.get(model_name) is None:
+        raise HTTPException(status_code=404, detail="Download not found")
+    
+    async def events():
+        async for job in download_manager.follow(model_name):
+            yield f"data: {json.dumps(job)}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
+@router.delete("/downloads/{model_name}")
+async def cancel_download(model_name: str):
+    """Stop a running download; pulling the model again resumes it."""
+    if not await download_manager.cancel(model_name):
+        raise HTTPException(status_code=404, detail="No active download of this model")
+    return {"success": True, "message": "Download cancelled"}
+
+
+@router.get("/running")
+async def list_running_models() -> List[Dict[str, Any]]:
+    """Get the models loaded in memory on each Ollama instance."""
+    return await ollama_service.list_running()
+
+
+@router.post("/{model_name}/load")
+async def load_model(model_name: str, request: Optional[LoadModelRequest] = None):
+    """Load a model into memory so the next generation skips the load time."""
+    keep_alive = request.keep_alive if request else None
+    try:
+        return await ollama_service.load_model(model_name, keep_alive)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to load model: {str(e)}")
+
+
+@router.post("/{model_name}/unload")
+async def unload_model(model_name: str):
+    """Release the memory a model holds on every Ollama instance."""
+    try:
+        backends = await ollama_service.unload_model(model_name)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to unload model: {str(e)}")
+    return {"success": True, "model": model_name, "backends": backends}
 
 
 @router.get("/{model_name}/info", response_model=ModelInfo)
-async def get_model_info(model_name: str):
+async def get_model_info(model_name: str, request: Request):
     """Get detailed information about a specific model."""
     try:
         info = await ollama_service.get_model_info(model_name)
-        return info
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Model not found: {str(e)}")
+    return _etag_response(request, info)
 
 
 @router.post("/download")
 async def download_model(request: dict):
-    """Download a model with streaming progress updates."""
+    """
+    Start downloading a model, or join the download already running.
+    
+    The pull runs as a background job that outlives this request. By
+    default its progress is streamed as NDJSON until it finishes; with
+    "follow": false the job state is returned right away.
+    """
     model_name = request.get("model_name")
     if not model_name:
         raise HTTPException(status_code=400, detail="model_name is required")
     
+    job = await download_manager.start(model_name)
+    if not request.get("follow", True):
+        return job
+    
     async def generate():
-        try:
-            async for progress in ollama_service.download_model(model_name):
-                yield json.dumps(progress) + "\n"
-        except Exception as e:
-            yield json.dumps({"error": str(e)}) + "\n"
+        # Leaving early only stops following; the job keeps running
+        async for progress in download_manager.follow(model_name):
+            yield json.dumps(progress) + "\n"
     
     return StreamingResponse(generate(), media_type="application/x-ndjson")
 
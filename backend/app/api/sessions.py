@@ -1,19 +1,29 @@
 """
 API routes for session management.
 """
-from fastapi import APIRouter, HTTPException, Depends, Query
+import httpx
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
-from app.database import get_db
+from typing import List, Literal, Optional
+from datetime import datetime
+from app.database import get_db, get_read_db
 from app.services.session_service import SessionService
 from app.services.context_manager import ContextManager
+from app.services.message_writer import message_writer
+from app.services.session_import import session_importer
+from app.services.search_service import SearchService, SearchQueryError
+from app.services.embedding_service import semantic_search, SemanticSearchUnavailable
 from app.models.schemas import (
     CreateSessionRequest,
     SessionResponse,
     SessionDetailResponse,
     UpdateSessionRequest,
     MessageResponse,
-    ContextInfoResponse
+    ContextInfoResponse,
+    GenerationStatsResponse,
+    ImportSessionsResponse,
+    SearchResponse,
+    SemanticSearchResponse
 )
 from app.config import settings
 
@@ -21,27 +31,131 @@ router = APIRouter(prefix="/api/sessions", tags=["sessions"])
 
 
 @router.get("", response_model=List[SessionResponse])
-async def list_sessions(db: AsyncSession = Depends(get_db)):
-    """Get all conversation sessions."""
+async def list_sessions(
+    limit: Optional[int] = Query(default=None, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+    model_name: Optional[str] = Query(default=None),
+    endpoint_type: Optional[str] = Query(default=None),
+    updated_since: Optional[datetime] = Query(default=None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get conversation sessions, most recently updated first."""
     session_service = SessionService(db)
-    sessions = await session_service.list_sessions()
-    
-    # Add message count to each session
-    result = []
-    for session in sessions:
-        count = await session_service.get_message_count(session.id)
-        session_dict = {
-            "id": session.id,
-            "name": session.name,
-            "created_at": session.created_at,
-            "updated_at": session.updated_at,
-            "model_name": session.model_name,
-            "endpoint_type": session.endpoint_type,
-            "message_count": count
-        }
-        result.append(SessionResponse(**session_dict))
-    
-    return result
+    sessions = await session_service.list_sessions(
+        limit=limit,
+        offset=offset,
+        model_name=model_name,
+        endpoint_type=endpoint_type,
+        updated_since=updated_since
+    )
+    
+    return [
+        SessionResponse(
+            id=session.id,
+            name=session.name,
+            created_at=session.created_at,
+            updated_at=session.updated_at,
+            model_name=session.model_name,
+            endpoint_type=session.endpoint_type,
+            message_count=count
+        )
+        for session, count in sessions
+    ]
+
+
+@router.get("/analytics", response_model=List[GenerationStatsResponse])
+async def get_analytics(
+    group_by: Literal["model", "session", "day"] = Query(default="model"),
+    model: Optional[str] = Query(default=None),
+    since: Optional[datetime] = Query(default=None),
+    until: Optional[datetime] = Query(default=None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get generation performance across sessions.
+    
+    Aggregates tokens/sec, time to first token and token totals of stored
+    assistant responses per model, session or day, within an optional
+    time range. Messages still in the write-behind queue are not counted.
+    """
+    session_service = SessionService(db)
+    stats = await session_service.get_generation_stats(
+        group_by=group_by,
+        model=model,
+        since=since,
+        until=until
+    )
+    return [GenerationStatsResponse(**row) for row in stats]
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search_messages(
+    q: str = Query(..., min_length=1),
+    syntax: Literal["plain", "advanced"] = "plain",
+    model: Optional[str] = None,
+    role: Optional[str] = None,
+    session_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Full-text search over the messages of all sessions.
+    
+    Plain queries match messages containing all words (with stemming);
+    advanced queries use FTS5 syntax on SQLite or web search syntax on
+    PostgreSQL. Results are ranked by relevance.
+    """
+    try:
+        return await SearchService(db).search(
+            q,
+            syntax=syntax,
+            model=model,
+            role=role,
+            session_id=session_id,
+            since=since,
+            until=until,
+            limit=limit,
+            offset=offset
+        )
+    except SearchQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/semantic-search", response_model=SemanticSearchResponse)
+async def semantic_search_messages(
+    q: str = Query(..., min_length=1),
+    model: Optional[str] = None,
+    role: Optional[str] = None,
+    session_id: Optional[str] = None,
+    exclude_session_id: Optional[str] = None,
+    min_score: float = Query(0.0, ge=-1, le=1),
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Find messages of past conversations similar in meaning to a query.
+    
+    Requires EMBEDDING_MODEL; messages are embedded in the background, so
+    the newest ones may not be found yet.
+    """
+    try:
+        return await semantic_search(
+            db,
+            q,
+            model=model,
+            role=role,
+            session_id=session_id,
+            exclude_session_id=exclude_session_id,
+            min_score=min_score,
+            limit=limit
+        )
+    except SemanticSearchUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Failed to embed the query: {str(e)}")
 
 
 @router.post("", response_model=SessionResponse)
@@ -64,14 +178,39 @@ async def create_session(
     )
 
 
+@router.post("/import", response_model=ImportSessionsResponse)
+async def import_sessions(
+    request: Request,
+    model: Optional[str] = Query(None, description="Model for conversations that do not name one")
+):
+    """
+    Import conversations from a JSONL body, one conversation per line.
+    
+    Accepts this app's JSONL export, OpenAI chat records and Ollama chat
+    requests, optionally sent with Content-Encoding: gzip. Every import
+    creates new sessions; invalid lines are skipped and reported.
+    """
+    gzip = request.headers.get("content-encoding", "").lower() in ("gzip", "deflate")
+    return await session_importer.import_stream(request.stream(), default_model=model, gzip=gzip)
+
+
 @router.get("/{session_id}", response_model=SessionDetailResponse)
 async def get_session(
     session_id: str,
-    context_size: Optional[int] = Query(default=None),
-    db: AsyncSession = Depends(get_db)
+    context_size: Optional[int] = Query(default=None, ge=1),
+    before: Optional[str] = Query(default=None, description="Return messages older than this message id"),
+    after: Optional[str] = Query(default=None, description="Return messages newer than this message id"),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get a specific session with its messages."""
+    """
+    Get a specific session with a page of its messages.
+    
+    Without cursors the most recent messages are returned. Pass the id of
+    the oldest loaded message as `before` to lazy-load older history.
+    """
     session_service = SessionService(db)
+    # Before loading the session, so its totals include queued messages
+    await message_writer.sync(session_id)
     session = await session_service.get_session(session_id)
     
     if not session:
@@ -79,7 +218,12 @@ async def get_session(
     
     # Get messages with optional limit
     limit = context_size or settings.DEFAULT_CONTEXT_SIZE
-    messages = await session_service.get_messages(session_id, limit)
+    try:
+        messages, has_more = await session_service.get_message_page(
+            session_id, limit, before=before, after=after
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     message_responses = [
         MessageResponse(
@@ -87,7 +231,8 @@ async def get_session(
             role=msg.role,
             content=msg.content,
             timestamp=msg.timestamp,
-            parameters=msg.parameters
+            parameters=msg.parameters,
+            truncated=msg.truncated
         )
         for msg in messages
     ]
@@ -99,7 +244,8 @@ async def get_session(
         updated_at=session.updated_at,
         model_name=session.model_name,
         endpoint_type=session.endpoint_type,
-        messages=message_responses
+        messages=message_responses,
+        has_more=has_more
     )
 
 
@@ -141,6 +287,7 @@ async def delete_session(
 ):
     """Delete a session and all its messages."""
     session_service = SessionService(db)
+    await message_writer.sync(session_id)
     success = await session_service.delete_session(session_id)
     
     if not success:
@@ -152,31 +299,65 @@ async def delete_session(
 @router.get("/{session_id}/context-info", response_model=ContextInfoResponse)
 async def get_context_info(
     session_id: str,
-    db: AsyncSession = Depends(get_db)
+    num_ctx: int = Query(default=settings.DEFAULT_NUM_CTX, ge=128, le=8192),
+    num_predict: int = Query(default=settings.DEFAULT_NUM_PREDICT, ge=1, le=4096),
+    context_size: Optional[int] = Query(default=None, ge=1),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get context window information for a session."""
+    """
+    Get context window information for a session.
+    
+    The window is selected like a server-built chat context with the same
+    num_ctx, num_predict and context_size, so it shows what reaches the model.
+    """
     session_service = SessionService(db)
+    # Before loading the session, so session_tokens includes queued messages
+    await message_writer.sync(session_id)
     session = await session_service.get_session(session_id)
     
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    # Get all messages for context calculation
-    messages = await session_service.get_messages(session_id)
-    
-    # Get context messages based on default size
-    context_messages = ContextManager.get_context_messages(
-        messages,
-        settings.DEFAULT_CONTEXT_SIZE
+    budget = ContextManager.get_token_budget(num_ctx, num_predict)
+    history = await session_service.get_context_window(
+        session_id,
+        budget,
+        ContextManager.get_max_messages(context_size)
     )
-    
-    # Calculate context info
-    context_info = ContextManager.get_context_info(context_messages)
+    context_messages = ContextManager.get_budget_messages(history, budget)
+    tokens = ContextManager.calculate_message_tokens(context_messages)
+    context_info = ContextManager.build_context_info(len(context_messages), tokens, num_ctx)
     
     return ContextInfoResponse(
-        total_messages=context_info["total_messages"],
+        total_messages=await session_service.get_message_count(session_id),
         context_messages=len(context_messages),
         estimated_tokens=context_info["estimated_tokens"],
         context_limit=context_info["context_limit"],
-        usage_percentage=context_info["usage_percentage"]
+        usage_percentage=context_info["usage_percentage"],
+        session_tokens=session.total_tokens
+    )
+
+
+@router.get("/{session_id}/analytics", response_model=List[GenerationStatsResponse])
+async def get_session_analytics(
+    session_id: str,
+    group_by: Literal["model", "day"] = Query(default="model"),
+    since: Optional[datetime] = Query(default=None),
+    until: Optional[datetime] = Query(default=None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get generation performance of one session per model or day."""
+    session_service = SessionService(db)
+    session = await session_service.get_session(session_id)
+    
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    await message_writer.sync(session_id)
+    stats = await session_service.get_generation_stats(
+        group_by=group_by,
+        session_id=session_id,
+        since=since,
+        until=until
     )
+    return [GenerationStatsResponse(**row) for row in stats]
@@ -1,37 +1,173 @@
 """
 Database connection and session management.
 """
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.pool import StaticPool
+from alembic import command
+from alembic.config import Config
+from pathlib import Path
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
 from app.config import settings
-from app.models.database import Base
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Create async engine with proper SQLite configuration for concurrent writes
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    connect_args={
-        "check_same_thread": False,
-        "timeout": 30  # 30 second timeout for locks
-    },
-    poolclass=StaticPool,
-    echo=settings.DEBUG,
-)
 
-# Create session factory
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _is_memory_database(url: str) -> bool:
+    database = make_url(url).database
+    return _is_sqlite(url) and (not database or database == ":memory:")
+
+
+def _sqlite_pragmas(read_only: bool):
+    """Build a connect listener applying SQLite pragmas to each new connection."""
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL lets readers run alongside the single writer
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return on_connect
+
+
+def create_db_engine(url: str, read_only: bool = False) -> AsyncEngine:
+    """
+    Create an async engine for the application database.
+    
+    SQLite file databases get WAL journaling and tuned pragmas on every
+    connection, and a pool sized for their role: a small writer pool
+    (SQLite allows one writer at a time) or a larger read-only pool.
+    In-memory databases keep a single shared connection. Server databases
+    (PostgreSQL) get a regular pool sized from DB_POOL_* settings.
+    
+    Args:
+        url: SQLAlchemy database URL
+        read_only: Build the reader engine
+    
+    Returns:
+        AsyncEngine
+    """
+    if not _is_sqlite(url):
+        return create_async_engine(
+            url,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+            echo=settings.DEBUG,
+        )
+    
+    if _is_memory_database(url):
+        return create_async_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+            echo=settings.DEBUG,
+        )
+    
+    engine = create_async_engine(
+        url,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000
+        },
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.DB_READ_POOL_SIZE if read_only else settings.DB_WRITE_POOL_SIZE,
+        max_overflow=settings.DB_READ_MAX_OVERFLOW if read_only else settings.DB_WRITE_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        echo=settings.DEBUG,
+    )
+    event.listen(engine.sync_engine, "connect", _sqlite_pragmas(read_only))
+    return engine
+
+
+def _create_read_engine(write_engine: AsyncEngine) -> AsyncEngine:
+    """Reader engine: a replica if configured, a read-only SQLite pool, or the writer."""
+    if settings.DATABASE_READ_URL:
+        return create_db_engine(settings.DATABASE_READ_URL, read_only=True)
+    if _is_sqlite(settings.DATABASE_URL) and not _is_memory_database(settings.DATABASE_URL):
+        return create_db_engine(settings.DATABASE_URL, read_only=True)
+    return write_engine
+
+
+# Writer engine; also used for reads that must see the session's own writes
+engine = create_db_engine(settings.DATABASE_URL)
+
+# Reader engine so listings and history reads run alongside writes
+read_engine = _create_read_engine(engine)
+
+# Create session factories
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
     expire_on_commit=False,
 )
 
+AsyncReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+# Revision matching databases created with create_all before migrations existed
+LEGACY_REVISION = "0001"
+
+
+def alembic_config(connection=None) -> Config:
+    """
+    Build the Alembic config for the backend migrations.
+    
+    Args:
+        connection: Optional sync connection the migrations should run on
+    
+    Returns:
+        Alembic Config
+    """
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "migrations"))
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+def _run_migrations(sync_conn):
+    """Upgrade the schema to the latest revision."""
+    config = alembic_config(sync_conn)
+    tables = inspect(sync_conn).get_table_names()
+    if "sessions" in tables and "alembic_version" not in tables:
+        logger.info(f"Pre-migration database found, stamping revision {LEGACY_REVISION}")
+        command.stamp(config, LEGACY_REVISION)
+    command.upgrade(config, "head")
+
 
 async def init_db():
-    """Initialize database tables."""
+    """Bring the database schema up to date with Alembic migrations."""
+    if not settings.DB_AUTO_MIGRATE:
+        logger.info("DB_AUTO_MIGRATE disabled, skipping migrations")
+        return
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_run_migrations)
+
+
+async def close_db():
+    """Dispose pooled connections."""
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
 
 
 async def get_db():
@@ -41,3 +177,12 @@ async def get_db():
             yield session
         finally:
             await session.close()
+
+
+async def get_read_db():
+    """Dependency to get a read-only database session."""
+    async with AsyncReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
@@ -1,12 +1,19 @@
 """
 Main FastAPI application.
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.config import settings
-from app.database import init_db
+from app.database import init_db, close_db
 from app.api import models, chat, sessions, parameters, export
+from app.services.ollama_service import ollama_service
+from app.services.message_writer import message_writer
+from app.services.download_manager import download_manager
+from app.services.export_jobs import export_jobs
+from app.services.embedding_service import embedding_indexer
+from app.services.shared_state import shared_state, WORKER_ID
+from app.services.metrics import registry, CONTENT_TYPE
 import logging
 
 # Configure logging
@@ -23,9 +30,19 @@ async def lifespan(app: FastAPI):
     # Startup
     await init_db()
     logger.info("Database initialized")
+    await ollama_service.start()
+    await message_writer.start()
+    await embedding_indexer.start()
     yield
     # Shutdown
     logger.info("Application shutting down")
+    await download_manager.close()
+    await export_jobs.close()
+    await embedding_indexer.close()
+    await message_writer.stop()
+    await ollama_service.close()
+    await close_db()
+    await shared_state.close()
 
 
 # Create FastAPI app with increased limits for large messages
@@ -42,6 +59,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Stream-Id"],  # Read by the frontend to cancel a stream
     max_age=3600,
 )
 
@@ -66,10 +84,22 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "worker": WORKER_ID,
+        "message_queue_depth": message_writer.queue_depth,
+        "ollama_backends": ollama_service.pool.status()
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Generation metrics of this worker in the Prometheus text format."""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
 
 
 if __name__ == "__main__":
+    # Development server; use `python -m app.server` in production
     import uvicorn
     uvicorn.run(
         "app.main:app",
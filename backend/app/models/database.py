@@ -1,13 +1,17 @@
 """
 Database models for the Ollama Web Interface.
 """
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Integer, JSON
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Integer, BigInteger, JSON, Index, Boolean
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 import uuid
 
 Base = declarative_base()
 
+# JSON everywhere, JSONB on PostgreSQL
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
 
 class Session(Base):
     """Conversation session model."""
@@ -19,9 +23,15 @@ class Session(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     model_name = Column(String, nullable=False)
     endpoint_type = Column(String, nullable=False)  # 'chat' or 'generate'
+    total_tokens = Column(Integer, default=0, nullable=False)  # Running sum of Message.token_count
 
     messages = relationship("Message", back_populates="session", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Serves the export order, walked by keyset on (created_at, id)
+        Index("ix_sessions_created_at_id", "created_at", "id", unique=True),
+    )
+
     def __repr__(self):
         return f"<Session(id={self.id}, name={self.name}, model={self.model_name})>"
 
@@ -35,14 +45,57 @@ class Message(Base):
     role = Column(String, nullable=False)  # 'user', 'assistant', 'system'
     content = Column(Text, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
-    parameters = Column(JSON, nullable=True)  # Store request parameters as JSON
+    parameters = Column(JSONType, nullable=True)  # Store request parameters as JSON
+    token_count = Column(Integer, nullable=True)  # Ollama eval_count or estimate, set on insert
+    truncated = Column(Boolean, default=False, nullable=False)  # Generation was cancelled part-way
+
+    # Performance of the generation behind an assistant message, from Ollama's
+    # final chunk; durations in nanoseconds
+    model = Column(String, nullable=True)
+    eval_count = Column(Integer, nullable=True)
+    eval_duration = Column(BigInteger, nullable=True)
+    prompt_eval_count = Column(Integer, nullable=True)
+    prompt_eval_duration = Column(BigInteger, nullable=True)
+    load_duration = Column(BigInteger, nullable=True)
+    total_duration = Column(BigInteger, nullable=True)
+    time_to_first_token = Column(BigInteger, nullable=True)  # Measured by this backend
+
+    # Row of the message's vector in the embedding store; NULL until embedded,
+    # -1 for messages without text to embed
+    embedding_row = Column(Integer, nullable=True)
 
     session = relationship("Session", back_populates="messages")
 
+    __table_args__ = (
+        # Serves "newest N messages of a session" and keyset pagination on
+        # (timestamp, id) without a sort
+        Index("ix_messages_session_timestamp", "session_id", "timestamp", "id"),
+        # Serves generation analytics per model and time range
+        Index("ix_messages_model_timestamp", "model", "timestamp"),
+        # Finds messages waiting for an embedding without scanning embedded ones
+        Index(
+            "ix_messages_embedding_pending",
+            "timestamp",
+            sqlite_where=embedding_row.is_(None),
+            postgresql_where=embedding_row.is_(None),
+        ),
+    )
+
     def __repr__(self):
         return f"<Message(id={self.id}, role={self.role}, session_id={self.session_id})>"
 
 
+# Fields of Ollama's final chunk stored on assistant messages
+GENERATION_STAT_FIELDS = (
+    "eval_count",
+    "eval_duration",
+    "prompt_eval_count",
+    "prompt_eval_duration",
+    "load_duration",
+    "total_duration",
+)
+
+
 class ParameterPreset(Base):
     """Parameter preset model."""
     __tablename__ = "parameter_presets"
@@ -50,7 +103,7 @@ class ParameterPreset(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, unique=True, nullable=False)
     description = Column(String, nullable=True)
-    parameters = Column(JSON, nullable=False)
+    parameters = Column(JSONType, nullable=False)
 
     def __repr__(self):
         return f"<ParameterPreset(id={self.id}, name={self.name})>"
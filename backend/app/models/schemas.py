@@ -2,7 +2,7 @@
 Pydantic schemas for request/response validation.
 """
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal, Union
 from datetime import datetime
 from uuid import UUID
 
@@ -22,6 +22,9 @@ class Parameters(BaseModel):
     mirostat_tau: float = Field(5.0, ge=0.0)
     mirostat_eta: float = Field(0.1, ge=0.0)
     num_thread: int = Field(4, ge=1, le=32)
+    # How long Ollama keeps the model loaded afterwards ("10m", -1 = forever);
+    # None = OLLAMA_KEEP_ALIVE
+    keep_alive: Optional[Union[int, str]] = None
 
 
 class MessageSchema(BaseModel):
@@ -37,6 +40,12 @@ class GenerateRequest(BaseModel):
     messages: List[MessageSchema]
     parameters: Parameters
     session_id: Optional[str] = None
+    # When true, `messages` holds only the new turn and the backend builds
+    # the conversation history from the stored session messages.
+    server_context: bool = False
+    context_size: Optional[int] = Field(None, ge=1)
+    # Scheduling class: interactive requests are admitted before batch ones
+    priority: Literal["interactive", "batch"] = "interactive"
 
 
 class GenerateResponse(BaseModel):
@@ -94,6 +103,7 @@ class MessageResponse(BaseModel):
     content: str
     timestamp: datetime
     parameters: Optional[Dict[str, Any]] = None
+    truncated: bool = False
 
     class Config:
         from_attributes = True
@@ -108,6 +118,7 @@ class SessionDetailResponse(BaseModel):
     model_name: str
     endpoint_type: str
     messages: List[MessageResponse]
+    has_more: bool = False  # More messages exist past the returned page
 
     class Config:
         from_attributes = True
@@ -136,6 +147,78 @@ class ContextInfoResponse(BaseModel):
     estimated_tokens: int
     context_limit: int
     usage_percentage: float
+    session_tokens: Optional[int] = None  # Running token total of the whole session
+
+
+class GenerationStatsResponse(BaseModel):
+    """Aggregated performance of assistant responses in one group."""
+    key: str  # Model name, session id or day, depending on group_by
+    responses: int
+    prompt_tokens: int
+    generated_tokens: int
+    total_tokens: int
+    avg_tokens_per_second: Optional[float] = None
+    avg_time_to_first_token_ms: Optional[float] = None
+    p95_time_to_first_token_ms: Optional[float] = None
+    avg_load_duration_ms: Optional[float] = None
+    avg_total_duration_ms: Optional[float] = None
+
+
+class SearchResult(BaseModel):
+    """A message matching a search."""
+    message_id: str
+    session_id: str
+    session_name: str
+    model: str
+    role: str
+    timestamp: datetime
+    snippet: str  # HTML-escaped, matched terms wrapped in <mark>
+    score: float  # Higher is a better match
+
+
+class SearchResponse(BaseModel):
+    """A page of search results, best matches first."""
+    results: List[SearchResult]
+    has_more: bool
+
+
+class SemanticSearchResult(BaseModel):
+    """A message close in meaning to a semantic search query."""
+    message_id: str
+    session_id: str
+    session_name: str
+    model: str
+    role: str
+    timestamp: datetime
+    content: str
+    score: float  # Cosine similarity
+
+
+class SemanticSearchResponse(BaseModel):
+    """Semantic search results, most similar first."""
+    results: List[SemanticSearchResult]
+    indexed: int  # Messages with a vector so far
+
+
+class ImportLineError(BaseModel):
+    """A skipped line of an import."""
+    line: int
+    error: str
+
+
+class ImportSessionsResponse(BaseModel):
+    """Outcome of a session import."""
+    sessions: int
+    messages: int
+    skipped: int  # Invalid lines
+    errors: List[ImportLineError]  # First 50 skipped lines
+    seconds: float
+    rows_per_second: int  # Sessions and messages inserted per second
+
+
+class LoadModelRequest(BaseModel):
+    """Request to load a model into memory."""
+    keep_alive: Optional[Union[int, str]] = None  # None = OLLAMA_PRELOAD_KEEP_ALIVE
 
 
 class ErrorResponse(BaseModel):
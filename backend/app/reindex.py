@@ -0,0 +1,33 @@
+"""
+Rebuild the full-text search index of all messages.
+
+Usage:
+    python -m app.reindex
+
+Migrations index existing messages when search is introduced; run this
+after restoring a database from elsewhere.
+"""
+import asyncio
+import logging
+import time
+from app.database import init_db, close_db, AsyncSessionLocal
+from app.services.search_service import rebuild_index
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def reindex() -> None:
+    await init_db()
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        await rebuild_index(db)
+    logger.info(f"Search index rebuilt in {time.perf_counter() - started:.2f}s")
+    await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(reindex())
@@ -0,0 +1,69 @@
+"""
+Production entry point: runs the API with several uvicorn worker processes.
+
+Usage:
+    python -m app.server
+
+Migrations run once here, before the workers start, instead of racing in
+every worker's lifespan.
+"""
+import asyncio
+import logging
+import os
+import uvicorn
+from app.config import settings
+from app.database import init_db, close_db
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def worker_count() -> int:
+    """Configured worker count, defaulting to one per CPU core."""
+    return settings.WORKERS or os.cpu_count() or 1
+
+
+async def migrate() -> None:
+    await init_db()
+    await close_db()
+
+
+def prepare_workers(workers: int) -> None:
+    """Run migrations once and configure the environment inherited by workers."""
+    asyncio.run(migrate())
+    # Forked workers (gunicorn) inherit the settings object already built in
+    # this process; spawned workers (uvicorn) build their own from the environment
+    settings.DB_AUTO_MIGRATE = False
+    os.environ["DB_AUTO_MIGRATE"] = "False"
+
+    if workers > 1 and not settings.STATE_BACKEND_URL:
+        logger.warning(
+            "Running %d workers with in-process shared state; model cache, download "
+            "progress and stream registry are per worker. Set STATE_BACKEND_URL=redis://... "
+            "to share them.",
+            workers
+        )
+    if workers > 1 and settings.DATABASE_URL.startswith("sqlite"):
+        logger.warning("Several workers on SQLite share one writer; use PostgreSQL for heavy write loads")
+
+
+def main() -> None:
+    workers = worker_count()
+    prepare_workers(workers)
+    logger.info(f"Starting {workers} workers on {settings.HOST}:{settings.PORT}")
+    uvicorn.run(
+        "app.main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=workers,
+        reload=False,
+        proxy_headers=True,
+        log_level="info",
+    )
+
+
+if __name__ == "__main__":
+    main()
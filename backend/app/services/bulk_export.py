@@ -0,0 +1,372 @@
+"""
+Streaming bulk export of sessions as JSONL, Markdown or HTML.
+
+Sessions are walked in pages by keyset on (created_at, id), and each
+session's messages are read through a server-side cursor in batches; both
+queries follow an index, so the database does not sort the export either.
+Rows are rendered and compressed as they arrive. Nothing holds more than a
+batch of rows and one output chunk, so memory stays flat however many
+sessions are exported.
+"""
+import html
+import json
+import zipfile
+import zlib
+from datetime import datetime
+from typing import Any, AsyncGenerator, Iterable, List, Optional
+from sqlalchemy import select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.database import Session, Message
+
+# Output is sent in chunks of about this size
+CHUNK_BYTES = 64 * 1024
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+class Exporter:
+    """Renders sessions and messages as text; one subclass per format."""
+
+    extension = "txt"
+    media_type = "text/plain"
+    # Whether a zip archive gets one file per session or one file overall
+    file_per_session = True
+
+    def begin(self) -> str:
+        return ""
+
+    def session_start(self, session: Any) -> str:
+        raise NotImplementedError
+
+    def message(self, message: Any, first: bool) -> str:
+        raise NotImplementedError
+
+    def session_end(self, session: Any) -> str:
+        return ""
+
+    def end(self) -> str:
+        return ""
+
+
+class JsonlExporter(Exporter):
+    """One JSON object per line and session, with its messages in order."""
+
+    extension = "jsonl"
+    media_type = "application/x-ndjson"
+    file_per_session = False
+
+    def session_start(self, session: Any) -> str:
+        # Written as an open object so messages can follow one by one
+        head = json.dumps({
+            "id": session.session_id,
+            "name": session.name,
+            "model": session.model_name,
+            "endpoint_type": session.endpoint_type,
+            "created_at": _timestamp(session.created_at),
+        }, ensure_ascii=False)
+        return head[:-1] + ', "messages": ['
+
+    def message(self, message: Any, first: bool) -> str:
+        data = json.dumps({
+            "role": message.role,
+            "content": message.content,
+            "timestamp": _timestamp(message.timestamp),
+        }, ensure_ascii=False)
+        return data if first else ", " + data
+
+    def session_end(self, session: Any) -> str:
+        return "]}\n"
+
+
+class MarkdownExporter(Exporter):
+    """Readable transcript with a heading per session and per message."""
+
+    extension = "md"
+    media_type = "text/markdown"
+
+    def session_start(self, session: Any) -> str:
+        return (
+            f"# {session.name}\n\n"
+            f"- Model: {session.model_name}\n"
+            f"- Endpoint: {session.endpoint_type}\n"
+            f"- Created: {_timestamp(session.created_at)}\n\n"
+        )
+
+    def message(self, message: Any, first: bool) -> str:
+        return f"### {message.role.capitalize()}\n\n{message.content}\n\n"
+
+    def session_end(self, session: Any) -> str:
+        return "---\n\n"
+
+
+class HtmlExporter(Exporter):
+    """Self-contained HTML page styled like the PDF export."""
+
+    extension = "html"
+    media_type = "text/html"
+
+    def begin(self) -> str:
+        return (
+            "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>Conversations</title>\n"
+            "<style>"
+            "body{font-family:sans-serif;max-width:50em;margin:2em auto;color:#2c3e50}"
+            ".meta{color:#7f8c8d;font-size:.9em}"
+            ".role{font-weight:bold;margin-top:1em}"
+            ".user .role{color:#3498db}.assistant .role{color:#27ae60}"
+            ".content{white-space:pre-wrap;margin-left:10px}"
+            "</style></head><body>\n"
+        )
+
+    def session_start(self, session: Any) -> str:
+        return (
+            f"<section><h1>{html.escape(session.name)}</h1>\n"
+            f"<p class=\"meta\">Model: {html.escape(session.model_name)}<br>"
+            f"Endpoint: {html.escape(session.endpoint_type)}<br>"
+            f"Created: {_timestamp(session.created_at)}</p>\n"
+        )
+
+    def message(self, message: Any, first: bool) -> str:
+        role = html.escape(message.role)
+        return (
+            f"<div class=\"message {role}\"><div class=\"role\">{role.upper()}</div>"
+            f"<div class=\"content\">{html.escape(message.content)}</div></div>\n"
+        )
+
+    def session_end(self, session: Any) -> str:
+        return "</section>\n"
+
+    def end(self) -> str:
+        return "</body></html>\n"
+
+
+EXPORTERS = {
+    "jsonl": JsonlExporter,
+    "markdown": MarkdownExporter,
+    "html": HtmlExporter,
+}
+
+
+def export_query(
+    model: Optional[str] = None,
+    endpoint_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    session_ids: Optional[Iterable[str]] = None
+):
+    """
+    Build the query of sessions to export, in export order.
+
+    Args:
+        model: Only sessions using this model
+        endpoint_type: Only sessions of this endpoint type
+        since: Only sessions created at or after this time
+        until: Only sessions created before this time
+        session_ids: Only these sessions
+
+    Returns:
+        Select statement
+    """
+    query = (
+        select(
+            Session.id.label("session_id"),
+            Session.name,
+            Session.model_name,
+            Session.endpoint_type,
+            Session.created_at,
+        )
+        # ix_sessions_created_at_id
+        .order_by(Session.created_at, Session.id)
+    )
+    if model:
+        query = query.where(Session.model_name == model)
+    if endpoint_type:
+        query = query.where(Session.endpoint_type == endpoint_type)
+    if since:
+        query = query.where(Session.created_at >= since)
+    if until:
+        query = query.where(Session.created_at < until)
+    if session_ids:
+        query = query.where(Session.id.in_(list(session_ids)))
+    return query
+
+
+def session_page_query(query, after: Optional[Any], limit: int):
+    """
+    Page of an export_query() statement after the last session of the previous page.
+
+    Args:
+        query: Statement from export_query()
+        after: Last session row of the previous page, None for the first page
+        limit: Sessions per page
+
+    Returns:
+        Select statement
+    """
+    if after is not None:
+        query = query.where(or_(
+            Session.created_at > after.created_at,
+            and_(Session.created_at == after.created_at, Session.id > after.session_id)
+        ))
+    return query.limit(limit)
+
+
+def messages_query(session_id: str):
+    """Messages of one session, oldest first, in ix_messages_session_timestamp order."""
+    return (
+        select(
+            Message.id.label("message_id"),
+            Message.role,
+            Message.content,
+            Message.timestamp,
+        )
+        .where(Message.session_id == session_id)
+        .order_by(Message.timestamp, Message.id)
+    )
+
+
+async def iter_sessions(
+    db: AsyncSession,
+    query,
+    exporter: Exporter,
+    batch_size: int = 500
+) -> AsyncGenerator[tuple, None]:
+    """
+    Render sessions and their messages session by session.
+
+    Args:
+        db: Database session, kept busy for the whole export
+        query: Statement from export_query()
+        exporter: Output format
+        batch_size: Sessions per page, and messages fetched from the
+            cursor at a time
+
+    Yields:
+        (session row, text) pairs; a new session row means a new session
+    """
+    last = None
+    while True:
+        sessions = (await db.execute(session_page_query(query, last, batch_size))).all()
+        for session in sessions:
+            yield session, exporter.session_start(session)
+            messages = await db.stream(messages_query(session.session_id).execution_options(yield_per=batch_size))
+            first = True
+            async for message in messages:
+                yield session, exporter.message(message, first)
+                first = False
+            yield session, exporter.session_end(session)
+        if len(sessions) < batch_size:
+            return
+        last = sessions[-1]
+
+
+class _ZipStream:
+    """Write-only file object whose output is drained by the caller."""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts.clear()
+        self.size = 0
+        return data
+
+
+def _zip_name(session: Any, exporter: Exporter) -> str:
+    safe = "".join(c if c.isalnum() or c in " -_" else "_" for c in session.name).strip()[:60]
+    return f"{safe or 'session'}_{session.session_id[:8]}.{exporter.extension}"
+
+
+async def export_stream(
+    db: AsyncSession,
+    query,
+    exporter: Exporter,
+    compression: Optional[str] = None,
+    batch_size: int = 500
+) -> AsyncGenerator[bytes, None]:
+    """
+    Stream an export as bytes.
+
+    Args:
+        db: Database session
+        query: Statement from export_query()
+        exporter: Output format
+        compression: None, "gzip" or "zip"
+        batch_size: Rows fetched from the cursor at a time
+
+    Yields:
+        Chunks of the (compressed) file
+    """
+    if compression == "zip":
+        async for chunk in _zip_stream(db, query, exporter, batch_size):
+            yield chunk
+        return
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compression == "gzip" else None
+    pending: List[str] = [exporter.begin()]
+    size = 0
+    async for _, text in iter_sessions(db, query, exporter, batch_size):
+        pending.append(text)
+        size += len(text)
+        if size >= CHUNK_BYTES:
+            data = "".join(pending).encode()
+            pending.clear()
+            size = 0
+            data = compressor.compress(data) if compressor else data
+            if data:
+                yield data
+    pending.append(exporter.end())
+    data = "".join(pending).encode()
+    if compressor:
+        data = compressor.compress(data) + compressor.flush()
+    yield data
+
+
+async def _zip_stream(db: AsyncSession, query, exporter: Exporter, batch_size: int) -> AsyncGenerator[bytes, None]:
+    """Zip archive with one file per session, or one file for line-based formats."""
+    stream = _ZipStream()
+    archive = zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED)
+    entry = None
+    current_id = None
+    pending: List[str] = []
+    size = 0
+    if not exporter.file_per_session:
+        entry = archive.open(f"sessions.{exporter.extension}", "w", force_zip64=True)
+        pending.append(exporter.begin())
+
+    async for session, text in iter_sessions(db, query, exporter, batch_size):
+        if exporter.file_per_session and session.session_id != current_id:
+            if entry is not None:
+                pending.append(exporter.end())
+                entry.write("".join(pending).encode())
+                entry.close()
+            current_id = session.session_id
+            entry = archive.open(_zip_name(session, exporter), "w", force_zip64=True)
+            pending = [exporter.begin()]
+            size = 0
+        pending.append(text)
+        size += len(text)
+        if size >= CHUNK_BYTES:
+            entry.write("".join(pending).encode())
+            pending.clear()
+            size = 0
+        if stream.size >= CHUNK_BYTES:
+            yield stream.drain()
+
+    if entry is not None:
+        pending.append(exporter.end())
+        entry.write("".join(pending).encode())
+        entry.close()
+    archive.close()
+    yield stream.drain()
@@ -1,17 +1,44 @@
 """
 Service for managing conversation context.
 """
-from typing import List
+from typing import Callable, List, Optional
+from app.config import settings
 from app.models.database import Message
+from app.models.schemas import MessageSchema
+
+# Role and formatting overhead added per message
+MESSAGE_OVERHEAD_TOKENS = 10
+
+# Smallest remainder worth filling with a truncated older message
+MIN_TRUNCATED_TOKENS = 32
+
+
+def heuristic_token_estimator(text: str) -> int:
+    """Rough token estimation (1 token ≈ 4 characters)."""
+    return max(1, len(text) // 4)
 
 
 class ContextManager:
     """Manages conversation context and token estimation."""
 
+    # Used when Ollama did not report a real count; replace with
+    # set_token_estimator() to plug in a real tokenizer.
+    token_estimator: Callable[[str], int] = staticmethod(heuristic_token_estimator)
+
+    @classmethod
+    def set_token_estimator(cls, estimator: Callable[[str], int]) -> None:
+        """
+        Replace the token estimator used for messages without a stored count.
+        
+        Args:
+            estimator: Callable mapping text to a token count
+        """
+        cls.token_estimator = staticmethod(estimator)
+
     @staticmethod
     def estimate_tokens(text: str) -> int:
         """
-        Rough token estimation (1 token ≈ 4 characters).
+        Estimate tokens for text with the configured estimator.
         
         Args:
             text: Text to estimate
@@ -19,7 +46,23 @@ class ContextManager:
         Returns:
             Estimated token count
         """
-        return max(1, len(text) // 4)
+        return ContextManager.token_estimator(text)
+
+    @staticmethod
+    def message_tokens(message) -> int:
+        """
+        Tokens of one message, preferring the count stored on insert.
+        
+        Args:
+            message: Stored Message or MessageSchema
+        
+        Returns:
+            Token count including formatting overhead
+        """
+        tokens = getattr(message, "token_count", None)
+        if tokens is None:
+            tokens = ContextManager.estimate_tokens(message.content)
+        return tokens + MESSAGE_OVERHEAD_TOKENS
 
     @staticmethod
     def calculate_message_tokens(messages: List[Message]) -> int:
@@ -30,13 +73,9 @@ class ContextManager:
             messages: List of messages
         
         Returns:
-            Total estimated tokens
+            Total tokens (stored counts, estimated where missing)
         """
-        total = 0
-        for msg in messages:
-            total += ContextManager.estimate_tokens(msg.content)
-            total += 10  # Role and formatting overhead
-        return total
+        return sum(ContextManager.message_tokens(msg) for msg in messages)
 
     @staticmethod
     def get_context_messages(
@@ -57,6 +96,99 @@ class ContextManager:
             return messages
         return messages[-context_size:] if len(messages) > context_size else messages
 
+    @staticmethod
+    def get_max_messages(context_size: Optional[int] = None) -> int:
+        """
+        Cap on the messages of a server-built context.
+        
+        Args:
+            context_size: Requested cap, if any
+        
+        Returns:
+            The cap, at most MAX_CONTEXT_SIZE (the default)
+        """
+        return min(context_size or settings.MAX_CONTEXT_SIZE, settings.MAX_CONTEXT_SIZE)
+
+    @staticmethod
+    def get_token_budget(num_ctx: int, num_predict: int) -> int:
+        """
+        Tokens available for the prompt in Ollama's context window.
+        
+        Args:
+            num_ctx: Context window size
+            num_predict: Tokens reserved for the reply
+        
+        Returns:
+            Prompt token budget
+        """
+        return max(0, num_ctx - num_predict)
+
+    @staticmethod
+    def get_budget_messages(messages: List, budget: int) -> List:
+        """
+        Pack the newest messages into a token budget.
+        
+        System messages are always kept. Other messages are added newest
+        first until the budget is reached; the first one that does not fit
+        is truncated to its most recent part if enough room is left (the
+        newest message is always kept, truncated if needed), everything
+        older is dropped.
+        
+        Args:
+            messages: Candidate messages (Message or MessageSchema), oldest first
+            budget: Prompt token budget
+        
+        Returns:
+            Selected messages, oldest first
+        """
+        pinned = [msg for msg in messages if msg.role == "system"]
+        remaining = budget - ContextManager.calculate_message_tokens(pinned)
+        
+        selected = []
+        for msg in reversed([msg for msg in messages if msg.role != "system"]):
+            tokens = ContextManager.message_tokens(msg)
+            if tokens <= remaining:
+                selected.append(msg)
+                remaining -= tokens
+                continue
+            room = remaining - MESSAGE_OVERHEAD_TOKENS
+            if not selected or room >= MIN_TRUNCATED_TOKENS:
+                selected.append(ContextManager.truncate_message(msg, max(room, 1)))
+            break
+        
+        selected.reverse()
+        return pinned + selected
+
+    @staticmethod
+    def truncate_message(message, max_tokens: int):
+        """
+        Keep the end of a message so it fits in max_tokens.
+        
+        Args:
+            message: Message or MessageSchema to truncate
+            max_tokens: Token limit for the content
+        
+        Returns:
+            A new unsaved message of the same type with truncated content
+        """
+        tokens = ContextManager.message_tokens(message) - MESSAGE_OVERHEAD_TOKENS
+        keep_chars = len(message.content) * max_tokens // max(tokens, 1)
+        content = message.content[-keep_chars:] if keep_chars > 0 else ""
+        return type(message)(role=message.role, content=content)
+
+    @staticmethod
+    def to_message_schemas(messages: List[Message]) -> List[MessageSchema]:
+        """
+        Convert stored messages into the shape sent to Ollama.
+        
+        Args:
+            messages: Stored messages, oldest first
+        
+        Returns:
+            List of MessageSchema objects
+        """
+        return [MessageSchema(role=msg.role, content=msg.content) for msg in messages]
+
     @staticmethod
     def get_context_info(messages: List[Message], max_tokens: int = 2048) -> dict:
         """
@@ -70,10 +202,25 @@ class ContextManager:
             Dict with context statistics
         """
         total_tokens = ContextManager.calculate_message_tokens(messages)
+        return ContextManager.build_context_info(len(messages), total_tokens, max_tokens)
+
+    @staticmethod
+    def build_context_info(message_count: int, total_tokens: int, max_tokens: int = 2048) -> dict:
+        """
+        Get context usage information from precomputed totals.
+        
+        Args:
+            message_count: Number of messages in the context
+            total_tokens: Tokens of those messages
+            max_tokens: Maximum context window size
+        
+        Returns:
+            Dict with context statistics
+        """
         usage_pct = (total_tokens / max_tokens) * 100 if max_tokens > 0 else 0
 
         return {
-            "total_messages": len(messages),
+            "total_messages": message_count,
             "estimated_tokens": total_tokens,
             "context_limit": max_tokens,
             "usage_percentage": round(usage_pct, 2)
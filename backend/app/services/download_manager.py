@@ -0,0 +1,321 @@
+"""
+Model downloads as background jobs.
+
+A pull runs in a task of the worker that started it, independent of the
+client that asked for it. Jobs are deduplicated by model name across
+workers with an atomic claim key per model in shared state; the shared
+"downloads" hash carries their progress so any worker can report it or
+follow it.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, AsyncGenerator, Dict, Optional, Set
+import httpx
+from app.config import settings
+from app.services.ollama_service import ollama_service
+from app.services.shared_state import shared_state, WORKER_ID
+
+logger = logging.getLogger(__name__)
+
+DOWNLOADS_KEY = "downloads"
+# Held by the worker pulling a model; expires if that worker dies
+CLAIM_KEY = "download-claim:{model}"
+ACTIVE_STATES = ("queued", "running")
+# Jobs refresh their shared entry this often, also while queued or silent
+HEARTBEAT_SECONDS = 5.0
+# Active entries not refreshed for this long belong to a dead worker
+STALE_JOB_SECONDS = 60.0
+# Events buffered per follower; older progress is dropped for slow clients
+FOLLOWER_QUEUE_SIZE = 16
+
+
+class DownloadJob:
+    """One model pull and the clients following it."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.state = "queued"
+        self.progress: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.published_at = 0.0
+        self.task: Optional[asyncio.Task] = None
+        self.followers: Set[asyncio.Queue] = set()
+
+    @property
+    def active(self) -> bool:
+        return self.state in ACTIVE_STATES
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Job state with the latest Ollama progress fields (status, total, completed)."""
+        data = {
+            **self.progress,
+            "model": self.model,
+            "state": self.state,
+            "worker": WORKER_ID,
+            "started_at": self.started_at,
+            "updated_at": time.time(),
+            "finished_at": self.finished_at,
+        }
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+def _offer(queue: asyncio.Queue, event: Optional[Dict[str, Any]]) -> None:
+    """Queue an event for a follower, dropping its oldest one when full."""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+class DownloadManager:
+    """
+    Run model pulls in the background, one per model.
+
+    At most max_concurrent pulls run at once in this worker; further jobs
+    wait in the "queued" state. Progress is published at most every
+    progress_interval seconds, plus on every status change, to followers
+    and to shared state.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 2,
+        progress_interval: float = 0.5,
+        retries: int = 3
+    ):
+        self.max_concurrent = max_concurrent
+        self.progress_interval = progress_interval
+        self.retries = retries
+        self._jobs: Dict[str, DownloadJob] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def start(self, model: str) -> Dict[str, Any]:
+        """
+        Start pulling a model, or join the pull already running for it.
+
+        Args:
+            model: Model name
+
+        Returns:
+            Snapshot of the new or existing job
+        """
+        job = self._jobs.get(model)
+        if job is not None and job.active:
+            return job.snapshot()
+
+        # Claim the model locally before awaiting, so concurrent starts join,
+        # then across workers: only one of them can set the claim key
+        job = DownloadJob(model)
+        self._jobs[model] = job
+        if not await shared_state.set_nx(CLAIM_KEY.format(model=model), WORKER_ID, ttl=STALE_JOB_SECONDS):
+            del self._jobs[model]
+            entry = (await shared_state.hgetall(DOWNLOADS_KEY)).get(model)
+            if entry is not None and self._is_live_remote(entry):
+                return entry
+            # The other worker has not published its job yet
+            return {"model": model, "state": "queued"}
+
+        await self._publish(job, force=True)
+        job.task = asyncio.create_task(self._run(job))
+        logger.info(f"Download job started for {model}")
+        return job.snapshot()
+
+    async def get(self, model: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the state of the latest job of a model on any worker.
+
+        Args:
+            model: Model name
+
+        Returns:
+            Job snapshot, or None if there is none
+        """
+        job = self._jobs.get(model)
+        if job is not None and job.active:
+            return job.snapshot()
+        return (await shared_state.hgetall(DOWNLOADS_KEY)).get(model)
+
+    async def list_jobs(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get running jobs and recently finished ones of all workers.
+
+        Jobs finished more than DOWNLOAD_HISTORY_SECONDS ago are pruned.
+
+        Returns:
+            Job snapshots keyed by model name
+        """
+        jobs = await shared_state.hgetall(DOWNLOADS_KEY)
+        cutoff = time.time() - settings.DOWNLOAD_HISTORY_SECONDS
+        for model, entry in list(jobs.items()):
+            finished_at = entry.get("finished_at")
+            if finished_at is not None and finished_at < cutoff:
+                await shared_state.hdel(DOWNLOADS_KEY, model)
+                del jobs[model]
+        return jobs
+
+    async def cancel(self, model: str) -> bool:
+        """
+        Stop the active pull of a model on any worker.
+
+        Ollama keeps the layers downloaded so far, so pulling again resumes.
+
+        Args:
+            model: Model name
+
+        Returns:
+            False if no pull of the model is active
+        """
+        job = self._jobs.get(model)
+        if job is not None and job.active:
+            job.task.cancel()
+            return True
+        entry = (await shared_state.hgetall(DOWNLOADS_KEY)).get(model)
+        if entry is None or not self._is_live_remote(entry):
+            return False
+        # The owner notices the flag on its next heartbeat
+        await shared_state.set(f"download-cancel:{model}", True, ttl=STALE_JOB_SECONDS)
+        return True
+
+    async def follow(self, model: str) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Follow a job's progress until it finishes.
+
+        Starts with the current state. Jobs of this worker are followed
+        through events; jobs of other workers by polling shared state.
+
+        Args:
+            model: Model name
+
+        Yields:
+            Job snapshots
+        """
+        job = self._jobs.get(model)
+        if job is not None and job.active:
+            queue: asyncio.Queue = asyncio.Queue(maxsize=FOLLOWER_QUEUE_SIZE)
+            queue.put_nowait(job.snapshot())
+            job.followers.add(queue)
+            try:
+                while True:
+                    event = await queue.get()
+                    if event is None:
+                        return
+                    yield event
+            finally:
+                job.followers.discard(queue)
+                self._forget(job)
+
+        last = None
+        while True:
+            entry = (await shared_state.hgetall(DOWNLOADS_KEY)).get(model)
+            if entry is None:
+                return
+            if entry != last:
+                yield entry
+                last = entry
+            if not self._is_live_remote(entry):
+                return
+            await asyncio.sleep(self.progress_interval)
+
+    async def close(self) -> None:
+        """Cancel the pulls of this worker (called from the app lifespan)."""
+        tasks = [job.task for job in self._jobs.values() if job.task is not None and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _forget(self, job: DownloadJob) -> None:
+        """Drop a finished job nobody follows; its final state stays in shared state."""
+        if not job.active and not job.followers and self._jobs.get(job.model) is job:
+            del self._jobs[job.model]
+
+    def _is_live_remote(self, entry: Dict[str, Any]) -> bool:
+        """True for an active job entry whose worker still refreshes it."""
+        return (
+            entry.get("state") in ACTIVE_STATES
+            and time.time() - entry.get("updated_at", 0) < STALE_JOB_SECONDS
+        )
+
+    async def _run(self, job: DownloadJob) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            if self._slots is None:
+                self._slots = asyncio.Semaphore(self.max_concurrent)
+            async with self._slots:
+                job.state = "running"
+                await self._publish(job, force=True)
+                await self._pull(job)
+            job.state = "completed"
+            logger.info(f"Download of {job.model} completed")
+        except asyncio.CancelledError:
+            job.state = "cancelled"
+            logger.info(f"Download of {job.model} cancelled")
+        except Exception as e:
+            job.state = "failed"
+            job.error = str(e)
+            logger.error(f"Download of {job.model} failed: {str(e)}")
+        finally:
+            heartbeat.cancel()
+            job.finished_at = time.time()
+            await self._publish(job, force=True)
+            await shared_state.delete(CLAIM_KEY.format(model=job.model))
+            for queue in job.followers:
+                _offer(queue, None)
+            self._forget(job)
+
+    async def _pull(self, job: DownloadJob) -> None:
+        """Pull with retries; Ollama resumes partially downloaded layers."""
+        for attempt in range(self.retries + 1):
+            try:
+                async for progress in ollama_service.download_model(job.model):
+                    if progress.get("error"):
+                        raise RuntimeError(progress["error"])
+                    status_changed = progress.get("status") != job.progress.get("status")
+                    job.progress = progress
+                    await self._publish(job, force=status_changed)
+                if job.progress.get("status") != "success":
+                    raise RuntimeError("Pull ended before it finished")
+                return
+            except httpx.TransportError as e:
+                if attempt == self.retries:
+                    raise
+                delay = 2 ** attempt
+                logger.warning(f"Download of {job.model} interrupted ({str(e)}), resuming in {delay}s")
+                await asyncio.sleep(delay)
+
+    async def _heartbeat(self, job: DownloadJob) -> None:
+        """Keep the shared entry and claim fresh and watch for cancel requests from other workers."""
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            try:
+                if await shared_state.get(f"download-cancel:{job.model}"):
+                    await shared_state.delete(f"download-cancel:{job.model}")
+                    job.task.cancel()
+                    return
+                await shared_state.set(CLAIM_KEY.format(model=job.model), WORKER_ID, ttl=STALE_JOB_SECONDS)
+                if time.monotonic() - job.published_at >= HEARTBEAT_SECONDS:
+                    await self._publish(job, force=True)
+            except Exception as e:
+                logger.warning(f"Heartbeat of download {job.model} failed: {str(e)}")
+
+    async def _publish(self, job: DownloadJob, force: bool = False) -> None:
+        """Send the job state to followers and shared state, throttled unless forced."""
+        now = time.monotonic()
+        if not force and now - job.published_at < self.progress_interval:
+            return
+        job.published_at = now
+        snapshot = job.snapshot()
+        for queue in job.followers:
+            _offer(queue, snapshot)
+        await shared_state.hset(DOWNLOADS_KEY, job.model, snapshot)
+
+
+# Singleton instance
+download_manager = DownloadManager(
+    max_concurrent=settings.DOWNLOAD_MAX_CONCURRENT,
+    progress_interval=settings.DOWNLOAD_PROGRESS_INTERVAL,
+    retries=settings.DOWNLOAD_RETRIES,
+)
@@ -0,0 +1,270 @@
+"""
+Semantic search over messages embedded with an Ollama embedding model.
+
+The EmbeddingIndexer embeds new messages in the background, in batches
+through OllamaService.embed(), and appends their vectors to the
+VectorStore in EMBEDDING_DIR; messages.embedding_row records which
+messages are done. With several workers one of them, holding a file lock
+in the store directory, does the indexing; all of them can search.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional
+from sqlalchemy import select, update, func, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.database import Session, Message
+from app.services.ollama_service import ollama_service
+from app.services.vector_store import VectorStore, ID_BYTES
+
+try:
+    import fcntl
+except ImportError:  # Windows: no lock, run a single worker
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Longest wait after repeated failures (e.g. Ollama down, model missing)
+MAX_BACKOFF = 60.0
+# Candidates fetched per requested result, as filters and vectors of
+# deleted messages drop some
+OVERFETCH = 5
+
+
+class SemanticSearchUnavailable(RuntimeError):
+    """No embedding model is configured."""
+
+
+class EmbeddingIndexer:
+    """Background worker embedding messages that have no vector yet."""
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        path: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        interval: Optional[float] = None
+    ):
+        self.model = model or settings.EMBEDDING_MODEL
+        self.store = VectorStore(path or settings.EMBEDDING_DIR)
+        # Searches get their own instance: only the indexer's may append
+        self.reader = VectorStore(self.store.path)
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.interval = interval if interval is not None else settings.EMBEDDING_INTERVAL
+        self._task: Optional[asyncio.Task] = None
+        self._lock_file = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """Start indexing if a model is configured and no other worker indexes."""
+        if not self.model or self.running:
+            return
+        os.makedirs(self.store.path, exist_ok=True)
+        if fcntl is not None:
+            self._lock_file = open(os.path.join(self.store.path, "lock"), "w")
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._lock_file.close()
+                self._lock_file = None
+                logger.info("Another worker is indexing embeddings")
+                return
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Embedding indexer started: model={self.model}, batch_size={self.batch_size}")
+
+    async def close(self) -> None:
+        """Stop indexing and release the lock."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Embedding indexer stopped")
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    async def _run(self) -> None:
+        backoff = self.interval
+        while True:
+            try:
+                done = await self.index_batch()
+                backoff = self.interval
+                if done < self.batch_size:
+                    await asyncio.sleep(self.interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Embedding messages failed, retrying in {backoff:g}s: {str(e)}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+
+    async def index_batch(self) -> int:
+        """
+        Embed one batch of pending messages, newest first.
+
+        Returns:
+            Number of messages processed
+        """
+        async with AsyncSessionLocal() as db:
+            await asyncio.to_thread(self.store.refresh)
+            # A store without a model has nothing to requeue
+            if self.store.model is not None and self.store.model != self.model:
+                await self._requeue(db)
+            rows = (await db.execute(
+                select(Message.id, Message.content)
+                .where(Message.embedding_row.is_(None))
+                .order_by(Message.timestamp.desc())
+                .limit(self.batch_size)
+            )).all()
+            if not rows:
+                return 0
+
+            # Nothing to embed in empty messages, and the store only holds
+            # ids of ID_BYTES (UUIDs); mark those as done
+            texts = [
+                row for row in rows
+                if row.content and row.content.strip() and len(row.id.encode()) == ID_BYTES
+            ]
+            assigned = {row.id: -1 for row in rows}
+            if texts:
+                vectors = await ollama_service.embed(self.model, [row.content for row in texts])
+                dim = len(vectors[0])
+                if self.store.model != self.model or self.store.dim != dim:
+                    if self.store.model == self.model:
+                        # Same name, different vectors: the stored ones are useless
+                        await self._requeue(db)
+                    await asyncio.to_thread(self.store.reset, self.model, dim)
+                ids = [row.id for row in texts]
+                first = await asyncio.to_thread(self.store.append, ids, vectors)
+                assigned.update((message_id, first + i) for i, message_id in enumerate(ids))
+
+            # Core executemany; the ORM form would expect primary key dicts
+            messages = Message.__table__
+            await db.execute(
+                update(messages)
+                .where(messages.c.id == bindparam("message_id"))
+                .values(embedding_row=bindparam("row")),
+                [{"message_id": message_id, "row": row} for message_id, row in assigned.items()]
+            )
+            await db.commit()
+            return len(rows)
+
+    async def _requeue(self, db: AsyncSession) -> None:
+        """Mark all embedded messages as pending, before the store is reset for this model."""
+        # Committed before the reset: if that fails, the next batch requeues again.
+        # Messages without text (-1) stay done; requeueing them would make no progress
+        result = await db.execute(
+            update(Message)
+            .where(Message.embedding_row >= 0)
+            .values(embedding_row=None)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        if result.rowcount:
+            logger.info(f"Embedding model changed to {self.model}; embedding {result.rowcount} messages again")
+
+
+async def semantic_search(
+    db: AsyncSession,
+    query: str,
+    model: Optional[str] = None,
+    role: Optional[str] = None,
+    session_id: Optional[str] = None,
+    exclude_session_id: Optional[str] = None,
+    min_score: float = 0.0,
+    limit: int = 10
+) -> Dict[str, Any]:
+    """
+    Find the messages closest in meaning to a query.
+
+    The query is embedded with the configured model and compared to all
+    stored vectors; filters apply to the nearest candidates, so a very
+    selective filter can return fewer than limit results. Vectors of
+    deleted messages stay in the store and are skipped.
+
+    Args:
+        db: Database session
+        query: Text to search for
+        model: Only messages of this model (the session's model where the
+            message does not record one)
+        role: Only messages with this role
+        session_id: Only messages of this session
+        exclude_session_id: Skip messages of this session (e.g. the one
+            being retrieved for)
+        min_score: Minimum cosine similarity
+        limit: Number of results
+
+    Returns:
+        Dict with results (message_id, session_id, session_name, model,
+        role, timestamp, content, score) and indexed (stored vectors)
+
+    Raises:
+        SemanticSearchUnavailable: If no embedding model is configured
+    """
+    if not settings.EMBEDDING_MODEL:
+        raise SemanticSearchUnavailable("Semantic search is disabled; set EMBEDDING_MODEL to enable it")
+    store = embedding_indexer.reader
+    await asyncio.to_thread(store.refresh)
+    if store.model != settings.EMBEDDING_MODEL:
+        # Nothing indexed yet with this model
+        return {"results": [], "indexed": 0}
+
+    vector = (await ollama_service.embed(store.model, [query]))[0]
+    # A message embedded twice (crash before its row was recorded) keeps its best score
+    scores: Dict[str, float] = {}
+    for message_id, score in await asyncio.to_thread(store.search, vector, limit * OVERFETCH):
+        if score >= min_score and message_id not in scores:
+            scores[message_id] = score
+    if not scores:
+        return {"results": [], "indexed": store.count}
+
+    statement = (
+        select(
+            Message.id,
+            Message.session_id,
+            Session.name,
+            func.coalesce(Message.model, Session.model_name).label("model"),
+            Message.role,
+            Message.timestamp,
+            Message.content,
+        )
+        .join(Session, Session.id == Message.session_id)
+        .where(Message.id.in_(list(scores)))
+    )
+    if model:
+        statement = statement.where(func.coalesce(Message.model, Session.model_name) == model)
+    if role:
+        statement = statement.where(Message.role == role)
+    if session_id:
+        statement = statement.where(Message.session_id == session_id)
+    if exclude_session_id:
+        statement = statement.where(Message.session_id != exclude_session_id)
+    rows = (await db.execute(statement)).all()
+
+    results: List[Dict[str, Any]] = [
+        {
+            "message_id": row.id,
+            "session_id": row.session_id,
+            "session_name": row.name,
+            "model": row.model,
+            "role": row.role,
+            "timestamp": row.timestamp,
+            "content": row.content,
+            "score": round(scores[row.id], 4),
+        }
+        for row in rows
+    ]
+    results.sort(key=lambda result: result["score"], reverse=True)
+    return {"results": results[:limit], "indexed": store.count}
+
+
+# Singleton instance
+embedding_indexer = EmbeddingIndexer()
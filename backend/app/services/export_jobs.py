@@ -0,0 +1,254 @@
+"""
+Background PDF export jobs.
+
+Messages are copied from the database in chunks into a spool file, and
+the PDF is rendered from it in a process pool, so neither a long session
+nor ReportLab's CPU time blocks the event loop. Rendered files are cached
+on disk under a job id derived from the session's content; the same id is
+used for submitting, polling and downloading, from any worker.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+from app.config import settings
+from app.database import AsyncReadSessionLocal
+from app.models.database import Session
+from app.services.export_service import render_pdf_file, session_metadata
+from app.services.message_writer import message_writer
+from app.services.session_service import SessionService
+from app.services.shared_state import shared_state, WORKER_ID
+
+logger = logging.getLogger(__name__)
+
+EXPORTS_KEY = "exports"
+# Running jobs refresh their shared entry this often
+HEARTBEAT_SECONDS = 5.0
+# Running entries not refreshed for this long belong to a dead worker
+STALE_JOB_SECONDS = 60.0
+# Cached files used this recently are never pruned, so a download that
+# just resolved its file can still send it
+SERVE_WINDOW_SECONDS = 60.0
+
+
+class ExportJobManager:
+    """Render session PDFs in worker processes, with an on-disk cache."""
+
+    def __init__(self, processes: int = 2, cache_dir: Optional[str] = None, max_files: int = 100):
+        self.processes = processes
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "ollama-web-exports")
+        self.max_files = max_files
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        """Process pool, created on first use."""
+        if self._pool is None:
+            # spawn: forking a process with running event loop threads is unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def close(self) -> None:
+        """Stop running jobs and the process pool (called from the app lifespan)."""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def path_for(self, job_id: str) -> str:
+        """Location of a job's rendered PDF."""
+        return os.path.join(self.cache_dir, f"{job_id}.pdf")
+
+    async def job_id_for(self, db, session: Session) -> str:
+        """
+        Derive the job id of a session's current content.
+
+        The id changes when a message is added or the session is renamed,
+        so cached files never go stale.
+
+        Args:
+            db: Database session
+            session: Session to export
+
+        Returns:
+            Hex job id
+        """
+        await message_writer.sync(session.id)
+        count, last_message_id = await SessionService(db).get_last_message_id(session.id)
+        fingerprint = f"{session.id}:{session.updated_at.isoformat()}:{count}:{last_message_id}"
+        return hashlib.sha256(fingerprint.encode()).hexdigest()[:32]
+
+    async def submit(self, session: Session, job_id: str) -> Dict[str, Any]:
+        """
+        Start rendering unless the PDF is cached or already being rendered.
+
+        Args:
+            session: Session to export
+            job_id: Id from job_id_for()
+
+        Returns:
+            Job status, see status()
+        """
+        status = await self.status(job_id)
+        if status is not None and status["status"] in ("completed", "running"):
+            return status
+
+        meta = session_metadata(session, 0)
+        now = time.time()
+        status = {
+            "job_id": job_id,
+            "session_id": session.id,
+            "status": "running",
+            "worker": WORKER_ID,
+            "created_at": now,
+            "updated_at": now,
+        }
+        await shared_state.hset(EXPORTS_KEY, job_id, status)
+        self._tasks[job_id] = asyncio.create_task(self._run(job_id, session.id, meta, status))
+        return status
+
+    async def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the state of a job on any worker.
+
+        Args:
+            job_id: Job id
+
+        Returns:
+            Dict with job_id and status (running, completed or failed),
+            or None for an unknown job
+        """
+        path = self.path_for(job_id)
+        try:
+            # Mark the file as used, so pruning keeps it while it is served
+            os.utime(path)
+            return {"job_id": job_id, "status": "completed", "size": os.path.getsize(path)}
+        except FileNotFoundError:
+            pass
+        status = (await shared_state.hgetall(EXPORTS_KEY)).get(job_id)
+        if (
+            status is not None
+            and status["status"] == "running"
+            and job_id not in self._tasks
+            and time.time() - status.get("updated_at", 0) > STALE_JOB_SECONDS
+        ):
+            # The rendering worker died; submitting again starts a new job
+            return {**status, "status": "failed", "error": "Export worker stopped responding"}
+        return status
+
+    async def wait(self, job_id: str, poll_interval: float = 0.2) -> Dict[str, Any]:
+        """
+        Wait until a job finishes.
+
+        Args:
+            job_id: Job id
+            poll_interval: Seconds between checks for jobs of other workers
+
+        Returns:
+            Final job status
+        """
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.shield(task)
+        while True:
+            status = await self.status(job_id)
+            if status is None or status["status"] != "running":
+                return status
+            await asyncio.sleep(poll_interval)
+
+    async def _run(self, job_id: str, session_id: str, meta: Dict[str, Any], status: Dict[str, Any]) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, status))
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, spool_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".jsonl.tmp")
+        output_path = f"{spool_path}.pdf"
+        started = time.perf_counter()
+        try:
+            # Copy the messages out in chunks; the read connection is held only for this part
+            count = 0
+            with os.fdopen(fd, "w", encoding="utf-8") as spool:
+                async with AsyncReadSessionLocal() as db:
+                    async for rows in SessionService(db).iter_messages(session_id, settings.EXPORT_CHUNK_SIZE):
+                        data = "".join(json.dumps([row.role, row.content]) + "\n" for row in rows)
+                        await asyncio.to_thread(spool.write, data)
+                        count += len(rows)
+            meta["message_count"] = count
+
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(self.pool, render_pdf_file, meta, spool_path, output_path)
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory); start a fresh pool next time
+                self._pool = None
+                raise
+            os.replace(output_path, self.path_for(job_id))
+            heartbeat.cancel()
+            await shared_state.hdel(EXPORTS_KEY, job_id)
+            logger.info(
+                f"Exported session {session_id} ({count} messages) "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
+            await asyncio.to_thread(self._prune)
+        except asyncio.CancelledError:
+            heartbeat.cancel()
+            await shared_state.hdel(EXPORTS_KEY, job_id)
+            raise
+        except Exception as e:
+            logger.error(f"Export of session {session_id} failed: {str(e)}", exc_info=True)
+            heartbeat.cancel()
+            await shared_state.hset(EXPORTS_KEY, job_id, {
+                "job_id": job_id,
+                "session_id": session_id,
+                "status": "failed",
+                "error": str(e),
+                "worker": WORKER_ID,
+            })
+        finally:
+            heartbeat.cancel()
+            self._tasks.pop(job_id, None)
+            for path in (spool_path, output_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    async def _heartbeat(self, job_id: str, status: Dict[str, Any]) -> None:
+        """Keep the shared entry of a running job fresh."""
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            try:
+                await shared_state.hset(EXPORTS_KEY, job_id, {**status, "updated_at": time.time()})
+            except Exception as e:
+                logger.warning(f"Heartbeat of export {job_id} failed: {str(e)}")
+
+    def _prune(self) -> None:
+        """Keep only the max_files most recently used PDFs, sparing any in use."""
+        entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith(".pdf") and ".tmp" not in e.name]
+        if len(entries) <= self.max_files:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+        cutoff = time.time() - SERVE_WINDOW_SECONDS
+        for entry in entries[self.max_files:]:
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+
+# Singleton instance
+export_jobs = ExportJobManager(
+    processes=settings.EXPORT_PROCESSES,
+    cache_dir=settings.EXPORT_CACHE_DIR,
+    max_files=settings.EXPORT_CACHE_MAX_FILES,
+)
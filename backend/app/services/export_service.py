@@ -1,5 +1,8 @@
 """
 Service for exporting conversations to PDF.
+
+Rendering is CPU-bound; the functions here are plain synchronous code so
+they can run in a worker process (see export_jobs).
 """
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -7,8 +10,148 @@ from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
 from reportlab.lib.enums import TA_LEFT
 from io import BytesIO
-from typing import List
+from typing import Any, Dict, Iterable, List, Tuple
 from app.models.database import Session, Message
+import json
+
+
+def _escape(text: str) -> str:
+    """Escape text for a ReportLab paragraph."""
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def session_metadata(session: Session, message_count: int) -> Dict[str, Any]:
+    """
+    Get the session fields printed in the PDF header as plain data.
+
+    Args:
+        session: Session object
+        message_count: Number of messages exported
+
+    Returns:
+        Picklable dict for render_pdf_file()
+    """
+    return {
+        "name": session.name,
+        "model_name": session.model_name,
+        "endpoint_type": session.endpoint_type,
+        "created_at": session.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        "message_count": message_count,
+    }
+
+
+def build_pdf(meta: Dict[str, Any], messages: Iterable[Tuple[str, str]], output) -> None:
+    """
+    Render a conversation to PDF.
+
+    Args:
+        meta: Session metadata from session_metadata()
+        messages: (role, content) pairs, oldest first
+        output: File path or binary file object to write to
+    """
+    doc = SimpleDocTemplate(
+        output,
+        pagesize=letter,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=18,
+    )
+
+    styles = getSampleStyleSheet()
+    story = []
+
+    # Title
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor='#2c3e50',
+        spaceAfter=30,
+    )
+    title = Paragraph(f"<b>{_escape(meta['name'])}</b>", title_style)
+    story.append(title)
+
+    # Metadata
+    meta_style = ParagraphStyle(
+        'Metadata',
+        parent=styles['Normal'],
+        fontSize=10,
+        textColor='#7f8c8d',
+        spaceAfter=20,
+    )
+    metadata = Paragraph(
+        f"<b>Model:</b> {_escape(meta['model_name'])}<br/>"
+        f"<b>Endpoint:</b> {meta['endpoint_type']}<br/>"
+        f"<b>Created:</b> {meta['created_at']}<br/>"
+        f"<b>Messages:</b> {meta['message_count']}",
+        meta_style
+    )
+    story.append(metadata)
+    story.append(Spacer(1, 0.3 * inch))
+
+    # Messages
+    user_style = ParagraphStyle(
+        'UserMessage',
+        parent=styles['Normal'],
+        fontSize=11,
+        textColor='#2c3e50',
+        spaceAfter=5,
+        leftIndent=10,
+    )
+
+    assistant_style = ParagraphStyle(
+        'AssistantMessage',
+        parent=styles['Normal'],
+        fontSize=11,
+        textColor='#34495e',
+        spaceAfter=5,
+        leftIndent=10,
+    )
+
+    role_style = ParagraphStyle(
+        'Role',
+        parent=styles['Heading3'],
+        fontSize=12,
+        textColor='#3498db',
+        spaceAfter=5,
+    )
+
+    for role, content in messages:
+        # Role header
+        role_text = f"<b>{role.upper()}</b>"
+        if role == 'assistant':
+            role_text = f'<b><font color="#27ae60">{role.upper()}</font></b>'
+        elif role == 'user':
+            role_text = f'<b><font color="#3498db">{role.upper()}</font></b>'
+
+        role_para = Paragraph(role_text, role_style)
+        story.append(role_para)
+
+        # Message content (escape HTML special characters)
+        content = _escape(content).replace('\n', '<br/>')
+
+        style = assistant_style if role == 'assistant' else user_style
+        content_para = Paragraph(content, style)
+        story.append(content_para)
+        story.append(Spacer(1, 0.2 * inch))
+
+    # Build PDF
+    doc.build(story)
+
+
+def render_pdf_file(meta: Dict[str, Any], spool_path: str, output_path: str) -> None:
+    """
+    Render a PDF from a spool file; runs in a worker process.
+
+    Args:
+        meta: Session metadata from session_metadata()
+        spool_path: JSON lines of [role, content], oldest first
+        output_path: Where to write the PDF
+    """
+    with open(spool_path, encoding="utf-8") as spool:
+        messages = (json.loads(line) for line in spool)
+        build_pdf(meta, messages, output_path)
 
 
 class ExportService:
@@ -17,106 +160,24 @@ class ExportService:
     @staticmethod
     def export_to_pdf(session: Session, messages: List[Message]) -> bytes:
         """
-        Export a conversation session to PDF.
-        
+        Export a conversation session to PDF in the calling thread.
+
+        Blocks for as long as rendering takes; the API renders through
+        export_jobs in a worker process instead.
+
         Args:
             session: Session object
             messages: List of messages
-        
+
         Returns:
             PDF file as bytes
         """
         buffer = BytesIO()
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=letter,
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=18,
-        )
-        
-        styles = getSampleStyleSheet()
-        story = []
-
-        # Title
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor='#2c3e50',
-            spaceAfter=30,
-        )
-        title = Paragraph(f"<b>{session.name}</b>", title_style)
-        story.append(title)
-
-        # Metadata
-        meta_style = ParagraphStyle(
-            'Metadata',
-            parent=styles['Normal'],
-            fontSize=10,
-            textColor='#7f8c8d',
-            spaceAfter=20,
-        )
-        metadata = Paragraph(
-            f"<b>Model:</b> {session.model_name}<br/>"
-            f"<b>Endpoint:</b> {session.endpoint_type}<br/>"
-            f"<b>Created:</b> {session.created_at.strftime('%Y-%m-%d %H:%M:%S')}<br/>"
-            f"<b>Messages:</b> {len(messages)}",
-            meta_style
+        build_pdf(
+            session_metadata(session, len(messages)),
+            ((msg.role, msg.content) for msg in messages),
+            buffer
         )
-        story.append(metadata)
-        story.append(Spacer(1, 0.3 * inch))
-
-        # Messages
-        user_style = ParagraphStyle(
-            'UserMessage',
-            parent=styles['Normal'],
-            fontSize=11,
-            textColor='#2c3e50',
-            spaceAfter=5,
-            leftIndent=10,
-        )
-        
-        assistant_style = ParagraphStyle(
-            'AssistantMessage',
-            parent=styles['Normal'],
-            fontSize=11,
-            textColor='#34495e',
-            spaceAfter=5,
-            leftIndent=10,
-        )
-        
-        role_style = ParagraphStyle(
-            'Role',
-            parent=styles['Heading3'],
-            fontSize=12,
-            textColor='#3498db',
-            spaceAfter=5,
-        )
-
-        for msg in messages:
-            # Role header
-            role_text = f"<b>{msg.role.upper()}</b>"
-            if msg.role == 'assistant':
-                role_text = f'<b><font color="#27ae60">{msg.role.upper()}</font></b>'
-            elif msg.role == 'user':
-                role_text = f'<b><font color="#3498db">{msg.role.upper()}</font></b>'
-            
-            role_para = Paragraph(role_text, role_style)
-            story.append(role_para)
-
-            # Message content (escape HTML special characters)
-            content = msg.content.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-            content = content.replace('\n', '<br/>')
-            
-            style = assistant_style if msg.role == 'assistant' else user_style
-            content_para = Paragraph(content, style)
-            story.append(content_para)
-            story.append(Spacer(1, 0.2 * inch))
-
-        # Build PDF
-        doc.build(story)
         pdf_bytes = buffer.getvalue()
         buffer.close()
 
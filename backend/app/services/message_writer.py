@@ -0,0 +1,165 @@
+"""
+Write-behind persistence for conversation messages.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.database import Message
+from app.services.session_service import SessionService, generation_stat_columns
+
+logger = logging.getLogger(__name__)
+
+
+class MessageWriter:
+    """
+    Queue messages and persist them in batches off the request path.
+
+    Messages are stamped when they are enqueued, so ordering does not depend
+    on when a batch reaches the database. Readers that need to see a
+    session's latest messages call sync() first.
+    """
+
+    def __init__(self, batch_size: int = None):
+        self.batch_size = batch_size or settings.MESSAGE_WRITE_BATCH_SIZE
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Dict[str, int] = {}
+        self._drained: Optional[asyncio.Condition] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of messages waiting to be written."""
+        return sum(self._pending.values())
+
+    async def start(self) -> None:
+        """Start the background worker (called from the app lifespan)."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._drained = asyncio.Condition()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Message writer started: batch_size={self.batch_size}")
+
+    async def stop(self) -> None:
+        """Flush everything still queued and stop the worker."""
+        if not self.running:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Message writer stopped")
+
+    async def add_message(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        parameters: Optional[dict] = None,
+        token_count: Optional[int] = None,
+        truncated: bool = False,
+        model: Optional[str] = None,
+        stats: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Queue a message for writing.
+
+        Returns immediately while the worker is running; otherwise the
+        message is written directly (scripts, tests).
+
+        Args:
+            session_id: Session UUID
+            role: Message role (user/assistant/system)
+            content: Message content
+            parameters: Optional parameters used for generation
+            token_count: Token count reported by Ollama, if known
+            truncated: The generation was cancelled before it finished
+            model: Model that generated the message
+            stats: Generation statistics, see generation_stat_columns()
+        """
+        message = Message(
+            session_id=session_id,
+            role=role,
+            content=content,
+            parameters=parameters,
+            token_count=token_count,
+            truncated=truncated,
+            model=model,
+            timestamp=datetime.utcnow(),
+            **generation_stat_columns(stats)
+        )
+
+        if not self.running:
+            await self._write([message])
+            return
+
+        self._pending[session_id] = self._pending.get(session_id, 0) + 1
+        self._queue.put_nowait(message)
+
+    async def sync(self, session_id: str) -> None:
+        """
+        Wait until all queued messages of a session are written.
+
+        Args:
+            session_id: Session UUID
+        """
+        if not self.running or not self._pending.get(session_id):
+            return
+        async with self._drained:
+            await self._drained.wait_for(lambda: not self._pending.get(session_id))
+
+    async def _run(self) -> None:
+        """Drain the queue in batches, one transaction per batch."""
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                await self._write(batch)
+            except Exception:
+                logger.warning(
+                    f"Writing a batch of {len(batch)} messages failed; retrying them one by one",
+                    exc_info=True
+                )
+                await self._write_each(batch)
+            finally:
+                for message in batch:
+                    remaining = self._pending.get(message.session_id, 1) - 1
+                    if remaining:
+                        self._pending[message.session_id] = remaining
+                    else:
+                        self._pending.pop(message.session_id, None)
+                    self._queue.task_done()
+                async with self._drained:
+                    self._drained.notify_all()
+
+    async def _write(self, messages: List[Message]) -> None:
+        async with AsyncSessionLocal() as db:
+            await SessionService(db).add_messages(messages)
+
+    async def _write_each(self, messages: List[Message]) -> None:
+        """Write messages in separate transactions, so only failing ones are lost."""
+        # Messages of a rolled back batch are transient again and can be re-added
+        for message in messages:
+            try:
+                await self._write([message])
+            except Exception:
+                logger.error(
+                    f"Dropped message of session {message.session_id} after write failure",
+                    exc_info=True
+                )
+
+
+# Singleton instance
+message_writer = MessageWriter()
@@ -0,0 +1,302 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+A small dependency-free subset of the Prometheus client: counters,
+histograms and callback gauges with labels. Values live in the worker
+process; with several workers each one reports its own numbers.
+"""
+import bisect
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Model label of requests for models not in the model list
+OTHER_MODEL = "other"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class: a named metric family with fixed label names."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing value per label set."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    """Bucketed distribution per label set; observe() is a bisect and two adds."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    def samples(self) -> Iterable[str]:
+        for key, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(self._sums[key])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class CallbackGauge(Metric):
+    """Gauge whose values are read from a callback at scrape time."""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Dict[LabelValues, float]],
+        labelnames: Sequence[str] = ()
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def samples(self) -> Iterable[str]:
+        for key, value in self.callback().items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Content type of the text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+registry = Registry()
+
+TIME_TO_FIRST_TOKEN = registry.register(Histogram(
+    "ollama_time_to_first_token_seconds",
+    "Time from admission to the first generated token of a streamed reply.",
+    (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+    ("model",),
+))
+INTER_TOKEN_LATENCY = registry.register(Histogram(
+    "ollama_inter_token_latency_seconds",
+    "Mean time between generated tokens of a reply (eval_duration / eval_count).",
+    (0.005, 0.01, 0.02, 0.035, 0.05, 0.075, 0.1, 0.2, 0.5, 1),
+    ("model",),
+))
+TOKENS_PER_SECOND = registry.register(Histogram(
+    "ollama_tokens_per_second",
+    "Generation throughput of a reply (eval_count / eval_duration).",
+    (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 500),
+    ("model",),
+))
+PROMPT_TOKENS_PER_SECOND = registry.register(Histogram(
+    "ollama_prompt_eval_tokens_per_second",
+    "Prompt processing throughput (prompt_eval_count / prompt_eval_duration).",
+    (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000),
+    ("model",),
+))
+MODEL_LOAD_SECONDS = registry.register(Histogram(
+    "ollama_model_load_seconds",
+    "Time Ollama spent loading the model for a request (load_duration).",
+    (0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+    ("model",),
+))
+GENERATION_SECONDS = registry.register(Histogram(
+    "ollama_generation_duration_seconds",
+    "Total time Ollama spent on a request (total_duration).",
+    (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+    ("model",),
+))
+QUEUE_WAIT_SECONDS = registry.register(Histogram(
+    "ollama_queue_wait_seconds",
+    "Time a generation waited for an admission slot.",
+    (0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60),
+    ("model",),
+))
+GENERATED_TOKENS = registry.register(Counter(
+    "ollama_generated_tokens_total",
+    "Tokens generated (eval_count).",
+    ("model",),
+))
+PROMPT_TOKENS = registry.register(Counter(
+    "ollama_prompt_tokens_total",
+    "Prompt tokens processed (prompt_eval_count).",
+    ("model",),
+))
+GENERATIONS = registry.register(Counter(
+    "ollama_generations_total",
+    "Generations by outcome (completed, cancelled, error).",
+    ("model", "outcome"),
+))
+CACHED_RESPONSES = registry.register(Counter(
+    "ollama_cached_responses_total",
+    "Generations answered from the response cache, excluded from the other generation metrics.",
+    ("model",),
+))
+UPSTREAM_ERRORS = registry.register(Counter(
+    "ollama_upstream_errors_total",
+    "Failed requests to Ollama backends by kind (connect, transport, http_5xx).",
+    ("backend", "model", "kind"),
+))
+
+
+class GenerationMetrics:
+    """
+    Collect the metrics of one generation.
+
+    The model is a label value, see OllamaService.model_label(); never pass
+    a client-supplied name directly. Create it when the request is queued, then call admitted() when it gets
+    a slot, token() for every content chunk and finish() at the end, or
+    cache_hit() instead when the response cache answered: replayed timings
+    say nothing about the model.
+    """
+
+    __slots__ = ("model", "created", "started", "first_token")
+
+    def __init__(self, model: str):
+        self.model = model
+        self.created = time.perf_counter()
+        self.started = self.created
+        self.first_token: Optional[float] = None
+
+    def admitted(self) -> None:
+        self.started = time.perf_counter()
+        QUEUE_WAIT_SECONDS.observe(self.started - self.created, model=self.model)
+
+    @property
+    def time_to_first_token(self) -> Optional[int]:
+        """Nanoseconds from admission to the first token, if one arrived."""
+        if self.first_token is None:
+            return None
+        return int((self.first_token - self.started) * 1e9)
+
+    def token(self) -> None:
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+    def finish(self, final_chunk: Optional[dict] = None, outcome: str = "completed") -> None:
+        """
+        Record the outcome and Ollama's own timings from the final chunk.
+
+        Args:
+            final_chunk: Chunk or response with done=true, if one arrived
+            outcome: completed, cancelled or error
+        """
+        GENERATIONS.inc(model=self.model, outcome=outcome)
+        if self.first_token is not None:
+            TIME_TO_FIRST_TOKEN.observe(self.first_token - self.started, model=self.model)
+        if final_chunk:
+            observe_ollama_stats(self.model, final_chunk)
+
+    def cache_hit(self) -> None:
+        """Record a generation answered from the response cache."""
+        CACHED_RESPONSES.inc(model=self.model)
+
+
+def observe_ollama_stats(model: str, stats: dict) -> None:
+    """
+    Record the timing fields Ollama reports with a finished generation.
+
+    Durations are in nanoseconds.
+
+    Args:
+        model: Model name
+        stats: Final chunk or non-streaming response
+    """
+    eval_count = stats.get("eval_count")
+    eval_duration = stats.get("eval_duration")
+    if eval_count:
+        GENERATED_TOKENS.inc(eval_count, model=model)
+        if eval_duration:
+            INTER_TOKEN_LATENCY.observe(eval_duration / eval_count / 1e9, model=model)
+            TOKENS_PER_SECOND.observe(eval_count / eval_duration * 1e9, model=model)
+
+    prompt_eval_count = stats.get("prompt_eval_count")
+    prompt_eval_duration = stats.get("prompt_eval_duration")
+    if prompt_eval_count:
+        PROMPT_TOKENS.inc(prompt_eval_count, model=model)
+        if prompt_eval_duration:
+            PROMPT_TOKENS_PER_SECOND.observe(prompt_eval_count / prompt_eval_duration * 1e9, model=model)
+
+    if stats.get("load_duration") is not None:
+        MODEL_LOAD_SECONDS.observe(stats["load_duration"] / 1e9, model=model)
+    if stats.get("total_duration") is not None:
+        GENERATION_SECONDS.observe(stats["total_duration"] / 1e9, model=model)
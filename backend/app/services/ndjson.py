@@ -0,0 +1,98 @@
+"""
+NDJSON helpers for relaying Ollama streams.
+
+Uses orjson (several times faster on small objects) and falls back to the
+standard json module where it is not installed; then scan_chunk() reads
+the text of a relayed chunk from its bytes instead of decoding the line.
+"""
+import json
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+if orjson is not None:
+    def loads(data) -> Any:
+        """Parse JSON from bytes or str."""
+        return orjson.loads(data)
+
+    def dumps_line(value: Any) -> bytes:
+        """Serialize a value as one NDJSON line."""
+        return orjson.dumps(value, option=orjson.OPT_APPEND_NEWLINE)
+else:
+    def loads(data) -> Any:
+        """Parse JSON from bytes or str."""
+        return json.loads(data)
+
+    def dumps_line(value: Any) -> bytes:
+        """Serialize a value as one NDJSON line."""
+        return (json.dumps(value, separators=(",", ":")) + "\n").encode()
+
+
+def chunk_content(chunk: Dict[str, Any]) -> Optional[str]:
+    """
+    Get the generated text of a chat or generate chunk.
+
+    Args:
+        chunk: Decoded Ollama chunk
+
+    Returns:
+        Text of the chunk, or None if it carries none
+    """
+    message = chunk.get("message")
+    if message is not None:
+        return message.get("content")
+    return chunk.get("response")
+
+
+# Compact keys of the generated text in chat and generate chunks
+_CONTENT_KEYS = (b'"content":"', b'"response":"')
+
+
+def _string_end(line: bytes, start: int) -> int:
+    """Index of the quote closing the JSON string starting at start, or -1."""
+    end = line.find(b'"', start)
+    while end != -1:
+        backslashes = 0
+        while line[end - 1 - backslashes] == 0x5C:  # Backslash
+            backslashes += 1
+        if backslashes % 2 == 0:
+            return end
+        end = line.find(b'"', end + 1)
+    return -1
+
+
+def scan_chunk(line: bytes) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Get the generated text of a relayed chunk, decoding only what is needed.
+
+    With orjson every line is decoded, which is faster than scanning. With
+    the json module, as Ollama writes compact JSON, the text of a token
+    chunk ("done":false) is cut out of the bytes after the first "content"
+    or "response" key; a quote inside a JSON string is always escaped, so
+    the key cannot match inside a value. The final chunk, and any line in
+    another layout, is decoded in full.
+
+    Args:
+        line: One NDJSON line
+
+    Returns:
+        Tuple of (text or None, the decoded chunk if the line was decoded)
+    """
+    if orjson is None and b'"done":false' in line:
+        for key in _CONTENT_KEYS:
+            start = line.find(key)
+            if start != -1:
+                start += len(key)
+                end = _string_end(line, start)
+                if end == -1:
+                    break
+                raw = line[start:end]
+                if b"\\" in raw:
+                    return loads(line[start - 1:end + 1]), None
+                return raw.decode(), None
+    chunk = loads(line)
+    return chunk_content(chunk), chunk
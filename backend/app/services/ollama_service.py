@@ -1,23 +1,427 @@
 """
-Service for interacting with Ollama instance.
+Service for interacting with Ollama instances.
 """
+import asyncio
 import httpx
-import json
-from typing import List, Dict, Any, AsyncGenerator
+import logging
+import time
+from contextlib import aclosing, asynccontextmanager
+from typing import List, Dict, Any, AsyncGenerator, Iterable, Optional, Set, Union
 from app.config import settings
 from app.models.schemas import Model, ModelInfo, GenerateRequest, MessageSchema
+from app.services.shared_state import shared_state
+from app.services.ttl_cache import AsyncTTLCache
+from app.services.response_cache import response_cache
+from app.services import ndjson
+from app.services.metrics import UPSTREAM_ERRORS, OTHER_MODEL
+
+logger = logging.getLogger(__name__)
+
+MODEL_LIST_CACHE_KEY = "models:list"
+
+
+def normalize_keep_alive(value: Optional[Union[int, str]]) -> Optional[Union[int, str]]:
+    """
+    Convert a keep_alive value to the form Ollama accepts.
+    
+    Ollama reads numbers as seconds and strings as Go durations, so "-1"
+    or "300" from settings must be sent as numbers.
+    
+    Args:
+        value: Number of seconds, duration string such as "10m", or None
+    
+    Returns:
+        Value for the keep_alive field, or None to omit it
+    """
+    if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+        return int(value)
+    return value
+
+
+class OllamaBackend:
+    """One Ollama instance with its health and load state."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.in_flight = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.loaded_models: Set[str] = set()  # From /api/ps and served requests
+        self.available_models: Set[str] = set()  # From /api/tags
+
+    @property
+    def healthy(self) -> bool:
+        """False while ejected after repeated failures."""
+        return time.monotonic() >= self.ejected_until
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "failures": self.failures,
+            "loaded_models": sorted(self.loaded_models),
+        }
+
+
+class BackendPool:
+    """
+    Routes requests across Ollama instances.
+    
+    Picks the node with the fewest outstanding requests, preferring nodes
+    that already have the model loaded, then nodes that have it pulled.
+    A node failing failure_threshold times in a row is ejected for
+    eject_seconds; afterwards the next request or health poll acts as a
+    probe and a success puts it back.
+    """
+
+    def __init__(self, urls: Iterable[str], failure_threshold: int = 3, eject_seconds: float = 30.0):
+        self.backends = [OllamaBackend(url) for url in urls]
+        if not self.backends:
+            raise ValueError("At least one Ollama URL is required")
+        self.failure_threshold = failure_threshold
+        self.eject_seconds = eject_seconds
+        self._rotation = 0
+
+    def select(self, model: Optional[str] = None, exclude: Iterable[OllamaBackend] = ()) -> OllamaBackend:
+        """
+        Choose a backend for a request.
+        
+        Args:
+            model: Model the request needs, for affinity
+            exclude: Backends already tried for this request
+        
+        Returns:
+            Selected OllamaBackend
+        
+        Raises:
+            RuntimeError: If every backend was excluded
+        """
+        candidates = [backend for backend in self.backends if backend not in exclude]
+        if not candidates:
+            raise RuntimeError("No Ollama backend available")
+        # With every node ejected, trying one beats failing outright
+        candidates = [backend for backend in candidates if backend.healthy] or candidates
+        
+        # Rotate so ties are spread round-robin
+        self._rotation = (self._rotation + 1) % len(candidates)
+        candidates = candidates[self._rotation:] + candidates[:self._rotation]
+        
+        def rank(backend: OllamaBackend):
+            affinity = 0
+            if model:
+                if model in backend.loaded_models:
+                    affinity = -2
+                elif model in backend.available_models:
+                    affinity = -1
+            return (affinity, backend.in_flight)
+        
+        return min(candidates, key=rank)
+
+    def select_free(self, model: str, full: Iterable[OllamaBackend]) -> Optional[OllamaBackend]:
+        """
+        Choose the backend to admit a generation onto.
+        
+        Args:
+            model: Model the generation needs
+            full: Backends with no admission slot left for the model
+        
+        Returns:
+            Selected OllamaBackend, or None if every backend is full
+        """
+        full = list(full)
+        if len(full) == len(self.backends):
+            return None
+        return self.select(model, exclude=full)
+
+    @asynccontextmanager
+    async def lease(self, backend: OllamaBackend):
+        """Count a request as outstanding on a backend while it runs."""
+        backend.in_flight += 1
+        try:
+            yield backend
+        finally:
+            backend.in_flight -= 1
+
+    def record_success(self, backend: OllamaBackend, model: Optional[str] = None) -> None:
+        if not backend.healthy or backend.failures:
+            logger.info(f"Ollama backend {backend.url} is healthy again")
+        backend.failures = 0
+        backend.ejected_until = 0.0
+        if model:
+            # Serving a request loads the model on that node
+            backend.loaded_models.add(model)
+
+    def record_failure(self, backend: OllamaBackend) -> None:
+        backend.failures += 1
+        if backend.failures >= self.failure_threshold:
+            backend.ejected_until = time.monotonic() + self.eject_seconds
+            logger.warning(
+                f"Ejecting Ollama backend {backend.url} for {self.eject_seconds}s "
+                f"after {backend.failures} failures"
+            )
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [backend.to_dict() for backend in self.backends]
 
 
 class OllamaService:
     """Service for Ollama API operations."""
 
     def __init__(self):
-        self.base_url = settings.OLLAMA_BASE_URL
+        self.pool = BackendPool(
+            settings.OLLAMA_BASE_URLS or [settings.OLLAMA_BASE_URL],
+            failure_threshold=settings.OLLAMA_FAILURE_THRESHOLD,
+            eject_seconds=settings.OLLAMA_EJECT_SECONDS,
+        )
+        self.base_url = self.pool.backends[0].url
         self.timeout = settings.OLLAMA_TIMEOUT
+        self._client: Optional[httpx.AsyncClient] = None
+        # Local layer in front of the shared cache; coalesces concurrent lookups
+        self.model_cache = AsyncTTLCache(ttl=settings.MODEL_LIST_CACHE_TTL)
+        # Names in the last loaded model list; bounds the metric label values
+        self.known_models: Set[str] = set()
+        self._health_task: Optional[asyncio.Task] = None
+        self._preload_task: Optional[asyncio.Task] = None
+
+        # Metadata calls (tags, show, delete) are short and bounded
+        self.request_timeout = httpx.Timeout(
+            self.timeout,
+            connect=settings.OLLAMA_CONNECT_TIMEOUT,
+            pool=settings.OLLAMA_POOL_TIMEOUT,
+        )
+        # Generations and pulls may run for minutes, only connecting is bounded
+        self.stream_timeout = httpx.Timeout(
+            settings.OLLAMA_STREAM_READ_TIMEOUT,
+            connect=settings.OLLAMA_CONNECT_TIMEOUT,
+            pool=settings.OLLAMA_POOL_TIMEOUT,
+        )
+
+    async def start(self) -> None:
+        """Create the shared HTTP client and start health polling (called from the app lifespan)."""
+        if self._client is None:
+            self._client = self._create_client()
+            logger.info(
+                f"Ollama client started: backends={[b.url for b in self.pool.backends]}, "
+                f"max_connections={settings.OLLAMA_MAX_CONNECTIONS}, http2={settings.OLLAMA_HTTP2}"
+            )
+        if self._health_task is None and settings.OLLAMA_HEALTH_INTERVAL > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+        if self._preload_task is None and settings.OLLAMA_PRELOAD_MODELS:
+            # In the background: loading can take minutes and must not delay startup
+            self._preload_task = asyncio.create_task(self.preload_models(settings.OLLAMA_PRELOAD_MODELS))
+
+    async def close(self) -> None:
+        """Stop background tasks and close the shared HTTP client."""
+        for task in (self._health_task, self._preload_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._health_task = None
+        self._preload_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("Ollama client closed")
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Shared HTTP client with pooled keep-alive connections.
+        
+        Created lazily so the service also works outside the app lifespan
+        (scripts, benchmarks).
+        """
+        if self._client is None:
+            self._client = self._create_client()
+        return self._client
+
+    def _create_client(self) -> httpx.AsyncClient:
+        """Build the pooled HTTP client from settings."""
+        limits = httpx.Limits(
+            max_connections=settings.OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.OLLAMA_KEEPALIVE_EXPIRY,
+        )
+        return httpx.AsyncClient(
+            timeout=self.request_timeout,
+            limits=limits,
+            http2=settings.OLLAMA_HTTP2,
+        )
+
+    async def _health_loop(self) -> None:
+        """Poll /api/ps on every backend for loaded models and liveness."""
+        while True:
+            try:
+                await asyncio.gather(*(self._poll_backend(b) for b in self.pool.backends))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Keep polling: ejected backends only come back through this loop
+                logger.error("Ollama health poll failed", exc_info=True)
+            await asyncio.sleep(settings.OLLAMA_HEALTH_INTERVAL)
+
+    async def _poll_backend(self, backend: OllamaBackend) -> Optional[List[Dict[str, Any]]]:
+        """Fetch the models loaded on a backend; None if it did not answer."""
+        try:
+            response = await self.client.get(f"{backend.url}/api/ps")
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.debug(f"Health poll of {backend.url} failed: {str(e)}")
+            self.pool.record_failure(backend)
+            return None
+        try:
+            running = response.json().get("models", [])
+            loaded_models = {model["name"] for model in running}
+        except Exception:
+            # Not Ollama's answer, e.g. a proxy error page
+            logger.warning(f"Health poll of {backend.url} returned an unexpected body", exc_info=True)
+            self.pool.record_failure(backend)
+            return None
+        backend.loaded_models = loaded_models
+        self.pool.record_success(backend)
+        return running
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        model: Optional[str] = None,
+        backend: Optional[OllamaBackend] = None,
+        prefer: Optional[OllamaBackend] = None,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        Send a request to a backend chosen by the pool.
+        
+        Connection failures fail over to the next backend. 5xx responses
+        count against the node but are not retried.
+        
+        Args:
+            method: HTTP method
+            path: API path, e.g. "/api/show"
+            model: Model the request needs, for routing
+            backend: Send to this backend instead of choosing one
+            prefer: Try this backend first, then fail over as usual
+            **kwargs: Passed to httpx (json, timeout)
+        
+        Returns:
+            Successful httpx.Response
+        """
+        tried: List[OllamaBackend] = []
+        while True:
+            target = backend or (prefer if prefer and not tried else self.pool.select(model, exclude=tried))
+            async with self.pool.lease(target):
+                try:
+                    response = await self.client.request(method, f"{target.url}{path}", **kwargs)
+                except httpx.TransportError as e:
+                    self._record_error(target, model, e)
+                    tried.append(target)
+                    if backend or len(tried) == len(self.pool.backends):
+                        raise
+                    continue
+            if response.status_code >= 500:
+                self._record_error(target, model)
+            else:
+                self.pool.record_success(target, model)
+            response.raise_for_status()
+            return response
+
+    async def _stream_lines(
+        self,
+        path: str,
+        payload: Dict[str, Any],
+        model: Optional[str] = None,
+        prefer: Optional[OllamaBackend] = None
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Stream raw NDJSON lines from a backend chosen by the pool.
+        
+        Fails over to the next backend only if connecting fails, never
+        once data has been yielded. The backend counts as busy until the
+        stream is closed.
+        
+        Args:
+            path: API path, e.g. "/api/chat"
+            payload: JSON body
+            model: Model the request needs, for routing
+            prefer: Try this backend first, then fail over as usual
+        
+        Yields:
+            Non-empty lines as bytes, without the newline
+        """
+        tried: List[OllamaBackend] = []
+        while True:
+            backend = prefer if prefer and not tried else self.pool.select(model, exclude=tried)
+            async with self.pool.lease(backend):
+                try:
+                    async with self.client.stream(
+                        "POST",
+                        f"{backend.url}{path}",
+                        json=payload,
+                        timeout=self.stream_timeout
+                    ) as response:
+                        if response.status_code >= 500:
+                            self._record_error(backend, model)
+                        response.raise_for_status()
+                        self.pool.record_success(backend, model)
+                        # Split bytes ourselves; no text decoding needed to relay
+                        pending = b""
+                        async for data in response.aiter_bytes():
+                            lines = (pending + data).split(b"\n")
+                            pending = lines.pop()
+                            for line in lines:
+                                if line:
+                                    yield line
+                        if pending.strip():
+                            yield pending
+                    return
+                except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                    self._record_error(backend, model, e)
+                    tried.append(backend)
+                    if len(tried) == len(self.pool.backends):
+                        raise
+                except httpx.TransportError as e:
+                    self._record_error(backend, model, e)
+                    raise
+
+    def _record_error(
+        self,
+        backend: OllamaBackend,
+        model: Optional[str],
+        error: Optional[Exception] = None
+    ) -> None:
+        """Count a failed request against the backend and in the metrics."""
+        self.pool.record_failure(backend)
+        if error is None:
+            kind = "http_5xx"
+        elif isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)):
+            kind = "connect"
+        else:
+            kind = "transport"
+        UPSTREAM_ERRORS.inc(backend=backend.url, model=self._model_label(model) if model else "", kind=kind)
+
+    async def _stream(
+        self,
+        path: str,
+        payload: Dict[str, Any],
+        model: Optional[str] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Stream decoded NDJSON chunks; see _stream_lines()."""
+        async with aclosing(self._stream_lines(path, payload, model)) as lines:
+            async for line in lines:
+                yield ndjson.loads(line)
 
     async def list_models(self) -> List[Model]:
         """
-        Get list of available models from Ollama.
+        Get list of available models from all Ollama backends.
+        
+        The list is cached in this process and in the shared state backend
+        for MODEL_LIST_CACHE_TTL seconds, so all workers share one copy;
+        concurrent misses make a single upstream call.
         
         Returns:
             List of Model objects
@@ -25,29 +429,96 @@ class OllamaService:
         Raises:
             httpx.HTTPError: If Ollama is not reachable
         """
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(f"{self.base_url}/api/tags")
-            response.raise_for_status()
-            data = response.json()
-            return [Model(**model) for model in data.get("models", [])]
+        return await self.model_cache.get_or_load(MODEL_LIST_CACHE_KEY, self._load_models)
+
+    async def _load_models(self) -> List[Model]:
+        cached = await shared_state.get(MODEL_LIST_CACHE_KEY)
+        if cached is not None:
+            self.known_models = {model["name"] for model in cached}
+            return [Model(**model) for model in cached]
+        
+        # Union of the models pulled on every backend
+        responses = await asyncio.gather(
+            *(self._request("GET", "/api/tags", backend=b) for b in self.pool.backends),
+            return_exceptions=True
+        )
+        models: Dict[str, Dict[str, Any]] = {}
+        errors = []
+        for backend, response in zip(self.pool.backends, responses):
+            if isinstance(response, Exception):
+                errors.append(response)
+                continue
+            backend_models = response.json().get("models", [])
+            backend.available_models = {model["name"] for model in backend_models}
+            for model in backend_models:
+                models.setdefault(model["name"], model)
+        if len(errors) == len(responses):
+            raise errors[0]
+        
+        models_list = list(models.values())
+        self.known_models = set(models)
+        await shared_state.set(MODEL_LIST_CACHE_KEY, models_list, ttl=settings.MODEL_LIST_CACHE_TTL)
+        return [Model(**model) for model in models_list]
+
+    async def model_label(self, name: str) -> str:
+        """
+        Get the value to label a model's metrics with.
+        
+        Model names come from clients, so only models in the model list
+        become label values; anything else is counted as "other", keeping
+        the number of label sets bounded.
+        
+        Args:
+            name: Model name from a request
+        
+        Returns:
+            The model's name in the model list, or "other"
+        """
+        try:
+            await self.list_models()
+        except Exception as e:
+            # Judge by the last loaded list; the generation reports the error
+            logger.debug(f"Model list unavailable for metric labels: {str(e)}")
+        return self._model_label(name)
+
+    def _model_label(self, name: str) -> str:
+        if name in self.known_models:
+            return name
+        # Ollama resolves an untagged name to its latest tag
+        if ":" not in name and f"{name}:latest" in self.known_models:
+            return f"{name}:latest"
+        return OTHER_MODEL
+
+    async def invalidate_model_list(self, name: Optional[str] = None) -> None:
+        """
+        Drop the cached model list after models were added or removed.
+        
+        Args:
+            name: Also drop the cached info of this model
+        """
+        self.model_cache.invalidate(MODEL_LIST_CACHE_KEY)
+        if name:
+            self.model_cache.invalidate(("info", name))
+        await shared_state.delete(MODEL_LIST_CACHE_KEY)
 
     async def get_model_info(self, name: str) -> ModelInfo:
         """
         Get detailed information about a model.
         
+        Cached for MODEL_INFO_CACHE_TTL seconds; it only changes when the
+        model is pulled again or deleted, which invalidates it.
+        
         Args:
             name: Model name (e.g., "llama2:latest")
         
         Returns:
             ModelInfo object
         """
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(
-                f"{self.base_url}/api/show",
-                json={"name": name}
-            )
-            response.raise_for_status()
+        async def load() -> ModelInfo:
+            response = await self._request("POST", "/api/show", model=name, json={"name": name})
             return ModelInfo(**response.json())
+        
+        return await self.model_cache.get_or_load(("info", name), load, ttl=settings.MODEL_INFO_CACHE_TTL)
 
     async def download_model(self, name: str) -> AsyncGenerator[Dict[str, Any], None]:
         """
@@ -59,145 +530,304 @@ class OllamaService:
         Yields:
             Progress updates as dicts
         """
-        async with httpx.AsyncClient(timeout=None) as client:
-            async with client.stream(
-                "POST",
-                f"{self.base_url}/api/pull",
-                json={"name": name}
-            ) as response:
-                response.raise_for_status()
-                async for line in response.aiter_lines():
-                    if line:
-                        yield json.loads(line)
+        # Pulled onto the least busy backend
+        async for progress in self._stream("/api/pull", {"name": name}):
+            if progress.get("status") == "success":
+                await self.invalidate_model_list(name)
+            yield progress
 
     async def delete_model(self, name: str) -> bool:
         """
-        Delete a model from Ollama.
+        Delete a model from every Ollama backend that has it.
         
         Args:
             name: Model name to delete
         
         Returns:
             True if successful
+        
+        Raises:
+            httpx.HTTPError: If no backend deleted the model
         """
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.delete(
-                f"{self.base_url}/api/delete",
-                json={"name": name}
-            )
-            response.raise_for_status()
-            return True
+        responses = await asyncio.gather(
+            *(
+                self._request("DELETE", "/api/delete", backend=b, json={"name": name})
+                for b in self.pool.backends
+            ),
+            return_exceptions=True
+        )
+        await self.invalidate_model_list(name)
+        
+        errors = [r for r in responses if isinstance(r, Exception)]
+        if len(errors) == len(responses):
+            raise errors[0]
+        for backend in self.pool.backends:
+            backend.available_models.discard(name)
+            backend.loaded_models.discard(name)
+        return True
+
+    async def list_running(self) -> List[Dict[str, Any]]:
+        """
+        Get the models loaded in memory on every backend (Ollama's /api/ps).
+        
+        Returns:
+            Running model dicts, each with the URL of its backend added
+        """
+        results = await asyncio.gather(*(self._poll_backend(b) for b in self.pool.backends))
+        running = []
+        for backend, models in zip(self.pool.backends, results):
+            for model in models or []:
+                running.append({**model, "backend": backend.url})
+        return running
+
+    async def load_model(self, name: str, keep_alive: Optional[Union[int, str]] = None) -> Dict[str, Any]:
+        """
+        Load a model into memory without generating anything.
+        
+        The model is loaded on the backend requests for it are routed to,
+        so the next generation does not pay the load time.
+        
+        Args:
+            name: Model name
+            keep_alive: How long to keep it loaded; None = OLLAMA_PRELOAD_KEEP_ALIVE
+        
+        Returns:
+            Model name, backend URL and Ollama's load_duration (ns)
+        """
+        if keep_alive is None:
+            keep_alive = settings.OLLAMA_PRELOAD_KEEP_ALIVE
+        backend = self.pool.select(name)
+        response = await self._request(
+            "POST",
+            "/api/generate",
+            model=name,
+            backend=backend,
+            json={"model": name, "keep_alive": normalize_keep_alive(keep_alive)},
+            timeout=self.stream_timeout
+        )
+        result = response.json()
+        logger.info(f"Loaded model {name} on {backend.url}")
+        return {"model": name, "backend": backend.url, "load_duration": result.get("load_duration")}
+
+    async def unload_model(self, name: str) -> List[str]:
+        """
+        Unload a model from every backend that has it in memory.
+        
+        Args:
+            name: Model name
+        
+        Returns:
+            URLs of the backends the model was unloaded from
+        """
+        # Refresh first: keep_alive 0 on a node without the model would load it
+        await self.list_running()
+        backends = [b for b in self.pool.backends if name in b.loaded_models]
+        await asyncio.gather(*(
+            self._request("POST", "/api/generate", backend=b, json={"model": name, "keep_alive": 0})
+            for b in backends
+        ))
+        for backend in backends:
+            backend.loaded_models.discard(name)
+        logger.info(f"Unloaded model {name} from {[b.url for b in backends]}")
+        return [b.url for b in backends]
 
-    async def generate(self, request: GenerateRequest) -> Dict[str, Any]:
+    async def preload_models(self, names: List[str]) -> None:
+        """
+        Load models one after another, logging failures.
+        
+        Args:
+            names: Model names
+        """
+        for name in names:
+            try:
+                await self.load_model(name)
+            except Exception as e:
+                logger.warning(f"Failed to preload model {name}: {str(e)}")
+
+    async def embed(self, model: str, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts with an embedding model (Ollama's /api/embed).
+
+        Texts longer than the model's context are truncated by Ollama.
+
+        Args:
+            model: Embedding model name
+            texts: Texts to embed in one request
+
+        Returns:
+            One vector per text, in order
+        """
+        response = await self._request(
+            "POST",
+            "/api/embed",
+            model=model,
+            json={"model": model, "input": texts, "truncate": True},
+            timeout=self.stream_timeout
+        )
+        return response.json()["embeddings"]
+
+    async def generate(self, request: GenerateRequest, backend: Optional[OllamaBackend] = None) -> Dict[str, Any]:
         """
         Generate text using the generate endpoint.
         
         Args:
             request: GenerateRequest object
+            backend: Backend the generation was admitted onto, tried first
         
         Returns:
             Response dict from Ollama
         """
-        # Get the last message as prompt
-        prompt = request.messages[-1].content if request.messages else ""
-        
-        payload = {
-            "model": request.model,
-            "prompt": prompt,
-            "options": self._build_options(request.parameters),
-            "stream": False
-        }
-        
-        async with httpx.AsyncClient(timeout=None) as client:
-            response = await client.post(
-                f"{self.base_url}/api/generate",
-                json=payload
-            )
-            response.raise_for_status()
-            return response.json()
+        return await self._complete(
+            "/api/generate", request, self._build_payload("/api/generate", request, stream=False), backend
+        )
 
-    async def stream_generate(self, request: GenerateRequest) -> AsyncGenerator[Dict[str, Any], None]:
+    async def stream_generate(
+        self,
+        request: GenerateRequest,
+        backend: Optional[OllamaBackend] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
         """
         Stream text generation.
         
         Args:
             request: GenerateRequest object
+            backend: Backend the generation was admitted onto, tried first
         
         Yields:
             Response chunks as dicts
         """
-        prompt = request.messages[-1].content if request.messages else ""
-        
-        payload = {
-            "model": request.model,
-            "prompt": prompt,
-            "options": self._build_options(request.parameters),
-            "stream": True
-        }
-        
-        async with httpx.AsyncClient(timeout=None) as client:
-            async with client.stream(
-                "POST",
-                f"{self.base_url}/api/generate",
-                json=payload
-            ) as response:
-                response.raise_for_status()
-                async for line in response.aiter_lines():
-                    if line:
-                        yield json.loads(line)
+        async with aclosing(self._relay_lines("/api/generate", request, backend)) as lines:
+            async for line in lines:
+                yield ndjson.loads(line)
 
-    async def chat(self, request: GenerateRequest) -> Dict[str, Any]:
+    async def chat(self, request: GenerateRequest, backend: Optional[OllamaBackend] = None) -> Dict[str, Any]:
         """
         Chat using the chat endpoint.
         
         Args:
             request: GenerateRequest object
+            backend: Backend the generation was admitted onto, tried first
         
         Returns:
             Response dict from Ollama
         """
-        payload = {
-            "model": request.model,
-            "messages": [{"role": msg.role, "content": msg.content} for msg in request.messages],
-            "options": self._build_options(request.parameters),
-            "stream": False
-        }
-        
-        async with httpx.AsyncClient(timeout=None) as client:
-            response = await client.post(
-                f"{self.base_url}/api/chat",
-                json=payload
-            )
-            response.raise_for_status()
-            return response.json()
+        return await self._complete(
+            "/api/chat", request, self._build_payload("/api/chat", request, stream=False), backend
+        )
 
-    async def stream_chat(self, request: GenerateRequest) -> AsyncGenerator[Dict[str, Any], None]:
+    async def stream_chat(
+        self,
+        request: GenerateRequest,
+        backend: Optional[OllamaBackend] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
         """
         Stream chat responses.
         
         Args:
             request: GenerateRequest object
+            backend: Backend the generation was admitted onto, tried first
         
         Yields:
             Message chunks as dicts
         """
-        payload = {
-            "model": request.model,
-            "messages": [{"role": msg.role, "content": msg.content} for msg in request.messages],
-            "options": self._build_options(request.parameters),
-            "stream": True
-        }
+        async with aclosing(self._relay_lines("/api/chat", request, backend)) as lines:
+            async for line in lines:
+                yield ndjson.loads(line)
+
+    def stream_lines(
+        self,
+        request: GenerateRequest,
+        backend: Optional[OllamaBackend] = None
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Stream a chat or generate response as raw NDJSON lines.
         
-        async with httpx.AsyncClient(timeout=None) as client:
-            async with client.stream(
-                "POST",
-                f"{self.base_url}/api/chat",
-                json=payload
-            ) as response:
-                response.raise_for_status()
-                async for line in response.aiter_lines():
-                    if line:
-                        yield json.loads(line)
+        Lines are Ollama's own bytes, for relaying to clients without
+        re-encoding. Cached streams are replayed without delay, with
+        "cached": true added to every chunk.
+        
+        Args:
+            request: GenerateRequest object (endpoint_type picks the endpoint)
+            backend: Backend the generation was admitted onto, tried first
+        
+        Yields:
+            NDJSON lines as bytes, without the newline
+        """
+        path = "/api/chat" if request.endpoint_type == "chat" else "/api/generate"
+        return self._relay_lines(path, request, backend)
+
+    async def _relay_lines(
+        self,
+        path: str,
+        request: GenerateRequest,
+        backend: Optional[OllamaBackend] = None
+    ) -> AsyncGenerator[bytes, None]:
+        """Stream raw lines of a generation, through the response cache."""
+        payload = self._build_payload(path, request, stream=True)
+        
+        key = response_cache.key_for(request, path, payload)
+        if key:
+            cached = await response_cache.get(key)
+            if cached is not None:
+                # Marked so callers keep replayed timings out of metrics and stats
+                for chunk in cached:
+                    yield ndjson.dumps_line({**chunk, "cached": True})[:-1]
+                return
+        
+        chunks = []
+        # aclosing: closing this generator closes the upstream response at once
+        async with aclosing(self._stream_lines(path, payload, model=request.model, prefer=backend)) as lines:
+            async for line in lines:
+                if key:
+                    chunks.append(ndjson.loads(line))
+                yield line
+        # Only complete streams are worth replaying
+        if key and chunks and chunks[-1].get("done"):
+            await response_cache.set(key, chunks)
+
+    async def _complete(
+        self,
+        path: str,
+        request: GenerateRequest,
+        payload: Dict[str, Any],
+        backend: Optional[OllamaBackend] = None
+    ) -> Dict[str, Any]:
+        """Run a non-streaming generation, answering from the response cache when possible."""
+        key = response_cache.key_for(request, path, payload)
+        if key:
+            cached = await response_cache.get(key)
+            if cached is not None:
+                return {**cached, "cached": True}
+        
+        response = await self._request(
+            "POST",
+            path,
+            model=request.model,
+            prefer=backend,
+            json=payload,
+            timeout=self.stream_timeout
+        )
+        result = response.json()
+        if key:
+            await response_cache.set(key, result)
+        return result
+
+    def _build_payload(self, path: str, request: GenerateRequest, stream: bool) -> Dict[str, Any]:
+        """Build the Ollama request body for /api/chat or /api/generate."""
+        payload = {"model": request.model}
+        if path == "/api/chat":
+            payload["messages"] = [{"role": msg.role, "content": msg.content} for msg in request.messages]
+        else:
+            # Get the last message as prompt
+            payload["prompt"] = request.messages[-1].content if request.messages else ""
+        payload["options"] = self._build_options(request.parameters)
+        payload["stream"] = stream
+        keep_alive = request.parameters.keep_alive
+        if keep_alive is None:
+            keep_alive = settings.OLLAMA_KEEP_ALIVE
+        if keep_alive is not None:
+            payload["keep_alive"] = normalize_keep_alive(keep_alive)
+        return payload
 
     def _build_options(self, parameters) -> Dict[str, Any]:
         """Build Ollama options from parameters."""
@@ -0,0 +1,195 @@
+"""
+Cache of Ollama responses for deterministic generations.
+
+A generation is deterministic when a seed is set and the temperature is 0;
+the same model, messages and options then always produce the same output.
+Responses are kept in an in-memory LRU and optionally on disk, so batch
+jobs that repeat prompts skip the model entirely.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Two-tier (memory, disk) cache of generation results.
+
+    Values are JSON: the response dict for non-streaming calls, the list of
+    chunks for streaming calls. Entries expire after ttl seconds; the memory
+    tier evicts least recently used entries past max_entries.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        max_entries: int = 1000,
+        ttl: float = 86400.0,
+        directory: Optional[str] = None,
+        disk_max_entries: int = 10000
+    ):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = directory
+        self.disk_max_entries = disk_max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._disk_writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def key_for(self, request, path: str, payload: Dict[str, Any]) -> Optional[str]:
+        """
+        Get the cache key of a generation, or None if it is not cacheable.
+
+        Args:
+            request: GenerateRequest (for the parameters)
+            path: Ollama API path the payload is sent to
+            payload: Request body sent to Ollama
+
+        Returns:
+            Hex digest of the normalized payload, or None
+        """
+        parameters = request.parameters
+        if not self.enabled or parameters.seed is None or parameters.temperature != 0:
+            return None
+        # keep_alive only affects residency, not the output
+        body = {k: v for k, v in payload.items() if k != "keep_alive"}
+        normalized = json.dumps({"path": path, **body}, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Key from key_for()
+
+        Returns:
+            Cached value, or None on a miss
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        if self.directory:
+            value = await asyncio.to_thread(self._read_disk, key)
+            if value is not None:
+                self._remember(key, value)
+                self.hits += 1
+                self.disk_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any) -> None:
+        """
+        Store a response in memory and, if configured, on disk.
+
+        Args:
+            key: Key from key_for()
+            value: Response dict or list of stream chunks
+        """
+        self._remember(key, value)
+        self.stores += 1
+        if self.directory:
+            try:
+                await asyncio.to_thread(self._write_disk, key, value)
+            except OSError as e:
+                logger.warning(f"Failed to write response cache entry: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and sizes."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _remember(self, key: str, value: Any) -> None:
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            if os.path.getmtime(path) + self.ttl < time.time():
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, value: Any) -> None:
+        path = self._path(key)
+        # Write then rename so readers in other workers never see partial files
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+        self._disk_writes += 1
+        if self._disk_writes % 100 == 0:
+            self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """Remove expired files and the oldest ones past disk_max_entries."""
+        now = time.time()
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    mtime = entry.stat().st_mtime
+                    if mtime + self.ttl < now:
+                        os.remove(entry.path)
+                    else:
+                        files.append((mtime, entry.path))
+                except FileNotFoundError:
+                    pass  # Removed by another worker
+        files.sort()
+        for _, path in files[:max(0, len(files) - self.disk_max_entries)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+# Singleton instance
+response_cache = ResponseCache(
+    enabled=settings.RESPONSE_CACHE_ENABLED,
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl=settings.RESPONSE_CACHE_TTL,
+    directory=settings.RESPONSE_CACHE_DIR,
+    disk_max_entries=settings.RESPONSE_CACHE_DISK_MAX_ENTRIES,
+)
@@ -0,0 +1,281 @@
+"""
+Admission control for generations sent to Ollama.
+"""
+import asyncio
+import itertools
+import logging
+from collections import OrderedDict, deque
+from typing import Any, AsyncGenerator, Callable, Collection, Deque, Dict, List, Optional
+from app.config import settings
+from app.services.ollama_service import ollama_service
+from app.services.metrics import registry, CallbackGauge
+
+logger = logging.getLogger(__name__)
+
+# Served strictly in this order
+PRIORITIES = ("interactive", "batch")
+
+# Backend key when the scheduler is not told about backends
+DEFAULT_BACKEND = "default"
+
+# Chooses the backend for an admitted request among those not yet full for
+# the model, or returns None when every backend is full
+BackendSelector = Callable[[str, Collection[Any]], Optional[Any]]
+
+
+def single_backend(model: str, full: Collection[Any]) -> Optional[Any]:
+    """Selector for one backend."""
+    return None if DEFAULT_BACKEND in full else DEFAULT_BACKEND
+
+
+class QueueFullError(Exception):
+    """Raised when a model's queue is at SCHEDULER_MAX_QUEUE_DEPTH."""
+
+
+class Ticket:
+    """A generation waiting for, or holding, a slot of its model on a backend."""
+
+    def __init__(self, model: str, session_key: str, priority: str):
+        self.model = model
+        self.session_key = session_key
+        self.priority = priority
+        self.position = 0  # 1-based place in the queue, 0 once admitted
+        self.granted = False
+        self.backend: Optional[Any] = None  # Where the slot is, once admitted
+        self.released = False
+        self._changed = asyncio.Event()
+
+    async def positions(self) -> AsyncGenerator[int, None]:
+        """Yield the queue position whenever it changes, until admitted."""
+        self._changed.clear()
+        while not self.granted:
+            yield self.position
+            await self._changed.wait()
+            self._changed.clear()
+
+    async def wait(self) -> None:
+        """Wait until admitted."""
+        async for _ in self.positions():
+            pass
+
+    def _notify(self) -> None:
+        self._changed.set()
+
+
+class ModelQueue:
+    """Slots and waiting tickets of one model."""
+
+    def __init__(self, model: str):
+        self.model = model
+        # Admitted tickets per backend
+        self.slots: Dict[Any, int] = {}
+        # priority -> session -> tickets; OrderedDict order is the round-robin turn
+        self.waiting: Dict[str, "OrderedDict[str, Deque[Ticket]]"] = {
+            priority: OrderedDict() for priority in PRIORITIES
+        }
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self.slots.values())
+
+    @property
+    def depth(self) -> int:
+        return sum(len(tickets) for sessions in self.waiting.values() for tickets in sessions.values())
+
+    def push(self, ticket: Ticket) -> None:
+        self.waiting[ticket.priority].setdefault(ticket.session_key, deque()).append(ticket)
+
+    def pop(self) -> Optional[Ticket]:
+        """Take the next ticket: highest priority first, round-robin over sessions."""
+        for priority in PRIORITIES:
+            sessions = self.waiting[priority]
+            if sessions:
+                session_key, tickets = next(iter(sessions.items()))
+                ticket = tickets.popleft()
+                # The session goes to the back of the line
+                del sessions[session_key]
+                if tickets:
+                    sessions[session_key] = tickets
+                return ticket
+        return None
+
+    def remove(self, ticket: Ticket) -> None:
+        sessions = self.waiting[ticket.priority]
+        tickets = sessions.get(ticket.session_key)
+        if tickets and ticket in tickets:
+            tickets.remove(ticket)
+            if not tickets:
+                del sessions[ticket.session_key]
+
+    def order(self) -> List[Ticket]:
+        """Waiting tickets in the order they will be admitted."""
+        ordered = []
+        for priority in PRIORITIES:
+            # Interleave sessions: first of each, then second of each...
+            for round_ in itertools.zip_longest(*self.waiting[priority].values()):
+                ordered.extend(ticket for ticket in round_ if ticket is not None)
+        return ordered
+
+
+class AdmissionScheduler:
+    """
+    Bound the generations running against Ollama.
+
+    Each model gets max_in_flight slots on each Ollama backend. A request is
+    admitted onto a backend chosen by select_backend among those with a free
+    slot for its model, and must then be sent to that backend
+    (ticket.backend). Requests beyond that wait in a per-model queue that
+    serves interactive requests before batch ones and takes turns between
+    sessions, so one session sending many requests cannot starve the
+    others. Once max_queue_depth requests are waiting, new ones are
+    rejected.
+
+    Limits apply per worker process.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 4,
+        max_queue_depth: int = 64,
+        select_backend: BackendSelector = single_backend
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue_depth = max_queue_depth
+        self.select_backend = select_backend
+        self._queues: Dict[str, ModelQueue] = {}
+        self._anonymous = itertools.count()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_in_flight > 0
+
+    def _full(self, queue: ModelQueue) -> List[Any]:
+        return [backend for backend, count in queue.slots.items() if count >= self.max_in_flight]
+
+    def check(self, model: str) -> None:
+        """
+        Reject early if a new request for the model would not fit.
+
+        Raises:
+            QueueFullError: If the model's queue is full
+        """
+        queue = self._queues.get(model)
+        if (
+            self.enabled
+            and queue is not None
+            and queue.depth >= self.max_queue_depth
+            and self.select_backend(model, self._full(queue)) is None
+        ):
+            raise QueueFullError(f"Too many queued requests for {model}")
+
+    def enqueue(self, model: str, session_id: Optional[str] = None, priority: str = "interactive") -> Ticket:
+        """
+        Ask for a slot of a model.
+
+        The ticket is admitted immediately when a slot is free; otherwise
+        wait with ticket.wait() or ticket.positions(). Every ticket must be
+        passed to release().
+
+        Args:
+            model: Model name
+            session_id: Session the request belongs to, for fairness
+            priority: "interactive" or "batch"
+
+        Returns:
+            Ticket
+
+        Raises:
+            QueueFullError: If the model's queue is full
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        session_key = session_id or f"anonymous-{next(self._anonymous)}"
+        ticket = Ticket(model, session_key, priority)
+        if not self.enabled:
+            ticket.granted = True
+            return ticket
+
+        self.check(model)
+        queue = self._queues.get(model)
+        if queue is None:
+            queue = self._queues[model] = ModelQueue(model)
+        queue.push(ticket)
+        self._dispatch(queue)
+        return ticket
+
+    def release(self, ticket: Ticket) -> None:
+        """
+        Give back a slot, or leave the queue if not admitted yet.
+
+        Safe to call more than once.
+
+        Args:
+            ticket: Ticket from enqueue()
+        """
+        if ticket.released or not self.enabled:
+            return
+        ticket.released = True
+        queue = self._queues.get(ticket.model)
+        if queue is None:
+            return
+        if ticket.granted:
+            queue.slots[ticket.backend] -= 1
+            if not queue.slots[ticket.backend]:
+                del queue.slots[ticket.backend]
+        else:
+            queue.remove(ticket)
+        self._dispatch(queue)
+        if not queue.in_flight and not queue.depth:
+            del self._queues[ticket.model]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """In-flight and queued counts per model, with in-flight counts per backend."""
+        return {
+            model: {
+                "in_flight": queue.in_flight,
+                "queued": queue.depth,
+                "backends": {
+                    getattr(backend, "url", backend): count for backend, count in queue.slots.items()
+                },
+            }
+            for model, queue in self._queues.items()
+        }
+
+    def _dispatch(self, queue: ModelQueue) -> None:
+        """Admit waiting tickets into free slots and update positions."""
+        while queue.depth:
+            backend = self.select_backend(queue.model, self._full(queue))
+            if backend is None:
+                break
+            ticket = queue.pop()
+            queue.slots[backend] = queue.slots.get(backend, 0) + 1
+            ticket.backend = backend
+            ticket.granted = True
+            ticket.position = 0
+            ticket._notify()
+
+        for position, ticket in enumerate(queue.order(), start=1):
+            if ticket.position != position:
+                ticket.position = position
+                ticket._notify()
+
+
+# Singleton instance
+scheduler = AdmissionScheduler(
+    max_in_flight=settings.SCHEDULER_MAX_IN_FLIGHT,
+    max_queue_depth=settings.SCHEDULER_MAX_QUEUE_DEPTH,
+    select_backend=ollama_service.pool.select_free,
+)
+
+registry.register(CallbackGauge(
+    "ollama_generations_in_flight",
+    "Generations holding an admission slot, per model.",
+    lambda: {(model, ): stats["in_flight"] for model, stats in scheduler.stats().items()},
+    ("model",),
+))
+registry.register(CallbackGauge(
+    "ollama_generations_queued",
+    "Generations waiting for an admission slot, per model.",
+    lambda: {(model, ): stats["queued"] for model, stats in scheduler.stats().items()},
+    ("model",),
+))
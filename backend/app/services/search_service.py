@@ -0,0 +1,237 @@
+"""
+Full-text search over message content.
+
+SQLite uses the FTS5 table messages_fts (BM25 ranking, snippet());
+PostgreSQL the GIN-indexed tsvector of messages.content (ts_rank,
+ts_headline). Both are created by migration 0006; on SQLite the index is
+keyed by the ids in messages_fts_ids since migration 0009. rebuild_index()
+re-indexes existing messages.
+"""
+import html
+import logging
+import re
+from datetime import datetime
+from typing import Any, Dict, Optional
+from sqlalchemy import select, func, literal_column, text, bindparam, table, column
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.database import Session, Message
+
+logger = logging.getLogger(__name__)
+
+# Snippet markers, replaced by <mark> tags after the snippet is escaped
+_MARK_START = "\x02"
+_MARK_END = "\x03"
+# Tokens of a snippet (SQLite) or max words of a headline (PostgreSQL)
+SNIPPET_TOKENS = 16
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# FTS5 table created by migration 0006; its rowid is the message's id in
+# messages_fts_ids (migration 0009), which VACUUM does not renumber
+messages_fts = table("messages_fts", column("rowid"))
+messages_fts_ids = table("messages_fts_ids", column("id"), column("message_id"))
+
+
+class SearchQueryError(ValueError):
+    """The search query cannot be parsed."""
+
+
+def plain_query(query: str) -> str:
+    """
+    Turn free text into an FTS5 query matching all of its words.
+
+    Words are quoted, so characters with a meaning in FTS5 syntax
+    (quotes, -, :, *, parentheses) are matched literally.
+
+    Args:
+        query: Text as typed by the user
+
+    Returns:
+        FTS5 query
+    """
+    return " ".join(f'"{word}"' for word in _WORD.findall(query))
+
+
+def highlight(snippet: Optional[str]) -> Optional[str]:
+    """Escape a snippet for HTML and mark the matched terms with <mark>."""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+
+class SearchService:
+    """Ranked full-text search across all sessions."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @property
+    def dialect(self) -> str:
+        return self.db.bind.dialect.name
+
+    async def search(
+        self,
+        query: str,
+        syntax: str = "plain",
+        model: Optional[str] = None,
+        role: Optional[str] = None,
+        session_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Find messages matching a query, best matches first.
+
+        Args:
+            query: Words to find, or a query in the database's own syntax
+            syntax: "plain" (all words must occur) or "advanced" (FTS5
+                query syntax on SQLite, web search syntax on PostgreSQL)
+            model: Only messages of this model (the session's model where
+                the message does not record one)
+            role: Only messages with this role
+            session_id: Only messages of this session
+            since: Only messages at or after this time
+            until: Only messages before this time
+            limit: Page size
+            offset: Matches to skip
+
+        Returns:
+            Dict with results (message_id, session_id, session_name, model,
+            role, timestamp, snippet, score) and has_more
+
+        Raises:
+            SearchQueryError: If the query is invalid
+        """
+        filters = []
+        if model:
+            filters.append(func.coalesce(Message.model, Session.model_name) == model)
+        if role:
+            filters.append(Message.role == role)
+        if session_id:
+            filters.append(Message.session_id == session_id)
+        if since:
+            filters.append(Message.timestamp >= since)
+        if until:
+            filters.append(Message.timestamp < until)
+
+        # One extra row tells whether another page exists
+        if self.dialect == "sqlite":
+            statement = self._sqlite_query(query, syntax, filters, limit + 1, offset)
+        elif self.dialect == "postgresql":
+            statement = self._postgresql_query(query, syntax, filters, limit + 1, offset)
+        else:
+            raise SearchQueryError(f"Full-text search is not available on {self.dialect}")
+        if statement is None:
+            return {"results": [], "has_more": False}
+
+        try:
+            rows = (await self.db.execute(statement)).all()
+        except DBAPIError as e:
+            # FTS5 reports query syntax errors when the statement runs;
+            # plain queries are quoted and cannot cause them
+            if syntax == "advanced" and self.dialect == "sqlite":
+                raise SearchQueryError(f"Invalid search query: {e.orig}")
+            raise
+
+        results = [
+            {
+                "message_id": row.id,
+                "session_id": row.session_id,
+                "session_name": row.name,
+                "model": row.model,
+                "role": row.role,
+                "timestamp": row.timestamp,
+                "snippet": highlight(row.snippet),
+                "score": round(float(row.score), 4),
+            }
+            for row in rows[:limit]
+        ]
+        return {"results": results, "has_more": len(rows) > limit}
+
+    def _columns(self, snippet, score):
+        return select(
+            Message.id,
+            Message.session_id,
+            Session.name,
+            func.coalesce(Message.model, Session.model_name).label("model"),
+            Message.role,
+            Message.timestamp,
+            snippet.label("snippet"),
+            score.label("score"),
+        )
+
+    def _sqlite_query(self, query: str, syntax: str, filters: list, limit: int, offset: int):
+        match = query if syntax == "advanced" else plain_query(query)
+        if not match.strip():
+            return None
+        # bm25() is lower for better matches; negate it into a score
+        rank = literal_column("bm25(messages_fts)")
+        snippet = literal_column(
+            f"snippet(messages_fts, 0, char(2), char(3), '…', {SNIPPET_TOKENS})"
+        )
+        return (
+            self._columns(snippet, -rank)
+            .select_from(messages_fts)
+            .join(messages_fts_ids, messages_fts_ids.c.id == messages_fts.c.rowid)
+            .join(Message, Message.id == messages_fts_ids.c.message_id)
+            .join(Session, Session.id == Message.session_id)
+            .where(literal_column("messages_fts").op("MATCH")(bindparam("match", match)), *filters)
+            .order_by(rank)
+            .limit(limit)
+            .offset(offset)
+        )
+
+    def _postgresql_query(self, query: str, syntax: str, filters: list, limit: int, offset: int):
+        if not _WORD.search(query):
+            return None
+        parser = func.websearch_to_tsquery if syntax == "advanced" else func.plainto_tsquery
+        tsquery = parser(literal_column("'english'"), bindparam("match", query))
+        # Same expression as the index, so the planner can use it
+        vector = literal_column("to_tsvector('english', messages.content)")
+        score = func.ts_rank(vector, tsquery)
+        snippet = func.ts_headline(
+            literal_column("'english'"),
+            Message.content,
+            tsquery,
+            literal_column(
+                f"'StartSel=\"{_MARK_START}\",StopSel=\"{_MARK_END}\","
+                f"MaxWords={SNIPPET_TOKENS},MinWords={SNIPPET_TOKENS // 2}'"
+            ),
+        )
+        return (
+            self._columns(snippet, score)
+            .join(Session, Session.id == Message.session_id)
+            .where(vector.op("@@")(tsquery), *filters)
+            .order_by(score.desc(), Message.timestamp.desc())
+            .limit(limit)
+            .offset(offset)
+        )
+
+
+async def rebuild_index(db: AsyncSession) -> None:
+    """
+    Re-index all messages, e.g. after restoring a database.
+
+    On SQLite, messages missing from messages_fts_ids are given an id and
+    ids of deleted messages are dropped first.
+
+    Args:
+        db: Database session on the writer engine
+    """
+    dialect = db.bind.dialect.name
+    if dialect == "sqlite":
+        await db.execute(text(
+            "DELETE FROM messages_fts_ids WHERE message_id NOT IN (SELECT id FROM messages)"
+        ))
+        await db.execute(text(
+            "INSERT INTO messages_fts_ids(message_id) SELECT id FROM messages "
+            "WHERE id NOT IN (SELECT message_id FROM messages_fts_ids) ORDER BY rowid"
+        ))
+        await db.execute(text("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')"))
+        await db.execute(text("INSERT INTO messages_fts(messages_fts) VALUES ('optimize')"))
+    elif dialect == "postgresql":
+        await db.execute(text("REINDEX INDEX ix_messages_content_fts"))
+    await db.commit()
+    logger.info(f"Rebuilt the {dialect} full-text search index")
@@ -0,0 +1,321 @@
+"""
+Import of conversation archives as JSON lines.
+
+Each line is one conversation: this app's JSONL export, an OpenAI chat
+fine-tuning record ({"messages": [...]}) or an Ollama /api/chat request
+({"model": ..., "messages": [...]}). The body is parsed line by line as it
+arrives and rows are inserted with executemany in batched transactions,
+so an archive of any size is imported with bounded memory.
+"""
+import asyncio
+import logging
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from pydantic import TypeAdapter, ValidationError
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.schemas import CreateSessionRequest, MessageSchema
+from app.services import ndjson
+from app.services.context_manager import ContextManager
+from app.services.session_service import SessionService
+
+logger = logging.getLogger(__name__)
+
+# Errors listed in the result; further ones are only counted
+MAX_REPORTED_ERRORS = 50
+# Length of session names derived from the first user message
+DERIVED_NAME_LENGTH = 50
+
+_messages_adapter = TypeAdapter(List[MessageSchema])
+
+
+class InvalidLineError(ValueError):
+    """A line that cannot be imported."""
+
+
+class _LineSplitter:
+    """Split bytes into numbered lines, dropping lines over a length limit."""
+
+    def __init__(self, max_line_bytes: int):
+        self.max_line_bytes = max_line_bytes
+        self.buffer = bytearray()
+        self.line_no = 0
+        self.skipping = False
+
+    def feed(self, data: bytes) -> List[Tuple[int, Optional[bytes]]]:
+        lines = []
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end < 0:
+                break
+            if not self.skipping:
+                self.buffer += data[start:end]
+            self._end_line(lines)
+            start = end + 1
+        if not self.skipping:
+            self.buffer += data[start:]
+            if len(self.buffer) > self.max_line_bytes:
+                self.buffer.clear()
+                self.skipping = True
+        return lines
+
+    def finish(self) -> List[Tuple[int, Optional[bytes]]]:
+        lines = []
+        if self.skipping or self.buffer:
+            self._end_line(lines)
+        return lines
+
+    def _end_line(self, lines: list) -> None:
+        self.line_no += 1
+        # Also a line that arrived whole within one chunk
+        if self.skipping or len(self.buffer) > self.max_line_bytes:
+            lines.append((self.line_no, None))
+        elif self.buffer.strip():
+            lines.append((self.line_no, bytes(self.buffer)))
+        self.buffer.clear()
+        self.skipping = False
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes],
+    max_line_bytes: int,
+    gzip: bool = False
+) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Split a byte stream into lines.
+
+    Args:
+        chunks: Body chunks
+        max_line_bytes: Longer lines are dropped
+        gzip: The stream is gzip (or zlib) compressed
+
+    Yields:
+        (line number, line) with blank lines skipped; line is None for a
+        line dropped for its length
+    """
+    # wbits 47: accept a gzip or zlib header
+    decompressor = zlib.decompressobj(47) if gzip else None
+    splitter = _LineSplitter(max_line_bytes)
+    async for chunk in chunks:
+        if decompressor is not None:
+            chunk = decompressor.decompress(chunk)
+        for item in splitter.feed(chunk):
+            yield item
+    if decompressor is not None:
+        for item in splitter.feed(decompressor.flush()):
+            yield item
+    for item in splitter.finish():
+        yield item
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    """Parse an ISO 8601 time or Unix timestamp into naive UTC, as stored."""
+    if value is None:
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.utcfromtimestamp(value)
+        parsed = datetime.fromisoformat(str(value))
+    except (ValueError, OverflowError, OSError):
+        raise InvalidLineError(f"invalid time: {value!r}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _content_text(content: Any) -> Any:
+    """Flatten OpenAI content parts ([{"type": "text", "text": ...}]) to a string."""
+    if isinstance(content, list):
+        return "".join(
+            part.get("text", "") for part in content
+            if isinstance(part, dict) and part.get("type") == "text"
+        )
+    if content is None:
+        return ""
+    return content
+
+
+def parse_session(
+    data: Any,
+    default_model: Optional[str] = None
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Turn one archive line into session and message rows.
+
+    Messages without a timestamp are placed a microsecond after the one
+    before them, so their order survives the import.
+
+    Args:
+        data: Decoded JSON line
+        default_model: Model for conversations that do not name one
+
+    Returns:
+        (session row, message rows) ready for SessionService.insert_sessions()
+
+    Raises:
+        InvalidLineError: If the line is not a valid conversation
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("messages"), list):
+        raise InvalidLineError("expected an object with a messages list")
+
+    raw_messages = data["messages"]
+    try:
+        messages = _messages_adapter.validate_python([
+            {"role": m.get("role"), "content": _content_text(m.get("content"))}
+            if isinstance(m, dict) else m
+            for m in raw_messages
+        ])
+    except ValidationError as e:
+        raise InvalidLineError(f"invalid message: {e.errors()[0]['loc']} {e.errors()[0]['msg']}")
+
+    name = data.get("name") or data.get("title")
+    if not name:
+        first_user = next((m.content for m in messages if m.role == "user" and m.content), None)
+        name = first_user[:DERIVED_NAME_LENGTH].strip() if first_user else "Imported conversation"
+    try:
+        request = CreateSessionRequest(
+            name=name,
+            model_name=data.get("model") or data.get("model_name") or default_model,
+            endpoint_type=data.get("endpoint_type") or "chat",
+        )
+    except ValidationError as e:
+        field = e.errors()[0]["loc"][0]
+        if field == "model_name":
+            raise InvalidLineError("no model given; set model on the line or the request")
+        raise InvalidLineError(f"invalid {field}: {e.errors()[0]['msg']}")
+
+    created_at = _parse_time(data.get("created_at"))
+    if created_at is None and raw_messages and isinstance(raw_messages[0], dict):
+        created_at = _parse_time(raw_messages[0].get("timestamp"))
+    created_at = created_at or datetime.utcnow()
+
+    session_id = str(uuid.uuid4())
+    message_rows = []
+    total_tokens = 0
+    timestamp = created_at
+    for raw, message in zip(raw_messages, messages):
+        timestamp = _parse_time(raw.get("timestamp")) or timestamp + timedelta(microseconds=1)
+        token_count = ContextManager.estimate_tokens(message.content)
+        total_tokens += token_count
+        message_rows.append({
+            "id": str(uuid.uuid4()),
+            "session_id": session_id,
+            "role": message.role,
+            "content": message.content,
+            "timestamp": timestamp,
+            "token_count": token_count,
+            "truncated": False,
+        })
+
+    session_row = {
+        "id": session_id,
+        "name": request.name,
+        "model_name": request.model_name,
+        "endpoint_type": request.endpoint_type,
+        "created_at": created_at,
+        "updated_at": created_at,
+        "total_tokens": total_tokens,
+    }
+    return session_row, message_rows
+
+
+class SessionImporter:
+    """Import JSONL conversation archives in batched transactions."""
+
+    def __init__(self, batch_size: int = 5000, max_line_bytes: int = 32 * 1024 * 1024):
+        self.batch_size = batch_size
+        self.max_line_bytes = max_line_bytes
+
+    async def import_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        default_model: Optional[str] = None,
+        gzip: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Import conversations from a JSONL byte stream.
+
+        Invalid lines are skipped and reported. Each batch is committed on
+        its own, so an interrupted import keeps the batches written before.
+        Parsing of the next batch overlaps with the insert of the previous.
+
+        Args:
+            chunks: Body chunks
+            default_model: Model for conversations that do not name one
+            gzip: The stream is gzip compressed
+
+        Returns:
+            Dict with sessions, messages, skipped, errors, seconds and
+            rows_per_second (sessions and messages inserted per second)
+        """
+        started = time.perf_counter()
+        result = {"sessions": 0, "messages": 0, "skipped": 0, "errors": []}
+        sessions: List[Dict[str, Any]] = []
+        messages: List[Dict[str, Any]] = []
+        writing: Optional[asyncio.Task] = None
+
+        async def flush():
+            nonlocal writing, sessions, messages
+            if writing is not None:
+                await writing
+            writing = asyncio.create_task(self._insert(sessions, messages, result))
+            sessions, messages = [], []
+
+        try:
+            async for line_no, line in iter_lines(chunks, self.max_line_bytes, gzip):
+                try:
+                    if line is None:
+                        raise InvalidLineError(f"line longer than {self.max_line_bytes} bytes")
+                    try:
+                        data = ndjson.loads(line)
+                    except ValueError as e:
+                        raise InvalidLineError(f"invalid JSON: {str(e)}")
+                    session_row, message_rows = parse_session(data, default_model)
+                except InvalidLineError as e:
+                    result["skipped"] += 1
+                    if len(result["errors"]) < MAX_REPORTED_ERRORS:
+                        result["errors"].append({"line": line_no, "error": str(e)})
+                    continue
+                sessions.append(session_row)
+                messages.extend(message_rows)
+                if len(messages) >= self.batch_size:
+                    await flush()
+            if sessions:
+                await flush()
+            if writing is not None:
+                await writing
+        finally:
+            if writing is not None and not writing.done():
+                writing.cancel()
+
+        seconds = time.perf_counter() - started
+        rows = result["sessions"] + result["messages"]
+        result["seconds"] = round(seconds, 3)
+        result["rows_per_second"] = round(rows / seconds) if seconds > 0 else rows
+        logger.info(
+            f"Imported {result['sessions']} sessions, {result['messages']} messages "
+            f"({result['skipped']} lines skipped) in {seconds:.2f}s, {result['rows_per_second']} rows/s"
+        )
+        return result
+
+    async def _insert(
+        self,
+        sessions: List[Dict[str, Any]],
+        messages: List[Dict[str, Any]],
+        result: Dict[str, Any]
+    ) -> None:
+        async with AsyncSessionLocal() as db:
+            await SessionService(db).insert_sessions(sessions, messages)
+        result["sessions"] += len(sessions)
+        result["messages"] += len(messages)
+
+
+# Singleton instance
+session_importer = SessionImporter(
+    batch_size=settings.IMPORT_BATCH_SIZE,
+    max_line_bytes=settings.IMPORT_MAX_LINE_BYTES,
+)
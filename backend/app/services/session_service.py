@@ -2,16 +2,36 @@
 Service for managing conversation sessions and messages.
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from typing import List, Optional
-from app.models.database import Session, Message
+from sqlalchemy import select, func, and_, or_, update, insert, case, cast, Float
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+from app.models.database import Session, Message, GENERATION_STAT_FIELDS
 from app.models.schemas import CreateSessionRequest, MessageSchema
+from app.services.context_manager import ContextManager
 from app.config import settings
+from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def generation_stat_columns(stats: Optional[Dict[str, Any]]) -> Dict[str, Optional[int]]:
+    """
+    Pick the Message performance columns out of generation statistics.
+    
+    Args:
+        stats: Ollama's final chunk or response, optionally with
+            time_to_first_token (ns) added; None when unknown
+    
+    Returns:
+        Column values keyed by Message attribute
+    """
+    if not stats:
+        return {}
+    columns = {field: stats.get(field) for field in GENERATION_STAT_FIELDS}
+    columns["time_to_first_token"] = stats.get("time_to_first_token")
+    return columns
+
+
 class SessionService:
     """Service for session management operations."""
 
@@ -53,17 +73,53 @@ class SessionService:
         )
         return result.scalar_one_or_none()
 
-    async def list_sessions(self) -> List[Session]:
+    async def list_sessions(
+        self,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        model_name: Optional[str] = None,
+        endpoint_type: Optional[str] = None,
+        updated_since: Optional[datetime] = None
+    ) -> List[Tuple[Session, int]]:
         """
-        Get all sessions, ordered by last update.
+        Get sessions with their message counts, ordered by last update.
+        
+        Counts come from a correlated subquery in the same statement, so a
+        page costs one query regardless of how many sessions exist.
+        
+        Args:
+            limit: Max number of sessions to return
+            offset: Number of sessions to skip
+            model_name: Only sessions using this model
+            endpoint_type: Only sessions of this endpoint type
+            updated_since: Only sessions updated at or after this time
         
         Returns:
-            List of Session objects
+            List of (Session, message_count) tuples
         """
-        result = await self.db.execute(
-            select(Session).order_by(Session.updated_at.desc())
+        message_count = (
+            select(func.count(Message.id))
+            .where(Message.session_id == Session.id)
+            .correlate(Session)
+            .scalar_subquery()
         )
-        return list(result.scalars().all())
+        query = select(Session, message_count.label("message_count"))
+        
+        if model_name:
+            query = query.where(Session.model_name == model_name)
+        if endpoint_type:
+            query = query.where(Session.endpoint_type == endpoint_type)
+        if updated_since:
+            query = query.where(Session.updated_at >= updated_since)
+        
+        query = query.order_by(Session.updated_at.desc(), Session.id.desc())
+        if offset:
+            query = query.offset(offset)
+        if limit:
+            query = query.limit(limit)
+        
+        result = await self.db.execute(query)
+        return [(row.Session, row.message_count or 0) for row in result]
 
     async def update_session(self, session_id: str, updates: dict) -> Optional[Session]:
         """
@@ -111,29 +167,53 @@ class SessionService:
         session_id: str, 
         role: str, 
         content: str,
-        parameters: Optional[dict] = None
+        parameters: Optional[dict] = None,
+        token_count: Optional[int] = None,
+        truncated: bool = False,
+        model: Optional[str] = None,
+        stats: Optional[Dict[str, Any]] = None
     ) -> Message:
         """
         Add a message to a session.
         
+        The message token count is stored with the row and added to the
+        session's running total in the same transaction.
+        
         Args:
             session_id: Session UUID
             role: Message role (user/assistant/system)
             content: Message content
             parameters: Optional parameters used for generation
+            token_count: Token count reported by Ollama (eval_count);
+                estimated from the content when not given
+            truncated: The generation was cancelled before it finished
+            model: Model that generated the message
+            stats: Generation statistics, see generation_stat_columns()
         
         Returns:
             Created Message object
         """
         try:
             logger.debug(f"Creating message: session={session_id}, role={role}, content_length={len(content)}")
+            if token_count is None:
+                token_count = ContextManager.estimate_tokens(content)
             message = Message(
                 session_id=session_id,
                 role=role,
                 content=content,
-                parameters=parameters
+                parameters=parameters,
+                token_count=token_count,
+                truncated=truncated,
+                model=model,
+                **generation_stat_columns(stats)
             )
             self.db.add(message)
+            await self.db.execute(
+                update(Session)
+                .where(Session.id == session_id)
+                # Keep updated_at untouched, it tracks session edits
+                .values(total_tokens=Session.total_tokens + token_count, updated_at=Session.updated_at)
+            )
             logger.debug(f"Message added to session, committing...")
             await self.db.commit()
             logger.debug(f"Commit successful, refreshing message...")
@@ -145,35 +225,282 @@ class SessionService:
             await self.db.rollback()
             raise
 
+    async def add_messages(self, messages: List[Message]) -> None:
+        """
+        Insert several messages in a single transaction.
+        
+        Token counts are estimated where missing and each session's running
+        total is updated once per batch.
+        
+        Args:
+            messages: Unsaved Message objects
+        """
+        totals: dict = {}
+        for message in messages:
+            if message.token_count is None:
+                message.token_count = ContextManager.estimate_tokens(message.content)
+            totals[message.session_id] = totals.get(message.session_id, 0) + message.token_count
+        
+        try:
+            self.db.add_all(messages)
+            for session_id, tokens in totals.items():
+                await self.db.execute(
+                    update(Session)
+                    .where(Session.id == session_id)
+                    .values(total_tokens=Session.total_tokens + tokens, updated_at=Session.updated_at)
+                )
+            await self.db.commit()
+            logger.debug(f"Saved batch of {len(messages)} messages across {len(totals)} sessions")
+        except Exception as e:
+            logger.error(f"Failed to add message batch: {str(e)}", exc_info=True)
+            await self.db.rollback()
+            raise
+
+    async def insert_sessions(
+        self,
+        sessions: List[Dict[str, Any]],
+        messages: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Insert complete sessions with their messages in one transaction.
+
+        Rows go through executemany without ORM objects, so the caller
+        must set every column: ids, timestamps, token counts and the
+        sessions' total_tokens.
+
+        Args:
+            sessions: Session rows
+            messages: Message rows of these sessions
+        """
+        try:
+            await self.db.execute(insert(Session), sessions)
+            if messages:
+                await self.db.execute(insert(Message), messages)
+            await self.db.commit()
+            logger.debug(f"Inserted {len(sessions)} sessions with {len(messages)} messages")
+        except Exception as e:
+            logger.error(f"Failed to insert session batch: {str(e)}", exc_info=True)
+            await self.db.rollback()
+            raise
+
     async def get_messages(
         self, 
         session_id: str, 
-        limit: Optional[int] = None
+        limit: Optional[int] = None,
+        before: Optional[str] = None,
+        after: Optional[str] = None
     ) -> List[Message]:
         """
-        Get messages for a session.
+        Get messages for a session, oldest first.
+        
+        Limits and cursors are applied in SQL using the
+        (session_id, timestamp) index, so only the requested page is loaded.
         
         Args:
             session_id: Session UUID
-            limit: Max number of recent messages to return
+            limit: Max number of messages to return. Without `after` these
+                are the most recent ones (before the `before` cursor if set)
+            before: Message id cursor; only messages older than it are returned
+            after: Message id cursor; only messages newer than it are returned
         
         Returns:
             List of Message objects
+        
+        Raises:
+            ValueError: If a cursor does not refer to a message of the session
         """
-        query = (
-            select(Message)
+        query = select(Message).where(Message.session_id == session_id)
+        
+        if before:
+            timestamp, message_id = await self._get_cursor(session_id, before)
+            query = query.where(or_(
+                Message.timestamp < timestamp,
+                and_(Message.timestamp == timestamp, Message.id < message_id)
+            ))
+        if after:
+            timestamp, message_id = await self._get_cursor(session_id, after)
+            query = query.where(or_(
+                Message.timestamp > timestamp,
+                and_(Message.timestamp == timestamp, Message.id > message_id)
+            ))
+        
+        if limit and not after:
+            # Newest N in descending order, then flip back to chronological
+            query = query.order_by(Message.timestamp.desc(), Message.id.desc()).limit(limit)
+            result = await self.db.execute(query)
+            messages = list(result.scalars().all())
+            messages.reverse()
+            return messages
+        
+        query = query.order_by(Message.timestamp.asc(), Message.id.asc())
+        if limit:
+            query = query.limit(limit)
+        
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
+
+    async def iter_messages(
+        self,
+        session_id: str,
+        chunk_size: int = 500
+    ) -> AsyncGenerator[List[Any], None]:
+        """
+        Read all messages of a session in chunks, oldest first.
+        
+        Uses keyset pagination on (timestamp, id) and plain rows instead
+        of ORM objects, so memory stays bounded by the chunk size however
+        long the session is.
+        
+        Args:
+            session_id: Session UUID
+            chunk_size: Rows per query
+        
+        Yields:
+            Lists of rows with the Message columns as attributes
+        """
+        cursor = None
+        while True:
+            query = (
+                select(*Message.__table__.columns)
+                .where(Message.session_id == session_id)
+                .order_by(Message.timestamp.asc(), Message.id.asc())
+                .limit(chunk_size)
+            )
+            if cursor is not None:
+                query = query.where(or_(
+                    Message.timestamp > cursor.timestamp,
+                    and_(Message.timestamp == cursor.timestamp, Message.id > cursor.id)
+                ))
+            result = await self.db.execute(query)
+            rows = list(result.all())
+            if rows:
+                yield rows
+            if len(rows) < chunk_size:
+                return
+            cursor = rows[-1]
+
+    async def get_last_message_id(self, session_id: str) -> Tuple[int, Optional[str]]:
+        """
+        Get the message count and the id of the newest message of a session.
+        
+        Together they identify the session's content for caching exports.
+        
+        Args:
+            session_id: Session UUID
+        
+        Returns:
+            Tuple of (message count, newest message id or None)
+        """
+        last_id = (
+            select(Message.id)
             .where(Message.session_id == session_id)
-            .order_by(Message.timestamp.asc())
+            .order_by(Message.timestamp.desc(), Message.id.desc())
+            .limit(1)
+            .scalar_subquery()
         )
+        result = await self.db.execute(
+            select(func.count(Message.id), last_id)
+            .where(Message.session_id == session_id)
+        )
+        count, message_id = result.one()
+        return count, message_id
+
+    async def get_context_window(
+        self,
+        session_id: str,
+        budget: int,
+        max_messages: Optional[int] = None,
+        batch_size: int = 32
+    ) -> List[Message]:
+        """
+        Load just enough recent messages to fill a token budget.
         
-        result = await self.db.execute(query)
-        messages = list(result.scalars().all())
+        Non-system messages are read newest first in small batches, using
+        the stored token counts, until the budget or max_messages is
+        reached. System messages are always included. The result still
+        has to be packed with ContextManager.get_budget_messages.
+        
+        Args:
+            session_id: Session UUID
+            budget: Prompt token budget
+            max_messages: Optional cap on non-system messages
+            batch_size: Rows fetched per query
+        
+        Returns:
+            Candidate messages, oldest first
+        """
+        result = await self.db.execute(
+            select(Message)
+            .where(Message.session_id == session_id, Message.role == "system")
+            .order_by(Message.timestamp.asc(), Message.id.asc())
+        )
+        system_messages = list(result.scalars().all())
         
-        # Return last N messages if limit specified
-        if limit and len(messages) > limit:
-            return messages[-limit:]
+        recent: List[Message] = []
+        tokens = ContextManager.calculate_message_tokens(system_messages)
+        cursor = None
+        while tokens < budget and (max_messages is None or len(recent) < max_messages):
+            query = (
+                select(Message)
+                .where(Message.session_id == session_id, Message.role != "system")
+                .order_by(Message.timestamp.desc(), Message.id.desc())
+                .limit(batch_size)
+            )
+            if cursor:
+                query = query.where(or_(
+                    Message.timestamp < cursor.timestamp,
+                    and_(Message.timestamp == cursor.timestamp, Message.id < cursor.id)
+                ))
+            result = await self.db.execute(query)
+            batch = list(result.scalars().all())
+            for msg in batch:
+                recent.append(msg)
+                tokens += ContextManager.message_tokens(msg)
+                if tokens >= budget or len(recent) == max_messages:
+                    break
+            if len(batch) < batch_size:
+                break
+            cursor = batch[-1]
         
-        return messages
+        recent.reverse()
+        return system_messages + recent
+
+    async def get_message_page(
+        self,
+        session_id: str,
+        limit: int,
+        before: Optional[str] = None,
+        after: Optional[str] = None
+    ) -> Tuple[List[Message], bool]:
+        """
+        Get one page of messages plus whether more exist past it.
+        
+        Args:
+            session_id: Session UUID
+            limit: Page size
+            before: Message id cursor for loading older history
+            after: Message id cursor for loading newer messages
+        
+        Returns:
+            Tuple of (messages oldest first, has_more)
+        """
+        messages = await self.get_messages(session_id, limit + 1, before=before, after=after)
+        has_more = len(messages) > limit
+        if has_more:
+            # The extra row sits on the far side of the page
+            messages = messages[:limit] if after else messages[1:]
+        return messages, has_more
+
+    async def _get_cursor(self, session_id: str, message_id: str) -> Tuple:
+        """Resolve a message id cursor to its (timestamp, id) sort key."""
+        result = await self.db.execute(
+            select(Message.timestamp, Message.id)
+            .where(Message.session_id == session_id, Message.id == message_id)
+        )
+        row = result.first()
+        if row is None:
+            raise ValueError(f"Unknown message cursor: {message_id}")
+        return row.timestamp, row.id
 
     async def get_message_count(self, session_id: str) -> int:
         """
@@ -190,3 +517,107 @@ class SessionService:
             .where(Message.session_id == session_id)
         )
         return result.scalar() or 0
+
+    async def get_generation_stats(
+        self,
+        group_by: str = "model",
+        session_id: Optional[str] = None,
+        model: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregate the performance of assistant responses in SQL.
+        
+        Only responses with Ollama statistics are counted. The 95th
+        percentile of time to first token is a nearest-rank percentile from
+        cume_dist(), which both SQLite and PostgreSQL support.
+        
+        Args:
+            group_by: "model", "session" or "day"
+            session_id: Only responses of this session
+            model: Only responses of this model
+            since: Only responses at or after this time
+            until: Only responses before this time
+        
+        Returns:
+            One dict of aggregates per group, ordered by group key
+        """
+        # Messages saved before stats were stored fall back to the session model
+        model_column = func.coalesce(Message.model, Session.model_name)
+        group_columns = {
+            "model": model_column,
+            "session": Message.session_id,
+            "day": func.date(Message.timestamp),
+        }
+        if group_by not in group_columns:
+            raise ValueError(f"Cannot group by {group_by}")
+        group_column = group_columns[group_by]
+        
+        ttft = Message.time_to_first_token
+        rows = (
+            select(
+                group_column.label("key"),
+                Message.eval_count,
+                Message.eval_duration,
+                Message.prompt_eval_count,
+                Message.load_duration,
+                Message.total_duration,
+                ttft,
+                func.cume_dist().over(
+                    partition_by=(group_column, ttft.is_(None)),
+                    order_by=ttft
+                ).label("ttft_rank"),
+            )
+            .join(Session, Session.id == Message.session_id)
+            .where(Message.role == "assistant", Message.eval_count.is_not(None))
+        )
+        if session_id:
+            rows = rows.where(Message.session_id == session_id)
+        if model:
+            rows = rows.where(model_column == model)
+        if since:
+            rows = rows.where(Message.timestamp >= since)
+        if until:
+            rows = rows.where(Message.timestamp < until)
+        rows = rows.subquery()
+        
+        tokens_per_second = (
+            cast(rows.c.eval_count, Float) * 1e9 / func.nullif(rows.c.eval_duration, 0)
+        )
+        result = await self.db.execute(
+            select(
+                rows.c.key,
+                func.count().label("responses"),
+                func.coalesce(func.sum(rows.c.prompt_eval_count), 0).label("prompt_tokens"),
+                func.coalesce(func.sum(rows.c.eval_count), 0).label("generated_tokens"),
+                func.avg(tokens_per_second).label("avg_tokens_per_second"),
+                func.avg(rows.c.time_to_first_token).label("avg_ttft"),
+                func.min(
+                    case((rows.c.ttft_rank >= 0.95, rows.c.time_to_first_token))
+                ).label("p95_ttft"),
+                func.avg(rows.c.load_duration).label("avg_load"),
+                func.avg(rows.c.total_duration).label("avg_total"),
+            )
+            .group_by(rows.c.key)
+            .order_by(rows.c.key)
+        )
+        
+        def ms(nanoseconds) -> Optional[float]:
+            return None if nanoseconds is None else float(nanoseconds) / 1e6
+        
+        return [
+            {
+                "key": str(row.key),
+                "responses": row.responses,
+                "prompt_tokens": row.prompt_tokens,
+                "generated_tokens": row.generated_tokens,
+                "total_tokens": row.prompt_tokens + row.generated_tokens,
+                "avg_tokens_per_second": None if row.avg_tokens_per_second is None else float(row.avg_tokens_per_second),
+                "avg_time_to_first_token_ms": ms(row.avg_ttft),
+                "p95_time_to_first_token_ms": ms(row.p95_ttft),
+                "avg_load_duration_ms": ms(row.avg_load),
+                "avg_total_duration_ms": ms(row.avg_total),
+            }
+            for row in result
+        ]
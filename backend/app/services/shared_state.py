@@ -0,0 +1,174 @@
+"""
+Shared state for coordinating several API worker processes.
+
+The in-memory backend is the default and only shares state inside one
+process. Set STATE_BACKEND_URL to a redis:// URL to share the model list
+cache, download progress and the active-stream registry across workers
+and nodes.
+"""
+import json
+import os
+import socket
+import time
+from typing import Any, Dict, Optional, Tuple
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Identifies this worker in shared registries
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class StateBackend:
+    """Interface for key/value and hash state shared between workers."""
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Get a JSON value, or None if missing or expired."""
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a JSON value, optionally expiring after ttl seconds."""
+        raise NotImplementedError
+
+    async def set_nx(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """
+        Store a JSON value only if the key does not exist, atomically.
+
+        Returns:
+            True if the value was stored, False if the key already existed
+        """
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        """Remove a key."""
+        raise NotImplementedError
+
+    async def hset(self, name: str, field: str, value: Any) -> None:
+        """Store a JSON value under a field of a hash."""
+        raise NotImplementedError
+
+    async def hdel(self, name: str, field: str) -> None:
+        """Remove a field from a hash."""
+        raise NotImplementedError
+
+    async def hgetall(self, name: str) -> Dict[str, Any]:
+        """Get all fields of a hash."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Release connections."""
+
+
+class MemoryStateBackend(StateBackend):
+    """Process-local state; the default for single-worker deployments."""
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._hashes: Dict[str, Dict[str, Any]] = {}
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._values[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._values[key] = (value, expires_at)
+
+    async def set_nx(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        # No await between the check and the write, so this is atomic
+        if await self.get(key) is not None:
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    async def delete(self, key: str) -> None:
+        self._values.pop(key, None)
+
+    async def hset(self, name: str, field: str, value: Any) -> None:
+        self._hashes.setdefault(name, {})[field] = value
+
+    async def hdel(self, name: str, field: str) -> None:
+        self._hashes.get(name, {}).pop(field, None)
+
+    async def hgetall(self, name: str) -> Dict[str, Any]:
+        return dict(self._hashes.get(name, {}))
+
+
+class RedisStateBackend(StateBackend):
+    """State shared through Redis (or any Redis-compatible server)."""
+
+    def __init__(self, url: str, prefix: str = "ollama_web:"):
+        try:
+            from redis import asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("STATE_BACKEND_URL requires the 'redis' package (pip install redis)") from e
+        self._redis = redis.from_url(url, decode_responses=True)
+        self._prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return self._prefix + key
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self._redis.get(self._key(key))
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        await self._redis.set(
+            self._key(key),
+            json.dumps(value),
+            px=int(ttl * 1000) if ttl else None
+        )
+
+    async def set_nx(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        stored = await self._redis.set(
+            self._key(key),
+            json.dumps(value),
+            px=int(ttl * 1000) if ttl else None,
+            nx=True
+        )
+        return bool(stored)
+
+    async def delete(self, key: str) -> None:
+        await self._redis.delete(self._key(key))
+
+    async def hset(self, name: str, field: str, value: Any) -> None:
+        await self._redis.hset(self._key(name), field, json.dumps(value))
+
+    async def hdel(self, name: str, field: str) -> None:
+        await self._redis.hdel(self._key(name), field)
+
+    async def hgetall(self, name: str) -> Dict[str, Any]:
+        raw = await self._redis.hgetall(self._key(name))
+        return {field: json.loads(value) for field, value in raw.items()}
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def create_state_backend(url: Optional[str] = None) -> StateBackend:
+    """
+    Create the state backend for a URL.
+
+    Args:
+        url: redis:// or rediss:// URL, or None/"memory" for in-process state
+
+    Returns:
+        StateBackend instance
+    """
+    if not url or url == "memory":
+        return MemoryStateBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        logger.info("Using Redis shared state backend")
+        return RedisStateBackend(url)
+    raise ValueError(f"Unsupported STATE_BACKEND_URL: {url}")
+
+
+# Singleton instance
+shared_state = create_state_backend(settings.STATE_BACKEND_URL)
@@ -0,0 +1,211 @@
+"""
+Registry of running generation streams and their cancellation.
+"""
+import asyncio
+import logging
+import time
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, Dict, List, Optional
+from app.services.shared_state import shared_state, MemoryStateBackend, WORKER_ID
+
+logger = logging.getLogger(__name__)
+
+# How often a stream checks for cancel requests made on other workers
+REMOTE_CANCEL_POLL_SECONDS = 1.0
+
+
+class StreamCancelled(Exception):
+    """Raised when a generation stream was cancelled on request."""
+
+
+class StreamRegistry:
+    """
+    Track the streams of this worker and let any worker cancel them.
+
+    Streams are listed in the shared "streams" hash. Cancelling a stream of
+    this worker sets its local event; for a stream on another worker a
+    cancel flag is written to shared state, which the owner polls.
+    """
+
+    def __init__(self):
+        self._events: Dict[str, asyncio.Event] = {}
+        self._pollers: Dict[str, asyncio.Task] = {}
+
+    async def register(self, stream_id: str, info: Dict[str, Any]) -> asyncio.Event:
+        """
+        Register a stream.
+
+        Args:
+            stream_id: Stream UUID
+            info: Details listed by GET /api/chat/streams
+
+        Returns:
+            Event set when the stream is cancelled
+        """
+        event = asyncio.Event()
+        self._events[stream_id] = event
+        await shared_state.hset("streams", stream_id, {
+            **info,
+            "worker": WORKER_ID,
+            "started_at": time.time()
+        })
+        if not isinstance(shared_state, MemoryStateBackend):
+            self._pollers[stream_id] = asyncio.create_task(self._poll_remote_cancel(stream_id, event))
+        return event
+
+    async def unregister(self, stream_id: str) -> None:
+        """Remove a finished stream."""
+        self._events.pop(stream_id, None)
+        poller = self._pollers.pop(stream_id, None)
+        if poller is not None:
+            poller.cancel()
+        await shared_state.hdel("streams", stream_id)
+
+    async def cancel(self, stream_id: str) -> bool:
+        """
+        Cancel a stream running on any worker.
+
+        Args:
+            stream_id: Stream UUID
+
+        Returns:
+            False if no such stream is running
+        """
+        event = self._events.get(stream_id)
+        if event is not None:
+            event.set()
+            return True
+        if stream_id not in await shared_state.hgetall("streams"):
+            return False
+        await shared_state.set(f"cancel:{stream_id}", True, ttl=60)
+        return True
+
+    async def _poll_remote_cancel(self, stream_id: str, event: asyncio.Event) -> None:
+        while not event.is_set():
+            await asyncio.sleep(REMOTE_CANCEL_POLL_SECONDS)
+            try:
+                if await shared_state.get(f"cancel:{stream_id}"):
+                    event.set()
+            except Exception as e:
+                logger.warning(f"Failed to poll cancel flag of stream {stream_id}: {str(e)}")
+
+
+# Queue markers from the producer task
+_END = object()
+_CANCELLED = object()
+
+
+async def relay_batches(
+    source: AsyncGenerator[Any, None],
+    cancelled: Optional[asyncio.Event] = None,
+    interval: float = 0.0,
+    max_bytes: int = 0
+) -> AsyncGenerator[List[Any], None]:
+    """
+    Relay a stream in batches until the cancel event is set.
+
+    A producer task reads the source into a bounded queue; each batch is
+    whatever has arrived since the previous one. With interval > 0, every
+    batch after the first waits that long to collect more items, trading a
+    little latency for fewer, larger writes. With max_bytes > 0 (items are
+    bytes), a batch stops growing at that size.
+
+    The source is closed as soon as the event is set or the consumer goes
+    away, which closes the upstream HTTP stream to Ollama, even while it is
+    waiting for the next token.
+
+    Args:
+        source: Source stream
+        cancelled: Cancel event, or None
+        interval: Seconds to collect items into a batch
+        max_bytes: Size limit of a batch of bytes items
+
+    Yields:
+        Non-empty lists of items
+
+    Raises:
+        StreamCancelled: If the event was set before the source finished
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=256)
+
+    async def produce():
+        try:
+            async with aclosing(source):
+                async for item in source:
+                    await queue.put(item)
+            await queue.put(_END)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(e)
+
+    async def watch():
+        await cancelled.wait()
+        producer.cancel()
+        # Jump the queue: stop relaying right away
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(_CANCELLED)
+
+    producer = asyncio.create_task(produce())
+    watcher = asyncio.create_task(watch()) if cancelled is not None else None
+    try:
+        first = True
+        while True:
+            item = await queue.get()
+            if not first and interval > 0 and item is not _END:
+                await asyncio.sleep(interval)
+            first = False
+
+            batch = []
+            size = 0
+            while True:
+                if item is _END:
+                    if batch:
+                        yield batch
+                    return
+                if item is _CANCELLED:
+                    raise StreamCancelled()
+                if isinstance(item, Exception):
+                    # Relay what arrived before the error first
+                    if batch:
+                        yield batch
+                    raise item
+                batch.append(item)
+                if max_bytes:
+                    size += len(item)
+                    if size >= max_bytes:
+                        break
+                if queue.empty():
+                    break
+                item = queue.get_nowait()
+            yield batch
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+        if not producer.done():
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
+
+
+async def until_cancelled(
+    chunks: AsyncGenerator[Dict[str, Any], None],
+    cancelled: Optional[asyncio.Event]
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Relay chunks one by one until the event is set; see relay_batches().
+
+    Raises:
+        StreamCancelled: If the event was set before the source finished
+    """
+    async with aclosing(relay_batches(chunks, cancelled)) as batches:
+        async for batch in batches:
+            for chunk in batch:
+                yield chunk
+
+
+# Singleton instance
+stream_registry = StreamRegistry()
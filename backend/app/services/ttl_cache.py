@@ -0,0 +1,91 @@
+"""
+In-process async TTL cache with single-flight loading.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class AsyncTTLCache:
+    """
+    Cache the results of async lookups for a fixed time.
+
+    Concurrent misses for the same key share one call to the loader
+    (single-flight), so a burst of identical requests makes a single
+    upstream request. Waiters being cancelled does not cancel the shared
+    load. Errors are not cached.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._loading: Dict[Hashable, asyncio.Task] = {}
+        self._generation = 0
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None
+    ) -> Any:
+        """
+        Get a cached value, loading it if missing or expired.
+
+        Args:
+            key: Cache key
+            loader: Coroutine function producing the value
+            ttl: Seconds to keep the value (defaults to the cache TTL)
+
+        Returns:
+            Cached or freshly loaded value
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        self.misses += 1
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._loading[key] = task
+            generation = self._generation
+            task.add_done_callback(lambda t: self._store(key, t, generation, ttl))
+        return await asyncio.shield(task)
+
+    def _store(self, key: Hashable, task: asyncio.Task, generation: int, ttl: Optional[float]) -> None:
+        if self._loading.get(key) is task:
+            del self._loading[key]
+        # Skip results that were invalidated while loading
+        if task.cancelled() or task.exception() is not None or generation != self._generation:
+            return
+        self._entries[key] = (task.result(), time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """
+        Drop one key, or everything if key is None.
+
+        Loads already running for the key are detached, so the next lookup
+        fetches fresh data.
+
+        Args:
+            key: Cache key to drop
+        """
+        self._generation += 1
+        if key is None:
+            self._entries.clear()
+            self._loading.clear()
+        else:
+            self._entries.pop(key, None)
+            self._loading.pop(key, None)
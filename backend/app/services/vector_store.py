@@ -0,0 +1,181 @@
+"""
+Append-only on-disk store of message embeddings.
+
+Vectors are normalized and kept as raw float32 rows in vectors-N.f32, with
+the message id of each row in ids-N.bin, so cosine similarity is one
+matrix-vector product over a memory map; the OS pages the file in and
+shares it between worker processes. meta.json records the model,
+dimension, file generation N and number of complete rows. It is replaced
+atomically after each append, so readers never see a partly written row.
+A reset starts a new generation instead of truncating files that other
+processes may have mapped.
+
+A single process appends (see embedding_service); any number can search.
+"""
+import json
+import logging
+import os
+import threading
+from typing import List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ID_BYTES = 36  # UUID string
+# Rows scored per matrix product, bounding the temporary score arrays
+SEARCH_BLOCK_ROWS = 262144
+
+
+class VectorStore:
+    """Float32 vectors with top-k cosine search, stored in one directory."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.model: Optional[str] = None
+        self.dim = 0
+        self.count = 0
+        self.generation = 0
+        self._vectors: Optional[np.memmap] = None
+        self._ids: Optional[np.memmap] = None
+        self._mapped = (None, 0)
+        self._lock = threading.RLock()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _data_files(self, generation: int) -> Tuple[str, str]:
+        return self._file(f"vectors-{generation}.f32"), self._file(f"ids-{generation}.bin")
+
+    def refresh(self) -> None:
+        """Pick up rows appended by another process (or store instance)."""
+        try:
+            with open(self._file("meta.json")) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            meta = {"model": None, "dim": 0, "count": 0, "generation": 0}
+        with self._lock:
+            self.model, self.dim = meta["model"], meta["dim"]
+            self.count, self.generation = meta["count"], meta["generation"]
+
+    def reset(self, model: str, dim: int) -> None:
+        """
+        Empty the store for vectors of a model.
+
+        Args:
+            model: Embedding model name
+            dim: Vector length
+        """
+        os.makedirs(self.path, exist_ok=True)
+        self.refresh()
+        old = self._data_files(self.generation)
+        generation = self.generation + 1
+        for name in self._data_files(generation):
+            open(name, "wb").close()
+        self._write_meta(model, dim, 0, generation)
+        # Mappings held by other processes stay valid after the unlink
+        for name in old:
+            if os.path.exists(name):
+                os.remove(name)
+        logger.info(f"Vector store at {self.path} reset for {model} ({dim} dimensions)")
+
+    def append(self, ids: List[str], vectors) -> int:
+        """
+        Add vectors; only the appending process may call this.
+
+        Rows are written before the metadata that makes them visible.
+
+        Args:
+            ids: Message ids, each ID_BYTES long when encoded
+            vectors: One vector per id, of the store's dimension
+
+        Returns:
+            Row number of the first added vector
+
+        Raises:
+            ValueError: If an id or the vectors do not fit the store
+        """
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dimension {self.dim}, got shape {matrix.shape}")
+        if matrix.shape[0] != len(ids):
+            raise ValueError(f"Got {len(ids)} ids for {matrix.shape[0]} vectors")
+        # Fixed-width records: a longer id would be cut off silently
+        encoded = [message_id.encode() for message_id in ids]
+        for message_id in encoded:
+            if len(message_id) != ID_BYTES:
+                raise ValueError(f"Expected ids of {ID_BYTES} bytes, got {message_id!r}")
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+
+        first = self.count
+        # Truncate to the committed size first: drops rows of an append
+        # that crashed before its metadata was written
+        vectors_file, ids_file = self._data_files(self.generation)
+        for name, data, width in (
+            (vectors_file, matrix.tobytes(), self.dim * 4),
+            (ids_file, np.array(encoded, dtype=f"S{ID_BYTES}").tobytes(), ID_BYTES),
+        ):
+            with open(name, "r+b") as f:
+                f.truncate(first * width)
+                f.seek(first * width)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        self._write_meta(self.model, self.dim, first + len(ids), self.generation)
+        return first
+
+    def search(self, query, k: int) -> List[Tuple[str, float]]:
+        """
+        Find the k most similar vectors by cosine similarity.
+
+        Scores are computed block by block with a matrix-vector product
+        and the best k of each block kept with argpartition.
+
+        Args:
+            query: Query vector
+            k: Number of results
+
+        Returns:
+            (message id, score) pairs, best first
+        """
+        with self._lock:
+            self.refresh()
+            count, dim = self.count, self.dim
+            if count == 0 or k <= 0:
+                return []
+            vectors, ids = self._map()
+        q = np.asarray(query, dtype=np.float32)
+        if q.shape != (dim,):
+            raise ValueError(f"Expected a query of dimension {dim}, got shape {q.shape}")
+        q = q / (np.linalg.norm(q) or 1)
+
+        best_rows = []
+        best_scores = []
+        for start in range(0, count, SEARCH_BLOCK_ROWS):
+            scores = vectors[start:start + SEARCH_BLOCK_ROWS] @ q
+            if len(scores) > k:
+                top = np.argpartition(scores, -k)[-k:]
+            else:
+                top = np.arange(len(scores))
+            best_rows.append(top + start)
+            best_scores.append(scores[top])
+        rows = np.concatenate(best_rows)
+        scores = np.concatenate(best_scores)
+        order = np.argsort(-scores)[:k]
+        return [(ids[rows[i]].decode(), float(scores[i])) for i in order]
+
+    def _map(self) -> Tuple[np.memmap, np.memmap]:
+        """Memory-map the committed rows, remapping after growth (under the lock)."""
+        if self._mapped != (self.generation, self.count):
+            vectors_file, ids_file = self._data_files(self.generation)
+            self._vectors = np.memmap(vectors_file, dtype=np.float32, mode="r", shape=(self.count, self.dim))
+            self._ids = np.memmap(ids_file, dtype=f"S{ID_BYTES}", mode="r", shape=(self.count,))
+            self._mapped = (self.generation, self.count)
+        return self._vectors, self._ids
+
+    def _write_meta(self, model: str, dim: int, count: int, generation: int) -> None:
+        temp = self._file("meta.json.tmp")
+        with open(temp, "w") as f:
+            json.dump({"model": model, "dim": dim, "count": count, "generation": generation}, f)
+        os.replace(temp, self._file("meta.json"))
+        self.model, self.dim, self.count, self.generation = model, dim, count, generation
@@ -0,0 +1,104 @@
+"""
+Benchmark: one Ollama instance vs a pool of instances with load-aware routing.
+
+Each fake server runs a limited number of generations at a time
+(--parallel) with a delay per token, like a GPU-bound Ollama, so
+throughput scales with the number of backends. The pool run also includes
+one address with nothing listening to show it being ejected and the
+traffic failing over to the live nodes.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_backend_pool --requests 400 --concurrency 32 --backends 3
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from contextlib import ExitStack
+from app.config import settings
+from app.models.schemas import GenerateRequest, MessageSchema, Parameters
+from app.services.ollama_service import OllamaService
+from benchmarks.fake_ollama import FakeOllamaServer, free_port
+
+logging.getLogger("app").setLevel(logging.ERROR)
+
+
+def build_request() -> GenerateRequest:
+    return GenerateRequest(
+        model="fake:latest",
+        endpoint_type="chat",
+        messages=[MessageSchema(role="user", content="Hello")],
+        parameters=Parameters(),
+    )
+
+
+async def run(urls: list, total: int, concurrency: int) -> dict:
+    settings.OLLAMA_BASE_URLS = urls
+    settings.OLLAMA_HEALTH_INTERVAL = 0
+    service = OllamaService()
+    request = build_request()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                async for _ in service.stream_chat(request):
+                    pass
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    status = service.pool.status()
+    await service.close()
+
+    latencies.sort()
+    return {
+        "req_per_sec": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors,
+        "backends": status,
+    }
+
+
+async def main(total: int, concurrency: int, backends: int, token_delay: float, parallel: int):
+    with ExitStack() as stack:
+        servers = [
+            stack.enter_context(FakeOllamaServer(tokens=16, token_delay=token_delay, parallel=parallel))
+            for _ in range(backends)
+        ]
+        dead = f"http://127.0.0.1:{free_port()}"
+
+        single = await run([servers[0].url], total, concurrency)
+        pooled = await run([s.url for s in servers] + [dead], total, concurrency)
+
+    print(f"{'mode':<12}{'req/s':>10}{'p50':>12}{'p99':>12}{'errors':>8}")
+    for name, result in (("single", single), (f"pool x{backends}", pooled)):
+        print(
+            f"{name:<12}{result['req_per_sec']:>10.1f}"
+            f"{result['p50_ms']:>10.1f}ms{result['p99_ms']:>10.1f}ms{result['errors']:>8}"
+        )
+    print("\npool state after run:")
+    for backend in pooled["backends"]:
+        state = "healthy" if backend["healthy"] else "ejected"
+        print(f"  {backend['url']:<28}{state:>9}  failures={backend['failures']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--backends", type=int, default=3)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    parser.add_argument("--parallel", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.backends, args.token_delay, args.parallel))
@@ -0,0 +1,105 @@
+"""
+Benchmark: streaming bulk export throughput and memory.
+
+Exports every session of a synthetic database in each format and
+compression, and reports throughput and the peak Python memory allocated
+while streaming (tracemalloc). The peak should stay about the same as the
+database grows, since rows are read through a cursor in batches and the
+output is never held in full. tracemalloc slows Python down, so the
+throughput shown is a lower bound.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_bulk_export --messages 10000 50000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+# Point the app at a scratch database before it creates its engines
+_workdir = tempfile.mkdtemp(prefix="bench-bulk-export-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_workdir}/bench.db")
+os.environ.setdefault("DEBUG", "False")  # No SQL echo
+
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from app.database import engine, AsyncSessionLocal, AsyncReadSessionLocal
+from app.models.database import Base, Session, Message
+from app.services.bulk_export import EXPORTERS, export_query, export_stream
+
+logging.getLogger("app").setLevel(logging.CRITICAL)
+
+PARAGRAPH = (
+    "The quick brown fox jumps over the lazy dog. Pack my box with five dozen "
+    "liquor jugs. How vexingly quick daft zebras jump! "
+)
+MESSAGES_PER_SESSION = 50
+
+
+async def add_messages(total: int) -> None:
+    """Insert sessions of MESSAGES_PER_SESSION alternating user/assistant turns."""
+    start = datetime(2024, 1, 1)
+    async with AsyncSessionLocal() as db:
+        for _ in range(total // MESSAGES_PER_SESSION):
+            session = Session(name="Benchmark", model_name="llama2:latest", endpoint_type="chat")
+            db.add(session)
+            await db.flush()
+            rows = [
+                {
+                    "session_id": session.id,
+                    "role": "user" if i % 2 == 0 else "assistant",
+                    "content": PARAGRAPH * (1 if i % 2 == 0 else 6),
+                    "timestamp": start + timedelta(seconds=i),
+                    "token_count": 40,
+                    "truncated": False,
+                }
+                for i in range(MESSAGES_PER_SESSION)
+            ]
+            await db.execute(insert(Message), rows)
+        await db.commit()
+
+
+async def export(format: str, compression):
+    """Bytes written, seconds taken and peak memory of one full export."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = 0
+    async with AsyncReadSessionLocal() as db:
+        async for chunk in export_stream(db, export_query(), EXPORTERS[format](), compression):
+            size += len(chunk)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+async def main(sizes, formats, compressions):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    print(f"{'messages':>8}  {'format':<9}{'compress':<9}{'MB out':>8}{'seconds':>9}{'msg/s':>9}{'peak MB':>9}")
+    total = 0
+    for size in sizes:
+        await add_messages(size - total)
+        total = size
+        for format in formats:
+            for compression in compressions:
+                out, elapsed, peak = await export(format, None if compression == "none" else compression)
+                print(
+                    f"{size:>8}  {format:<9}{compression:<9}{out / 1e6:>8.1f}{elapsed:>9.2f}"
+                    f"{size / elapsed:>9.0f}{peak / 1e6:>9.1f}"
+                )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--formats", nargs="+", default=list(EXPORTERS), choices=list(EXPORTERS))
+    parser.add_argument("--compression", nargs="+", default=["none", "gzip", "zip"], choices=["none", "gzip", "zip"])
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, args.formats, args.compression))
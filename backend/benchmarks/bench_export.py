@@ -0,0 +1,128 @@
+"""
+Benchmark: PDF export of large sessions and how long it stalls the event loop.
+
+"inline" is the original handler: every message loaded with get_messages
+and the PDF built with ReportLab on the event loop. "job" is the export
+job: messages copied out in chunks and the PDF rendered in a worker
+process. "cached" exports the unchanged session again.
+
+A ticker coroutine measures the event loop's worst stall during each
+export, which is how long every in-flight token stream would freeze.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_export --messages 1000 5000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+# Point the app at a scratch database before it creates its engines
+_workdir = tempfile.mkdtemp(prefix="bench-export-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_workdir}/bench.db")
+os.environ.setdefault("EXPORT_CACHE_DIR", os.path.join(_workdir, "exports"))
+os.environ.setdefault("DEBUG", "False")  # No SQL echo
+
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from app.database import engine, AsyncSessionLocal
+from app.models.database import Base, Session, Message
+from app.services.export_jobs import export_jobs
+from app.services.export_service import ExportService
+from app.services.session_service import SessionService
+
+logging.getLogger("app").setLevel(logging.CRITICAL)
+
+PARAGRAPH = (
+    "The quick brown fox jumps over the lazy dog. Pack my box with five dozen "
+    "liquor jugs. How vexingly quick daft zebras jump! "
+)
+
+
+async def create_session(message_count: int) -> str:
+    """Insert a synthetic session with alternating user/assistant turns."""
+    start = datetime(2024, 1, 1)
+    async with AsyncSessionLocal() as db:
+        session = Session(name=f"Benchmark {message_count}", model_name="llama2:latest", endpoint_type="chat")
+        db.add(session)
+        await db.flush()
+        rows = [
+            {
+                "session_id": session.id,
+                "role": "user" if i % 2 == 0 else "assistant",
+                "content": PARAGRAPH * (1 if i % 2 == 0 else 6),
+                "timestamp": start + timedelta(seconds=i),
+                "token_count": 40,
+                "truncated": False,
+            }
+            for i in range(message_count)
+        ]
+        await db.execute(insert(Message), rows)
+        await db.commit()
+        return session.id
+
+
+async def inline_export(session_id: str) -> None:
+    async with AsyncSessionLocal() as db:
+        service = SessionService(db)
+        session = await service.get_session(session_id)
+        messages = await service.get_messages(session_id)
+        ExportService.export_to_pdf(session, messages)
+
+
+async def job_export(session_id: str) -> None:
+    async with AsyncSessionLocal() as db:
+        session = await SessionService(db).get_session(session_id)
+        job_id = await export_jobs.job_id_for(db, session)
+    job = await export_jobs.submit(session, job_id)
+    job = await export_jobs.wait(job["job_id"])
+    assert job["status"] == "completed", job
+
+
+async def measure(export, session_id: str):
+    """Wall time and worst event loop stall of one export."""
+    worst = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal worst
+        while not done:
+            before = time.perf_counter()
+            await asyncio.sleep(0.005)
+            worst = max(worst, time.perf_counter() - before - 0.005)
+
+    tick = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await export(session_id)
+    elapsed = time.perf_counter() - start
+    done = True
+    await tick
+    return elapsed, worst
+
+
+async def main(sizes):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    # Start the worker processes outside the measurements
+    warmup = await create_session(2)
+    await job_export(warmup)
+
+    print(f"{'messages':>8}  {'mode':<8}{'seconds':>10}{'max stall ms':>14}")
+    for size in sizes:
+        session_id = await create_session(size)
+        for mode, export in (("inline", inline_export), ("job", job_export), ("cached", job_export)):
+            elapsed, worst = await measure(export, session_id)
+            print(f"{size:>8}  {mode:<8}{elapsed:>10.2f}{worst * 1000:>14.1f}")
+
+    await export_jobs.close()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, nargs="+", default=[1000, 5000])
+    args = parser.parse_args()
+    asyncio.run(main(args.messages))
@@ -0,0 +1,105 @@
+"""
+Benchmark: JSONL session import against one add_message commit per message.
+
+"import" streams a generated archive (sessions of 50 messages, in the
+JSONL export format) through the importer, which inserts with
+executemany in batched transactions. "add_message" stores a smaller
+number of messages the old way, one transaction each. Peak RSS shows
+that memory does not grow with the archive; it includes SQLite's memory
+map of the database file, so run with SQLITE_MMAP_SIZE=0 to see the
+importer alone.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_import --messages 100000 1000000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import tempfile
+import time
+
+# Point the app at a scratch database before it creates its engines
+_workdir = tempfile.mkdtemp(prefix="bench-import-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_workdir}/bench.db")
+os.environ.setdefault("DEBUG", "False")  # No SQL echo
+
+from app.database import engine, AsyncSessionLocal
+from app.models.database import Base, Session
+from app.services.session_import import SessionImporter
+from app.services.session_service import SessionService
+
+logging.getLogger("app").setLevel(logging.CRITICAL)
+
+PARAGRAPH = (
+    "The quick brown fox jumps over the lazy dog. Pack my box with five dozen "
+    "liquor jugs. How vexingly quick daft zebras jump! "
+)
+MESSAGES_PER_SESSION = 50
+CHUNK_BYTES = 64 * 1024
+
+
+async def archive(message_count: int):
+    """Generate a JSONL archive in request-sized chunks."""
+    pending = []
+    size = 0
+    for n in range(message_count // MESSAGES_PER_SESSION):
+        line = json.dumps({
+            "name": f"Imported {n}",
+            "model": "llama2:latest",
+            "created_at": "2024-01-01T00:00:00",
+            "messages": [
+                {"role": "user" if i % 2 == 0 else "assistant", "content": PARAGRAPH * (1 if i % 2 == 0 else 6)}
+                for i in range(MESSAGES_PER_SESSION)
+            ],
+        }) + "\n"
+        pending.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield "".join(pending).encode()
+            pending, size = [], 0
+            await asyncio.sleep(0)
+    yield "".join(pending).encode()
+
+
+async def add_message_baseline(message_count: int) -> float:
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        service = SessionService(db)
+        session = Session(name="Baseline", model_name="llama2:latest", endpoint_type="chat")
+        db.add(session)
+        await db.commit()
+        for i in range(message_count):
+            await service.add_message(session.id, "user" if i % 2 == 0 else "assistant", PARAGRAPH)
+    return time.perf_counter() - start
+
+
+async def main(sizes, baseline, batch_size):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    print(f"{'messages':>9}  {'mode':<12}{'seconds':>9}{'rows/s':>10}{'peak RSS MB':>13}")
+    if baseline:
+        elapsed = await add_message_baseline(baseline)
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"{baseline:>9}  {'add_message':<12}{elapsed:>9.2f}{baseline / elapsed:>10.0f}{rss:>13.0f}")
+
+    importer = SessionImporter(batch_size=batch_size)
+    for size in sizes:
+        result = await importer.import_stream(archive(size))
+        assert result["messages"] == size and not result["skipped"], result
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"{size:>9}  {'import':<12}{result['seconds']:>9.2f}{result['rows_per_second']:>10}{rss:>13.0f}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--baseline", type=int, default=2000, help="Messages stored with add_message (0 to skip)")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, args.baseline, args.batch_size))
@@ -0,0 +1,100 @@
+"""
+Benchmark: per-call httpx clients vs the shared pooled OllamaService client.
+
+Runs a fake Ollama server locally and measures requests/sec plus
+time-to-first-token (p50/p99) for concurrent streaming chats.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_ollama_client --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import httpx
+from app.config import settings
+from app.models.schemas import GenerateRequest, MessageSchema, Parameters
+from app.services.ollama_service import OllamaService
+from benchmarks.fake_ollama import FakeOllamaServer
+
+
+def build_request() -> GenerateRequest:
+    return GenerateRequest(
+        model="fake:latest",
+        endpoint_type="chat",
+        messages=[MessageSchema(role="user", content="Hello")],
+        parameters=Parameters(),
+    )
+
+
+async def per_call_stream_chat(service: OllamaService, request: GenerateRequest):
+    """Old behaviour: a brand-new AsyncClient for every call."""
+    payload = {
+        "model": request.model,
+        "messages": [{"role": msg.role, "content": msg.content} for msg in request.messages],
+        "options": service._build_options(request.parameters),
+        "stream": True
+    }
+    async with httpx.AsyncClient(timeout=None) as client:
+        async with client.stream("POST", f"{service.base_url}/api/chat", json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line:
+                    yield json.loads(line)
+
+
+async def run(stream_factory, total: int, concurrency: int) -> dict:
+    """Drive `total` streaming chats with bounded concurrency."""
+    request = build_request()
+    semaphore = asyncio.Semaphore(concurrency)
+    ttfts = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            first = None
+            async for _ in stream_factory(request):
+                if first is None:
+                    first = time.perf_counter() - start
+            ttfts.append(first)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+
+    ttfts.sort()
+    return {
+        "req_per_sec": total / elapsed,
+        "ttft_p50_ms": statistics.median(ttfts) * 1000,
+        "ttft_p99_ms": ttfts[int(len(ttfts) * 0.99) - 1] * 1000,
+    }
+
+
+async def main(total: int, concurrency: int, tokens: int):
+    with FakeOllamaServer(tokens=tokens) as server:
+        settings.OLLAMA_BASE_URL = server.url
+        service = OllamaService()
+
+        # Warm up the fake server
+        await run(service.stream_chat, 20, 5)
+
+        before = await run(lambda r: per_call_stream_chat(service, r), total, concurrency)
+        after = await run(service.stream_chat, total, concurrency)
+        await service.close()
+
+    print(f"{'mode':<12}{'req/s':>10}{'ttft p50':>12}{'ttft p99':>12}")
+    for name, result in (("per-call", before), ("pooled", after)):
+        print(
+            f"{name:<12}{result['req_per_sec']:>10.1f}"
+            f"{result['ttft_p50_ms']:>10.2f}ms{result['ttft_p99_ms']:>10.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--tokens", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.tokens))
@@ -0,0 +1,135 @@
+"""
+Benchmark: full-text search latency against a LIKE '%term%' scan.
+
+Fills a migrated database with synthetic messages whose words follow a
+Zipf distribution, then times a page of search results for a common,
+a medium and a rare word, for two words together and for a filtered
+query, each against the equivalent LIKE query the endpoint would
+otherwise need.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_search --messages 100000 1000000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+
+# Point the app at a scratch database before it creates its engines
+_workdir = tempfile.mkdtemp(prefix="bench-search-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_workdir}/bench.db")
+os.environ.setdefault("DEBUG", "False")  # No SQL echo
+
+from sqlalchemy import select, func
+from app.database import init_db, close_db, AsyncReadSessionLocal
+from app.models.database import Message, Session
+from app.services.search_service import SearchService
+from app.services.session_import import SessionImporter
+
+logging.getLogger("app").setLevel(logging.CRITICAL)
+logging.getLogger("alembic").setLevel(logging.WARNING)
+
+VOCABULARY_SIZE = 20000
+WORDS_PER_MESSAGE = 40
+MESSAGES_PER_SESSION = 50
+MODELS = ["llama3:8b", "mistral:7b", "qwen2:7b"]
+RUNS = 5
+
+
+def vocabulary(rng: random.Random):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(4, 9))))
+    return sorted(words)
+
+
+async def archive(message_count: int, offset: int, words, weights, rng: random.Random):
+    """Generate sessions as JSONL chunks for the importer."""
+    pending = []
+    for n in range(offset // MESSAGES_PER_SESSION, (offset + message_count) // MESSAGES_PER_SESSION):
+        pending.append(json.dumps({
+            "name": f"Session {n}",
+            "model": MODELS[n % len(MODELS)],
+            "messages": [
+                {
+                    "role": "user" if i % 2 == 0 else "assistant",
+                    "content": " ".join(rng.choices(words, weights, k=WORDS_PER_MESSAGE)),
+                }
+                for i in range(MESSAGES_PER_SESSION)
+            ],
+        }) + "\n")
+        if len(pending) == 20:
+            yield "".join(pending).encode()
+            pending = []
+    yield "".join(pending).encode()
+
+
+async def timed(query) -> float:
+    """Median milliseconds of RUNS executions."""
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        await query()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+async def like_scan(db, words, role=None, model=None):
+    statement = (
+        select(Message.id, Message.content)
+        .join(Session, Session.id == Message.session_id)
+        .order_by(Message.timestamp.desc())
+        .limit(21)
+    )
+    for word in words:
+        statement = statement.where(Message.content.like(f"%{word}%"))
+    if role:
+        statement = statement.where(Message.role == role)
+    if model:
+        statement = statement.where(func.coalesce(Message.model, Session.model_name) == model)
+    return (await db.execute(statement)).all()
+
+
+async def main(sizes, batch_size):
+    await init_db()
+    rng = random.Random(42)
+    words = vocabulary(rng)
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    importer = SessionImporter(batch_size=batch_size)
+
+    cases = [
+        ("common word", [words[5]], {}),
+        ("medium word", [words[500]], {}),
+        ("rare word", [words[15000]], {}),
+        ("two words", [words[50], words[800]], {}),
+        ("filtered", [words[500]], {"role": "assistant", "model": MODELS[1]}),
+    ]
+
+    print(f"{'messages':>9}  {'query':<13}{'fts ms':>9}{'like ms':>10}{'speedup':>9}")
+    total = 0
+    for size in sizes:
+        result = await importer.import_stream(archive(size - total, total, words, weights, rng))
+        total = size
+        assert not result["skipped"], result
+        async with AsyncReadSessionLocal() as db:
+            search = SearchService(db)
+            for label, terms, filters in cases:
+                fts = await timed(lambda: search.search(" ".join(terms), limit=20, **filters))
+                like = await timed(lambda: like_scan(db, terms, **filters))
+                print(f"{size:>9}  {label:<13}{fts:>9.1f}{like:>10.1f}{like / fts:>8.0f}x")
+
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, args.batch_size))
@@ -0,0 +1,74 @@
+"""
+Benchmark: top-k cosine search latency of the embedding vector store.
+
+Appends random unit vectors (the dimension of common embedding models)
+to a VectorStore in a scratch directory, then times top-10 queries with
+the file freshly mapped (first query) and warm in the page cache,
+against a brute-force argsort over the full score vector.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_semantic_search --vectors 100000 1000000 --dim 768
+"""
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+import numpy as np
+from app.services.vector_store import VectorStore
+
+APPEND_BATCH = 10000
+QUERIES = 20
+K = 10
+
+
+def timed(query) -> float:
+    """Milliseconds of one execution."""
+    start = time.perf_counter()
+    query()
+    return (time.perf_counter() - start) * 1000
+
+
+def main(sizes, dim):
+    rng = np.random.default_rng(42)
+    workdir = tempfile.mkdtemp(prefix="bench-vectors-")
+    try:
+        store = VectorStore(workdir)
+        store.reset("bench", dim)
+        queries = rng.standard_normal((QUERIES, dim), dtype=np.float32)
+
+        print(f"{'vectors':>9}{'dim':>6}{'MB':>8}{'append/s':>11}{'first ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'argsort ms':>12}")
+        for size in sizes:
+            start = time.perf_counter()
+            added = size - store.count
+            while store.count < size:
+                n = min(APPEND_BATCH, size - store.count)
+                store.append([str(uuid.uuid4()) for _ in range(n)], rng.standard_normal((n, dim), dtype=np.float32))
+            append_rate = added / (time.perf_counter() - start)
+
+            reader = VectorStore(workdir)
+            first = timed(lambda: reader.search(queries[0], K))
+            times = sorted(timed(lambda: reader.search(q, K)) for q in queries)
+            vectors, _ = reader._map()
+            naive = statistics.median(timed(lambda: np.argsort(-(vectors @ q))[:K]) for q in queries[:5])
+
+            # The block-wise search must agree with the brute-force ranking
+            expected = np.argsort(-(vectors @ (queries[1] / np.linalg.norm(queries[1]))))[:K]
+            _, ids = reader._map()
+            assert [i for i, _ in reader.search(queries[1], K)] == [ids[r].decode() for r in expected]
+
+            print(
+                f"{size:>9}{dim:>6}{size * dim * 4 / 2**20:>8.0f}{append_rate:>11.0f}{first:>10.1f}"
+                f"{statistics.median(times):>9.1f}{times[int(len(times) * 0.95) - 1]:>9.1f}{naive:>12.1f}"
+            )
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--dim", type=int, default=768)
+    args = parser.parse_args()
+    main(args.vectors, args.dim)
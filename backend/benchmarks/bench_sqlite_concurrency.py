@@ -0,0 +1,118 @@
+"""
+Benchmark: concurrent SQLite reads and writes, before and after WAL + pools.
+
+"before" is the original engine (one shared connection via StaticPool,
+rollback journal, default pragmas). "after" uses create_db_engine: WAL,
+tuned pragmas, a writer pool and a separate read-only pool.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_sqlite_concurrency --seconds 5 --writers 4 --readers 16
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.config import settings
+from app.database import create_db_engine
+from app.models.database import Base, Session, Message
+from app.services.session_service import SessionService
+
+settings.DEBUG = False
+logging.getLogger("app").setLevel(logging.CRITICAL)
+
+
+def legacy_engines(url: str):
+    engine = create_async_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": 30},
+        poolclass=StaticPool,
+    )
+    return engine, engine
+
+
+def tuned_engines(url: str):
+    return create_db_engine(url), create_db_engine(url, read_only=True)
+
+
+async def seed(engine, sessions: int, messages: int) -> list:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    ids = []
+    async with factory() as db:
+        for i in range(sessions):
+            session = Session(name=f"s{i}", model_name="fake", endpoint_type="chat")
+            db.add(session)
+            await db.flush()
+            ids.append(session.id)
+            db.add_all(
+                Message(session_id=session.id, role="user", content="x" * 400, token_count=100)
+                for _ in range(messages)
+            )
+        await db.commit()
+    return ids
+
+
+async def run(make_engines, seconds: float, writers: int, readers: int) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    url = f"sqlite+aiosqlite:///{path}"
+    write_engine, read_engine = make_engines(url)
+    session_ids = await seed(write_engine, 50, 200)
+
+    writes = async_sessionmaker(write_engine, class_=AsyncSession, expire_on_commit=False)
+    reads = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+    counts = {"writes": 0, "reads": 0, "errors": 0}
+    deadline = time.perf_counter() + seconds
+
+    async def writer(n: int):
+        while time.perf_counter() < deadline:
+            try:
+                async with writes() as db:
+                    await SessionService(db).add_message(session_ids[n % len(session_ids)], "user", "hello " * 50)
+                counts["writes"] += 1
+            except Exception:
+                counts["errors"] += 1
+
+    async def reader(n: int):
+        while time.perf_counter() < deadline:
+            try:
+                async with reads() as db:
+                    service = SessionService(db)
+                    if n % 2:
+                        await service.list_sessions(limit=50)
+                    else:
+                        await service.get_messages(session_ids[n % len(session_ids)], 50)
+                counts["reads"] += 1
+            except Exception:
+                counts["errors"] += 1
+
+    await asyncio.gather(
+        *(writer(i) for i in range(writers)),
+        *(reader(i) for i in range(readers)),
+    )
+
+    await write_engine.dispose()
+    if read_engine is not write_engine:
+        await read_engine.dispose()
+
+    return {key: value / seconds if key != "errors" else value for key, value in counts.items()}
+
+
+async def main(seconds: float, writers: int, readers: int):
+    print(f"{'mode':<12}{'writes/s':>10}{'reads/s':>10}{'errors':>8}")
+    for name, factory in (("static", legacy_engines), ("wal+pools", tuned_engines)):
+        result = await run(factory, seconds, writers, readers)
+        print(f"{name:<12}{result['writes']:>10.1f}{result['reads']:>10.1f}{result['errors']:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(main(args.seconds, args.writers, args.readers))
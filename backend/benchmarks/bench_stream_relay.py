@@ -0,0 +1,106 @@
+"""
+Microbenchmark: CPU cost per token of relaying an Ollama stream to a client.
+
+"decode/encode" is the original relay: every line is decoded to a dict with
+json.loads, re-encoded with json.dumps + "\\n" and the content appended with
+`+=`. "raw" forwards Ollama's bytes unchanged through relay_batches, reads
+the content of each line with ndjson.scan_chunk (decoded with orjson, or cut
+out of the bytes without it), and accumulates into a list. "raw+frames" also coalesces lines
+into frames of up to STREAM_FRAME_MAX_BYTES.
+
+No network is involved: the source yields pre-built lines as fast as
+possible, so the numbers are pure relay overhead.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_stream_relay --tokens 4096 --runs 20
+"""
+import argparse
+import asyncio
+import json
+import time
+from app.config import settings
+from app.services import ndjson
+from app.services.stream_registry import relay_batches
+
+
+def build_lines(tokens: int) -> list:
+    """NDJSON lines as Ollama's /api/chat emits them."""
+    lines = [
+        json.dumps({
+            "model": "llama2:latest",
+            "created_at": "2024-01-15T10:00:00.000000Z",
+            "message": {"role": "assistant", "content": f" tok{i}"},
+            "done": False,
+        }, separators=(",", ":")).encode()
+        for i in range(tokens)
+    ]
+    lines.append(json.dumps({
+        "model": "llama2:latest",
+        "created_at": "2024-01-15T10:00:00.000000Z",
+        "message": {"role": "assistant", "content": ""},
+        "done": True,
+        "eval_count": tokens,
+    }, separators=(",", ":")).encode())
+    return lines
+
+
+async def source(lines: list, decode: bool = False):
+    for line in lines:
+        yield line.decode() if decode else line
+
+
+async def decode_encode(lines: list) -> int:
+    """The original relay loop."""
+    full_content = ""
+    written = 0
+    async for line in source(lines, decode=True):
+        chunk = json.loads(line)
+        if "message" in chunk and "content" in chunk["message"]:
+            full_content += chunk["message"]["content"]
+        written += len(json.dumps(chunk) + "\n")
+    return written
+
+
+async def raw(lines: list, max_bytes: int) -> int:
+    """The raw-bytes relay used by /api/chat/generate."""
+    parts = []
+    written = 0
+    async for frame in relay_batches(source(lines), None, max_bytes=max_bytes):
+        for line in frame:
+            content, _ = ndjson.scan_chunk(line)
+            if content:
+                parts.append(content)
+        written += len(b"\n".join(frame) + b"\n")
+    "".join(parts)
+    return written
+
+
+async def measure(relay, lines: list, runs: int) -> float:
+    """CPU microseconds per token."""
+    await relay(lines)  # Warm up
+    start = time.process_time()
+    for _ in range(runs):
+        await relay(lines)
+    return (time.process_time() - start) / runs / len(lines) * 1e6
+
+
+async def main(tokens: int, runs: int):
+    lines = build_lines(tokens)
+    results = [
+        ("decode/encode", await measure(decode_encode, lines, runs)),
+        ("raw", await measure(lambda l: raw(l, max_bytes=1), lines, runs)),
+        ("raw+frames", await measure(lambda l: raw(l, max_bytes=settings.STREAM_FRAME_MAX_BYTES), lines, runs)),
+    ]
+    parser = "orjson" if ndjson.orjson is not None else "json"
+    print(f"{tokens} tokens per reply, {runs} runs, parser: {parser}")
+    print(f"{'mode':<16}{'us/token':>10}")
+    for name, cost in results:
+        print(f"{name:<16}{cost:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=4096)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.tokens, args.runs))
@@ -0,0 +1,192 @@
+"""
+Minimal fake Ollama server for benchmarks.
+
+Implements just enough of the Ollama HTTP API (tags, ps, show, chat,
+generate, pull, delete, embed) to exercise the backend without a real model server.
+"""
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+import asyncio
+import hashlib
+import json
+import math
+import re
+import socket
+import threading
+import time
+import uvicorn
+
+
+def embed_text(text: str, dim: int) -> list:
+    """
+    Bag-of-words vector: each word adds 1 to a dimension picked by its hash,
+    so texts sharing words have a high cosine similarity.
+    """
+    vector = [0.0] * dim
+    for word in re.findall(r"\w+", text.lower()):
+        vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % dim] += 1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def create_app(
+    tokens: int = 32,
+    token_delay: float = 0.0,
+    models=None,
+    parallel: int = None,
+    embedding_dim: int = 64
+) -> FastAPI:
+    """
+    Build a fake Ollama app.
+    
+    Args:
+        tokens: Number of content chunks streamed per generation
+        token_delay: Seconds to sleep between chunks
+        models: Model names reported by /api/tags
+        parallel: Max concurrent generations, like OLLAMA_NUM_PARALLEL (None = unlimited)
+        embedding_dim: Length of the vectors returned by /api/embed
+    
+    Returns:
+        FastAPI application
+    """
+    app = FastAPI()
+    model_names = list(models or ["fake:latest"])
+    loaded = set()
+    slots = asyncio.Semaphore(parallel) if parallel else None
+
+    def final_chunk(model: str, key: str) -> dict:
+        chunk = {
+            "model": model,
+            "done": True,
+            "total_duration": 1_000_000,
+            "load_duration": 100_000,
+            "prompt_eval_count": 12,
+            "prompt_eval_duration": 200_000,
+            "eval_count": tokens,
+            "eval_duration": 700_000,
+        }
+        if key == "message":
+            chunk["message"] = {"role": "assistant", "content": ""}
+        else:
+            chunk["response"] = ""
+        return chunk
+
+    async def stream(model: str, key: str):
+        if slots:
+            async with slots:
+                async for chunk in generate_chunks(model, key):
+                    yield chunk
+        else:
+            async for chunk in generate_chunks(model, key):
+                yield chunk
+
+    async def generate_chunks(model: str, key: str):
+        for i in range(tokens):
+            if token_delay:
+                await asyncio.sleep(token_delay)
+            if key == "message":
+                chunk = {"model": model, "message": {"role": "assistant", "content": f"tok{i} "}, "done": False}
+            else:
+                chunk = {"model": model, "response": f"tok{i} ", "done": False}
+            yield json.dumps(chunk) + "\n"
+        yield json.dumps(final_chunk(model, key)) + "\n"
+
+    async def respond(body: dict, key: str):
+        model = body.get("model", model_names[0])
+        if body.get("keep_alive") == 0:
+            loaded.discard(model)
+            return {"model": model, "done": True, "done_reason": "unload", key: "" if key == "response" else []}
+        loaded.add(model)
+        if "prompt" not in body and "messages" not in body:
+            # Load request
+            return {"model": model, "done": True, "done_reason": "load", "load_duration": 100_000, key: ""}
+        if body.get("stream", True):
+            return StreamingResponse(stream(model, key), media_type="application/x-ndjson")
+        content = "".join(f"tok{i} " for i in range(tokens))
+        result = final_chunk(model, key)
+        if key == "message":
+            result["message"]["content"] = content
+        else:
+            result["response"] = content
+        return result
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [
+            {"name": name, "modified_at": "2024-01-01T00:00:00Z", "size": 1, "digest": "sha256:0"}
+            for name in model_names
+        ]}
+
+    @app.get("/api/ps")
+    async def ps():
+        return {"models": [{"name": name, "model": name, "size": 1} for name in sorted(loaded)]}
+
+    @app.post("/api/show")
+    async def show(request: Request):
+        return {"modelfile": "FROM fake", "parameters": "", "template": "{{ .Prompt }}", "details": {}}
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        return await respond(await request.json(), "message")
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        return await respond(await request.json(), "response")
+
+    @app.post("/api/pull")
+    async def pull(request: Request):
+        async def progress():
+            for completed in range(0, 101, 10):
+                if token_delay:
+                    await asyncio.sleep(token_delay)
+                yield json.dumps({"status": "downloading", "total": 100, "completed": completed}) + "\n"
+            yield json.dumps({"status": "success"}) + "\n"
+        return StreamingResponse(progress(), media_type="application/x-ndjson")
+
+    @app.delete("/api/delete")
+    async def delete(request: Request):
+        return {}
+
+    @app.post("/api/embed")
+    async def embed(request: Request):
+        body = await request.json()
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        return {"model": body["model"], "embeddings": [embed_text(t, embedding_dim) for t in texts]}
+
+    return app
+
+
+def free_port() -> int:
+    """Return an unused local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeOllamaServer:
+    """Runs a fake Ollama app with uvicorn in a background thread."""
+
+    def __init__(self, port: int = None, **app_kwargs):
+        self.port = port or free_port()
+        config = uvicorn.Config(
+            create_app(**app_kwargs),
+            host="127.0.0.1",
+            port=self.port,
+            log_level="warning",
+        )
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
@@ -0,0 +1,21 @@
+"""
+Gunicorn configuration for running the API with uvicorn workers.
+
+Usage (from the backend directory):
+    gunicorn -c gunicorn.conf.py app.main:app
+"""
+from app.config import settings
+from app.server import prepare_workers, worker_count
+
+bind = f"{settings.HOST}:{settings.PORT}"
+workers = worker_count()
+worker_class = "uvicorn.workers.UvicornWorker"
+# Generations stream for minutes; don't let gunicorn kill busy workers
+timeout = 0
+graceful_timeout = 30
+keepalive = 5
+
+
+def on_starting(server):
+    """Runs once in the master process before workers are forked."""
+    prepare_workers(workers)
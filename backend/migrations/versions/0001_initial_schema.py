@@ -0,0 +1,53 @@
+"""Initial schema: sessions, messages, parameter presets
+
+Matches databases created with Base.metadata.create_all before migrations
+were introduced; init_db stamps those at this revision.
+
+Revision ID: 0001
+Revises:
+Create Date: 2024-01-15 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+JSONType = sa.JSON().with_variant(JSONB(), "postgresql")
+
+
+def upgrade():
+    op.create_table(
+        "sessions",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("model_name", sa.String(), nullable=False),
+        sa.Column("endpoint_type", sa.String(), nullable=False),
+    )
+    op.create_table(
+        "messages",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("session_id", sa.String(), sa.ForeignKey("sessions.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("role", sa.String(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.Column("parameters", JSONType, nullable=True),
+    )
+    op.create_table(
+        "parameter_presets",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(), unique=True, nullable=False),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("parameters", JSONType, nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("parameter_presets")
+    op.drop_table("messages")
+    op.drop_table("sessions")
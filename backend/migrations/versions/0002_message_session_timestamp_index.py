@@ -0,0 +1,24 @@
+"""Composite (session_id, timestamp) index on messages
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-02-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Pre-migration databases may already have it from create_all
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("messages")}
+    if "ix_messages_session_timestamp" not in existing:
+        op.create_index("ix_messages_session_timestamp", "messages", ["session_id", "timestamp"])
+
+
+def downgrade():
+    op.drop_index("ix_messages_session_timestamp", table_name="messages")
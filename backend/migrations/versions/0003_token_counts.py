@@ -0,0 +1,43 @@
+"""Per-message token counts and per-session running total
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-02-15 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def _columns(table: str) -> set:
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    # Pre-migration databases may already have these from the startup backfill
+    if "token_count" not in _columns("messages"):
+        op.add_column("messages", sa.Column("token_count", sa.Integer(), nullable=True))
+        op.execute(
+            "UPDATE messages SET token_count = "
+            "CASE WHEN LENGTH(content) < 8 THEN 1 ELSE LENGTH(content) / 4 END"
+        )
+    if "total_tokens" not in _columns("sessions"):
+        op.add_column(
+            "sessions",
+            sa.Column("total_tokens", sa.Integer(), nullable=False, server_default="0"),
+        )
+        op.execute(
+            "UPDATE sessions SET total_tokens = COALESCE("
+            "(SELECT SUM(token_count) FROM messages WHERE messages.session_id = sessions.id), 0)"
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("sessions") as batch:
+        batch.drop_column("total_tokens")
+    with op.batch_alter_table("messages") as batch:
+        batch.drop_column("token_count")
@@ -0,0 +1,25 @@
+"""Flag for assistant messages cut short by a cancelled generation
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2024-03-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "messages",
+        sa.Column("truncated", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("messages") as batch:
+        batch.drop_column("truncated")
@@ -0,0 +1,38 @@
+"""Ollama performance statistics on assistant messages
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2024-03-15 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+STAT_COLUMNS = (
+    ("eval_count", sa.Integer()),
+    ("eval_duration", sa.BigInteger()),
+    ("prompt_eval_count", sa.Integer()),
+    ("prompt_eval_duration", sa.BigInteger()),
+    ("load_duration", sa.BigInteger()),
+    ("total_duration", sa.BigInteger()),
+    ("time_to_first_token", sa.BigInteger()),
+)
+
+
+def upgrade():
+    op.add_column("messages", sa.Column("model", sa.String(), nullable=True))
+    for name, column_type in STAT_COLUMNS:
+        op.add_column("messages", sa.Column(name, column_type, nullable=True))
+    op.create_index("ix_messages_model_timestamp", "messages", ["model", "timestamp"])
+
+
+def downgrade():
+    op.drop_index("ix_messages_model_timestamp", table_name="messages")
+    with op.batch_alter_table("messages") as batch:
+        for name, _ in reversed(STAT_COLUMNS):
+            batch.drop_column(name)
+        batch.drop_column("model")
@@ -0,0 +1,32 @@
+"""Track which messages have a vector in the embedding store
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2024-04-15 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("messages", sa.Column("embedding_row", sa.Integer(), nullable=True))
+    pending = sa.text("embedding_row IS NULL")
+    op.create_index(
+        "ix_messages_embedding_pending",
+        "messages",
+        ["timestamp"],
+        sqlite_where=pending,
+        postgresql_where=pending,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_messages_embedding_pending", table_name="messages")
+    # ALTER TABLE DROP COLUMN (SQLite 3.35+) rather than batch mode, which would
+    # recreate messages and lose the search triggers of 0006
+    op.drop_column("messages", "embedding_row")
@@ -0,0 +1,28 @@
+"""Indexes serving the export order without a sort
+
+(session_id, timestamp, id) replaces (session_id, timestamp) so a session's
+messages, tie-broken by id, are read in index order; the unique
+(created_at, id) index on sessions serves the keyset walk over sessions.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2024-05-01 00:00:00
+"""
+from alembic import op
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_index("ix_messages_session_timestamp", table_name="messages")
+    op.create_index("ix_messages_session_timestamp", "messages", ["session_id", "timestamp", "id"])
+    op.create_index("ix_sessions_created_at_id", "sessions", ["created_at", "id"], unique=True)
+
+
+def downgrade():
+    op.drop_index("ix_sessions_created_at_id", table_name="sessions")
+    op.drop_index("ix_messages_session_timestamp", table_name="messages")
+    op.create_index("ix_messages_session_timestamp", "messages", ["session_id", "timestamp"])
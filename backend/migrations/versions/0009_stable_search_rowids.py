@@ -0,0 +1,115 @@
+"""Key the SQLite search index on stable integer ids
+
+Migration 0006 keyed the FTS5 index on the implicit rowid of messages,
+whose primary key is a string, so VACUUM or a table rebuild by a batch
+migration can renumber the rows under the index. Each message now gets
+an id in messages_fts_ids, an INTEGER PRIMARY KEY that SQLite never
+renumbers, and the index reads content through the messages_fts_content
+view by that id. PostgreSQL is unchanged.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2024-05-15 00:00:00
+"""
+from alembic import op
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+DROP_INDEX = (
+    "DROP TRIGGER IF EXISTS messages_fts_update",
+    "DROP TRIGGER IF EXISTS messages_fts_delete",
+    "DROP TRIGGER IF EXISTS messages_fts_insert",
+    "DROP TABLE IF EXISTS messages_fts",
+)
+
+SQLITE_UPGRADE = DROP_INDEX + (
+    """
+    CREATE TABLE messages_fts_ids (
+        id INTEGER PRIMARY KEY,
+        message_id VARCHAR NOT NULL UNIQUE
+    )
+    """,
+    "INSERT INTO messages_fts_ids(message_id) SELECT id FROM messages ORDER BY rowid",
+    # The index stores only tokens; snippets read content through this view
+    """
+    CREATE VIEW messages_fts_content AS
+    SELECT messages_fts_ids.id AS id, messages.content AS content
+    FROM messages_fts_ids JOIN messages ON messages.id = messages_fts_ids.message_id
+    """,
+    """
+    CREATE VIRTUAL TABLE messages_fts USING fts5(
+        content,
+        content='messages_fts_content',
+        content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts_ids(message_id) VALUES (new.id);
+        INSERT INTO messages_fts(rowid, content)
+        VALUES ((SELECT id FROM messages_fts_ids WHERE message_id = new.id), new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content)
+        VALUES ('delete', (SELECT id FROM messages_fts_ids WHERE message_id = old.id), old.content);
+        DELETE FROM messages_fts_ids WHERE message_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content)
+        VALUES ('delete', (SELECT id FROM messages_fts_ids WHERE message_id = old.id), old.content);
+        INSERT INTO messages_fts(rowid, content)
+        VALUES ((SELECT id FROM messages_fts_ids WHERE message_id = new.id), new.content);
+    END
+    """,
+    "INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')",
+)
+
+# The index of migration 0006
+SQLITE_DOWNGRADE = DROP_INDEX + (
+    "DROP VIEW IF EXISTS messages_fts_content",
+    "DROP TABLE IF EXISTS messages_fts_ids",
+    """
+    CREATE VIRTUAL TABLE messages_fts USING fts5(
+        content,
+        content='messages',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, content) VALUES (new.rowid, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+        INSERT INTO messages_fts(rowid, content) VALUES (new.rowid, new.content);
+    END
+    """,
+    "INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')",
+)
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
@@ -0,0 +1,58 @@
+"""
+Shared fixtures: a migrated database for each supported backend.
+
+Every test using `db` runs on a fresh SQLite file and, when
+TEST_POSTGRES_URL is set (e.g. postgresql+asyncpg://postgres@localhost/test),
+on PostgreSQL. The PostgreSQL database is wiped before each test, so point
+it at a throwaway database.
+"""
+import os
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.database import create_db_engine, _run_migrations
+from app.models.schemas import CreateSessionRequest
+from app.services.session_service import SessionService
+
+TEST_POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(params=[
+    "sqlite",
+    pytest.param("postgresql", marks=pytest.mark.skipif(
+        not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL not set"
+    )),
+])
+async def db_engine(request, tmp_path):
+    """Engine on an empty database upgraded to the latest migration."""
+    if request.param == "sqlite":
+        engine = create_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    else:
+        engine = create_db_engine(TEST_POSTGRES_URL)
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP SCHEMA public CASCADE"))
+            await conn.execute(text("CREATE SCHEMA public"))
+    async with engine.begin() as conn:
+        await conn.run_sync(_run_migrations)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def db(db_engine):
+    """Database session on the migrated test database."""
+    async with async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+
+
+@pytest.fixture
+async def chat_session(db):
+    """An empty chat session."""
+    return await SessionService(db).create_session(
+        CreateSessionRequest(name="Test", model_name="llama2:latest", endpoint_type="chat")
+    )
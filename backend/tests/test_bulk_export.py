@@ -0,0 +1,61 @@
+"""
+Bulk export order and query plans.
+"""
+import json
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import text
+from app.models.database import Session, Message
+from app.services.bulk_export import (
+    EXPORTERS, export_query, export_stream, messages_query, session_page_query
+)
+
+pytestmark = pytest.mark.anyio
+
+START = datetime(2024, 1, 15, 10, 0, 0)
+
+
+async def export_jsonl(db, query, batch_size):
+    data = b"".join([chunk async for chunk in export_stream(db, query, EXPORTERS["jsonl"](), batch_size=batch_size)])
+    return [json.loads(line) for line in data.decode().splitlines()]
+
+
+async def test_sessions_and_messages_in_order_across_pages(db):
+    # Equal creation times are ordered by id; equal timestamps as well
+    sessions = [
+        Session(id=f"s{i}", name=f"Session {i}", model_name="llama2:latest", endpoint_type="chat",
+                created_at=START + timedelta(minutes=i // 2))
+        for i in range(5)
+    ]
+    db.add_all(sessions)
+    for session in sessions[:4]:
+        db.add_all([
+            Message(id=f"{session.id}-m{i}", session_id=session.id, role="user", content=f"text {i}",
+                    timestamp=START + timedelta(seconds=i // 2), token_count=1)
+            for i in range(5)
+        ])
+    await db.commit()
+
+    exported = await export_jsonl(db, export_query(), batch_size=2)
+    assert [s["id"] for s in exported] == ["s0", "s1", "s2", "s3", "s4"]
+    assert [m["content"] for m in exported[0]["messages"]] == [f"text {i}" for i in range(5)]
+    assert exported[4]["messages"] == []
+
+    exported = await export_jsonl(db, export_query(session_ids=["s3", "s1"]), batch_size=1)
+    assert [s["id"] for s in exported] == ["s1", "s3"]
+
+
+async def test_export_queries_need_no_sort(db):
+    if db.bind.dialect.name != "sqlite":
+        pytest.skip("SQLite query plans")
+    last = type("Row", (), {"created_at": START, "session_id": "s1"})
+    statements = [
+        session_page_query(export_query(), None, 500),
+        session_page_query(export_query(model="llama2:latest", since=START), last, 500),
+        messages_query("s1"),
+    ]
+    for statement in statements:
+        compiled = statement.compile(db.bind, compile_kwargs={"literal_binds": True})
+        plan = (await db.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))).all()
+        details = " / ".join(row[-1] for row in plan)
+        assert "TEMP B-TREE" not in details, details
@@ -0,0 +1,74 @@
+"""
+Schema created by the migrations on each database backend.
+"""
+import pytest
+from alembic import command
+from sqlalchemy import inspect, select, text
+from app.database import alembic_config
+from app.models.database import Message, ParameterPreset
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_json_columns_use_jsonb_on_postgresql(db):
+    columns = await db.run_sync(
+        lambda session: {c["name"]: c["type"] for c in inspect(session.connection()).get_columns("messages")}
+    )
+    expected = "JSONB" if db.bind.dialect.name == "postgresql" else "JSON"
+    assert type(columns["parameters"]).__name__ == expected
+
+
+async def test_json_parameters_round_trip_and_query(db, chat_session):
+    parameters = {"temperature": 0.2, "options": {"stop": ["\n"], "num_ctx": 4096}}
+    db.add_all([
+        Message(session_id=chat_session.id, role="assistant", content="a", parameters=parameters),
+        Message(session_id=chat_session.id, role="assistant", content="b", parameters={"temperature": 0.9}),
+    ])
+    db.add(ParameterPreset(name="precise", parameters=parameters))
+    await db.commit()
+
+    stored = (await db.execute(
+        select(Message.parameters).where(Message.content == "a")
+    )).scalar_one()
+    assert stored == parameters
+    # Element access compiles to json_extract on SQLite and ->> on PostgreSQL
+    low = (await db.execute(
+        select(Message.content).where(Message.parameters["temperature"].as_float() < 0.5)
+    )).scalars().all()
+    assert low == ["a"]
+    preset = (await db.execute(select(ParameterPreset.parameters))).scalar_one()
+    assert preset["options"]["num_ctx"] == 4096
+
+
+async def test_search_index_created(db):
+    if db.bind.dialect.name == "postgresql":
+        definition = (await db.execute(text(
+            "SELECT indexdef FROM pg_indexes WHERE indexname = 'ix_messages_content_fts'"
+        ))).scalar_one()
+        assert "USING gin" in definition
+        assert "to_tsvector('english'::regconfig, content)" in definition
+    else:
+        names = (await db.execute(text(
+            "SELECT name FROM sqlite_master WHERE name LIKE 'messages_fts%'"
+        ))).scalars().all()
+        assert {
+            "messages_fts", "messages_fts_ids", "messages_fts_content",
+            "messages_fts_insert", "messages_fts_delete", "messages_fts_update",
+        } <= set(names)
+
+
+async def test_search_migration_downgrades_and_upgrades(db_engine):
+    def migrate(connection, revision):
+        config = alembic_config(connection)
+        if revision == "head":
+            command.upgrade(config, revision)
+        else:
+            command.downgrade(config, revision)
+
+    async with db_engine.begin() as conn:
+        await conn.run_sync(migrate, "0005")
+        tables = await conn.run_sync(lambda c: inspect(c).get_table_names())
+        indexes = await conn.run_sync(lambda c: [i["name"] for i in inspect(c).get_indexes("messages")])
+        assert "messages_fts" not in tables
+        assert "ix_messages_content_fts" not in indexes
+        await conn.run_sync(migrate, "head")
@@ -0,0 +1,109 @@
+"""
+Background model pulls against a fake Ollama server.
+"""
+import asyncio
+import pytest
+from app.config import settings
+from app.services import download_manager as downloads
+from app.services.download_manager import DownloadManager, CLAIM_KEY, DOWNLOADS_KEY
+from app.services.ollama_service import OllamaService
+from app.services.shared_state import MemoryStateBackend
+from benchmarks.fake_ollama import FakeOllamaServer, free_port
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(scope="module")
+def server():
+    # Slow enough to cancel a pull midway
+    with FakeOllamaServer(token_delay=0.02) as server:
+        yield server
+
+
+@pytest.fixture
+async def ollama(server, monkeypatch):
+    """Service the download manager pulls through, counting pulls."""
+    monkeypatch.setattr(settings, "OLLAMA_BASE_URLS", [server.url])
+    service = OllamaService()
+    service.pulls = []
+    download_model = service.download_model
+
+    def counting(name):
+        service.pulls.append(name)
+        return download_model(name)
+
+    monkeypatch.setattr(service, "download_model", counting)
+    monkeypatch.setattr(downloads, "ollama_service", service)
+    yield service
+    await service.close()
+
+
+@pytest.fixture
+def state(monkeypatch):
+    """Shared state of the managers in a test, as if on several workers."""
+    state = MemoryStateBackend()
+    monkeypatch.setattr(downloads, "shared_state", state)
+    return state
+
+
+async def follow_states(manager, model):
+    return [event["state"] async for event in manager.follow(model)]
+
+
+async def test_pull_runs_in_the_background_until_completed(ollama, state):
+    manager = DownloadManager(progress_interval=0)
+    job = await manager.start("fake:latest")
+    assert job["state"] == "queued"
+    # Starting again joins the running job
+    assert (await manager.start("fake:latest"))["model"] == "fake:latest"
+
+    states = await follow_states(manager, "fake:latest")
+    assert states[0] in ("queued", "running")
+    assert states[-1] == "completed"
+    assert ollama.pulls == ["fake:latest"]
+
+    entry = (await state.hgetall(DOWNLOADS_KEY))["fake:latest"]
+    assert entry["state"] == "completed"
+    assert entry["status"] == "success"
+    assert await state.get(CLAIM_KEY.format(model="fake:latest")) is None
+
+
+async def test_workers_racing_to_start_pull_once(ollama, state):
+    managers = [DownloadManager(progress_interval=0) for _ in range(4)]
+    jobs = await asyncio.gather(*(manager.start("fake:latest") for manager in managers))
+    assert all(job["state"] in ("queued", "running") for job in jobs)
+    assert len(ollama.pulls) == 1
+
+    # Any worker can follow the job to its end
+    owner = next(manager for manager in managers if manager._jobs)
+    other = next(manager for manager in managers if not manager._jobs)
+    states, remote = await asyncio.gather(
+        follow_states(owner, "fake:latest"), follow_states(other, "fake:latest")
+    )
+    assert states[-1] == remote[-1] == "completed"
+    assert await state.get(CLAIM_KEY.format(model="fake:latest")) is None
+
+    # Once finished, the model can be pulled again
+    await managers[0].start("fake:latest")
+    await follow_states(managers[0], "fake:latest")
+    assert len(ollama.pulls) == 2
+
+
+async def test_cancel_stops_the_pull(ollama, state):
+    manager = DownloadManager(progress_interval=0)
+    await manager.start("fake:latest")
+    follower = asyncio.create_task(follow_states(manager, "fake:latest"))
+    await asyncio.sleep(0.05)
+    assert await manager.cancel("fake:latest")
+    assert (await follower)[-1] == "cancelled"
+    assert not await manager.cancel("fake:latest")
+    assert await state.get(CLAIM_KEY.format(model="fake:latest")) is None
+
+
+async def test_unreachable_ollama_fails_the_job(ollama, state):
+    ollama.pool.backends[0].url = f"http://127.0.0.1:{free_port()}"
+    manager = DownloadManager(progress_interval=0, retries=0)
+    await manager.start("fake:latest")
+    assert (await follow_states(manager, "fake:latest"))[-1] == "failed"
+    entry = await manager.get("fake:latest")
+    assert entry["state"] == "failed" and entry["error"]
@@ -0,0 +1,79 @@
+"""
+Background embedding of messages into the vector store.
+"""
+import uuid
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.models.database import Message
+from app.services import embedding_service
+from app.services.embedding_service import EmbeddingIndexer
+from app.services.vector_store import VectorStore
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def indexer(db_engine, tmp_path, monkeypatch):
+    """Indexer on the test database with embeddings computed locally."""
+    requeues = []
+
+    async def embed(model, texts):
+        return [[1.0, float(len(text)), 0.0] for text in texts]
+
+    monkeypatch.setattr(
+        embedding_service, "AsyncSessionLocal",
+        async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+    )
+    monkeypatch.setattr(embedding_service.ollama_service, "embed", embed)
+    indexer = EmbeddingIndexer(model="embed-a", path=str(tmp_path / "vectors"), batch_size=10)
+    original = indexer._requeue
+
+    async def requeue(db):
+        requeues.append(indexer.model)
+        await original(db)
+
+    monkeypatch.setattr(indexer, "_requeue", requeue)
+    indexer.requeues = requeues
+    return indexer
+
+
+async def embedding_rows(db):
+    rows = (await db.execute(select(Message.content, Message.embedding_row))).all()
+    return {content: row for content, row in rows}
+
+
+async def test_append_rejects_ids_that_do_not_fit(tmp_path):
+    store = VectorStore(str(tmp_path))
+    store.reset("embed-a", 3)
+    for bad in ("short", str(uuid.uuid4()) + "-suffix"):
+        with pytest.raises(ValueError):
+            store.append([bad], [[1.0, 0.0, 0.0]])
+    with pytest.raises(ValueError):
+        store.append([str(uuid.uuid4())], [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+    message_id = str(uuid.uuid4())
+    assert store.append([message_id], [[1.0, 0.0, 0.0]]) == 0
+    assert store.search([1.0, 0.0, 0.0], 1)[0][0] == message_id
+
+
+async def test_index_batch_requeues_only_when_the_model_changes(db, chat_session, indexer):
+    db.add_all([
+        Message(session_id=chat_session.id, role="user", content="hello"),
+        Message(session_id=chat_session.id, role="assistant", content="  "),
+        Message(id="imported-id", session_id=chat_session.id, role="user", content="kept out"),
+    ])
+    await db.commit()
+
+    # A new store has no model: nothing to requeue
+    assert await indexer.index_batch() == 3
+    assert indexer.requeues == []
+    assert await embedding_rows(db) == {"hello": 0, "  ": -1, "kept out": -1}
+    assert await indexer.index_batch() == 0
+    assert indexer.requeues == []
+
+    indexer.model = "embed-b"
+    assert await indexer.index_batch() == 1
+    assert indexer.requeues == ["embed-b"]
+    assert indexer.store.model == "embed-b"
+    db.expire_all()
+    assert (await embedding_rows(db))["hello"] == 0
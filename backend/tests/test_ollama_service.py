@@ -0,0 +1,124 @@
+"""
+Routing requests across Ollama backends, against fake Ollama servers.
+"""
+import time
+import httpx
+import pytest
+from app.config import settings
+from app.models.schemas import GenerateRequest, MessageSchema, Parameters
+from app.services.ollama_service import OllamaService
+from benchmarks.fake_ollama import FakeOllamaServer, free_port
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(scope="module")
+def servers():
+    """Two fake Ollama servers with different models pulled."""
+    with FakeOllamaServer(tokens=4, models=["fake:latest"]) as first:
+        with FakeOllamaServer(tokens=4, models=["fake:latest", "other:latest"]) as second:
+            yield first, second
+
+
+@pytest.fixture
+async def make_service(monkeypatch):
+    """Factory of services routing to the given URLs."""
+    services = []
+
+    def make(*urls, failure_threshold=2, eject_seconds=30.0):
+        monkeypatch.setattr(settings, "OLLAMA_BASE_URLS", list(urls))
+        monkeypatch.setattr(settings, "OLLAMA_FAILURE_THRESHOLD", failure_threshold)
+        monkeypatch.setattr(settings, "OLLAMA_EJECT_SECONDS", eject_seconds)
+        service = OllamaService()
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        await service.close()
+
+
+def dead_url():
+    return f"http://127.0.0.1:{free_port()}"
+
+
+def chat_request(model="fake:latest"):
+    return GenerateRequest(
+        model=model,
+        endpoint_type="chat",
+        messages=[MessageSchema(role="user", content="Hello")],
+        parameters=Parameters(),
+    )
+
+
+async def stream_text(service, request, backend=None):
+    chunks = [chunk async for chunk in service.stream_chat(request, backend)]
+    assert chunks[-1]["done"]
+    return "".join(chunk["message"]["content"] for chunk in chunks)
+
+
+async def test_stream_fails_over_from_an_unreachable_backend(servers, make_service):
+    service = make_service(dead_url(), servers[0].url)
+    dead, live = service.pool.backends
+    # Admitted onto the dead node
+    assert await stream_text(service, chat_request(), dead) == "tok0 tok1 tok2 tok3 "
+    assert dead.failures == 1 and dead.healthy
+    assert (await service.chat(chat_request(), dead))["message"]["content"] == "tok0 tok1 tok2 tok3 "
+    assert dead.failures == 2 and not dead.healthy
+    assert live.failures == 0 and "fake:latest" in live.loaded_models
+    assert dead.in_flight == live.in_flight == 0
+
+
+async def test_repeated_failures_eject_a_backend_until_it_recovers(servers, make_service):
+    service = make_service(dead_url(), servers[0].url, failure_threshold=2, eject_seconds=0.2)
+    dead, live = service.pool.backends
+    for _ in range(2):
+        assert (await service.chat(chat_request(), dead))["done"]
+    assert dead.failures == 2 and not dead.healthy
+
+    # Ejected nodes are skipped, not retried
+    for _ in range(4):
+        assert service.pool.select("fake:latest") is live
+    await stream_text(service, chat_request())
+    assert dead.failures == 2
+
+    # Once the ejection ends the next request probes the node; success restores it
+    dead.url = servers[1].url
+    time.sleep(0.2)
+    assert dead.healthy
+    assert (await service.chat(chat_request(), dead))["done"]
+    assert dead.failures == 0 and dead.ejected_until == 0.0
+
+
+async def test_every_backend_down_raises(make_service):
+    service = make_service(dead_url(), dead_url())
+    with pytest.raises(httpx.ConnectError):
+        await stream_text(service, chat_request())
+    with pytest.raises(httpx.ConnectError):
+        await service.chat(chat_request())
+    assert [backend.failures for backend in service.pool.backends] == [2, 2]
+
+
+async def test_admitted_backend_gets_the_generation(servers, make_service):
+    service = make_service(servers[0].url, servers[1].url)
+    first, second = service.pool.backends
+    await stream_text(service, chat_request(), second)
+    assert (await service.chat(chat_request(), second))["done"]
+    assert second.loaded_models == {"fake:latest"}
+    assert first.loaded_models == set()
+
+
+async def test_routing_prefers_nodes_with_the_model(servers, make_service):
+    service = make_service(servers[0].url, servers[1].url)
+    first, second = service.pool.backends
+    await service.invalidate_model_list()
+    models = {model.name for model in await service.list_models()}
+    assert models == {"fake:latest", "other:latest"}
+    # Only the second node has pulled other:latest
+    for _ in range(3):
+        assert service.pool.select("other:latest") is second
+    # Among equals, the least busy node wins
+    first.in_flight = 3
+    assert service.pool.select("fake:latest") is second
+    assert service.pool.select_free("fake:latest", [second]) is first
+    assert service.pool.select_free("fake:latest", [first, second]) is None
@@ -0,0 +1,102 @@
+"""
+Admission control: slots per backend and model, queue order and limits.
+"""
+import asyncio
+import pytest
+from app.services.ollama_service import BackendPool
+from app.services.scheduler import AdmissionScheduler, QueueFullError, DEFAULT_BACKEND
+
+pytestmark = pytest.mark.anyio
+
+
+def admitted(tickets):
+    return [ticket for ticket in tickets if ticket.granted]
+
+
+async def test_admits_up_to_the_limit_and_queues_the_rest():
+    scheduler = AdmissionScheduler(max_in_flight=2, max_queue_depth=10)
+    tickets = [scheduler.enqueue("m", f"s{i}", "interactive") for i in range(4)]
+    assert tickets[0].granted and tickets[1].granted
+    assert tickets[0].backend == DEFAULT_BACKEND
+    assert [t.position for t in tickets[2:]] == [1, 2]
+    assert scheduler.stats() == {"m": {"in_flight": 2, "queued": 2, "backends": {DEFAULT_BACKEND: 2}}}
+
+    scheduler.release(tickets[0])
+    assert tickets[2].granted and tickets[3].position == 1
+    # Models have slots of their own
+    assert scheduler.enqueue("other", "s0", "interactive").granted
+
+
+async def test_interactive_before_batch_and_sessions_take_turns():
+    scheduler = AdmissionScheduler(max_in_flight=1, max_queue_depth=10)
+    running = scheduler.enqueue("m", "a", "interactive")
+    queued = [
+        scheduler.enqueue("m", "a", "batch"),
+        scheduler.enqueue("m", "a", "interactive"),
+        scheduler.enqueue("m", "a", "interactive"),
+        scheduler.enqueue("m", "b", "interactive"),
+    ]
+    order = []
+    current = running
+    for _ in queued:
+        scheduler.release(current)
+        current = next(t for t in queued if t.granted and t not in order)
+        order.append(current)
+    assert order == [queued[1], queued[3], queued[2], queued[0]]
+
+
+async def test_rejects_when_the_queue_is_full_and_frees_cancelled_waiters():
+    scheduler = AdmissionScheduler(max_in_flight=1, max_queue_depth=1)
+    running = scheduler.enqueue("m", "a", "interactive")
+    waiting = scheduler.enqueue("m", "b", "interactive")
+    with pytest.raises(QueueFullError):
+        scheduler.enqueue("m", "c", "interactive")
+
+    # A waiter giving up leaves the queue without taking a slot
+    scheduler.release(waiting)
+    assert scheduler.stats()["m"]["queued"] == 0
+    late = scheduler.enqueue("m", "c", "interactive")
+    scheduler.release(running)
+    assert late.granted
+    scheduler.release(late)
+    assert scheduler.stats() == {}
+
+
+async def test_waiters_see_positions_until_admitted():
+    scheduler = AdmissionScheduler(max_in_flight=1, max_queue_depth=10)
+    running = scheduler.enqueue("m", "a", "interactive")
+    ahead = scheduler.enqueue("m", "b", "interactive")
+    ticket = scheduler.enqueue("m", "c", "interactive")
+
+    positions = []
+
+    async def follow():
+        async for position in ticket.positions():
+            positions.append(position)
+
+    task = asyncio.create_task(follow())
+    await asyncio.sleep(0)
+    scheduler.release(running)
+    await asyncio.sleep(0)
+    scheduler.release(ahead)
+    await asyncio.wait_for(task, 1)
+    assert positions == [2, 1]
+    assert ticket.granted and ticket.position == 0
+
+
+async def test_slots_are_counted_per_backend():
+    pool = BackendPool(["http://gpu-1:11434", "http://gpu-2:11434"])
+    first, second = pool.backends
+    first.loaded_models.add("m")
+    scheduler = AdmissionScheduler(max_in_flight=2, max_queue_depth=10, select_backend=pool.select_free)
+
+    tickets = [scheduler.enqueue("m", f"s{i}", "interactive") for i in range(5)]
+    # The node with the model loaded fills up first, then the other one
+    assert [t.backend for t in tickets[:4]] == [first, first, second, second]
+    assert not tickets[4].granted
+    assert scheduler.stats()["m"]["backends"] == {first.url: 2, second.url: 2}
+
+    scheduler.release(tickets[2])
+    assert tickets[4].backend is second
+    # Another model has its own slots on both nodes
+    assert scheduler.enqueue("n", "s0", "interactive").granted
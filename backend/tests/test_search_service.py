@@ -0,0 +1,120 @@
+"""
+Full-text search on each database backend: FTS5 on SQLite, the GIN
+tsvector index on PostgreSQL.
+"""
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import text, update
+from app.models.database import Message
+from app.services.search_service import SearchService, SearchQueryError, rebuild_index
+from app.services.session_service import SessionService
+
+pytestmark = pytest.mark.anyio
+
+START = datetime(2024, 1, 15, 10, 0, 0)
+
+CONTENTS = [
+    ("user", "How do I configure the reverse proxy for nginx?"),
+    ("assistant", "Put the proxy_pass directive in the nginx location block."),
+    ("user", "And what about caching static files?"),
+    ("assistant", "Caching static files & images is done with the expires directive."),
+]
+
+
+@pytest.fixture
+async def messages(db, chat_session):
+    rows = [
+        Message(
+            session_id=chat_session.id,
+            role=role,
+            content=content,
+            timestamp=START + timedelta(minutes=i),
+            token_count=10,
+        )
+        for i, (role, content) in enumerate(CONTENTS)
+    ]
+    await SessionService(db).add_messages(rows)
+    return rows
+
+
+async def test_plain_search_finds_all_words(db, messages):
+    found = await SearchService(db).search("nginx proxy")
+    assert {r["message_id"] for r in found["results"]} == {messages[0].id, messages[1].id}
+    assert not found["has_more"]
+    assert all(r["session_name"] == "Test" and r["model"] == "llama2:latest" for r in found["results"])
+    scores = [r["score"] for r in found["results"]]
+    assert scores == sorted(scores, reverse=True)
+
+
+async def test_snippet_is_escaped_and_marked(db, messages):
+    found = await SearchService(db).search("static")
+    snippets = {r["message_id"]: r["snippet"] for r in found["results"]}
+    assert "<mark>static</mark>" in snippets[messages[2].id]
+    assert "<mark>static</mark> files &amp; images" in snippets[messages[3].id]
+
+
+async def test_filters_and_paging(db, messages):
+    service = SearchService(db)
+    found = await service.search("directive", role="assistant", limit=1)
+    assert len(found["results"]) == 1
+    assert found["has_more"]
+    second = await service.search("directive", role="assistant", limit=1, offset=1)
+    assert {found["results"][0]["message_id"], second["results"][0]["message_id"]} == {messages[1].id, messages[3].id}
+
+    assert (await service.search("directive", role="user"))["results"] == []
+    assert (await service.search("directive", since=START + timedelta(minutes=2)))["results"][0]["message_id"] == messages[3].id
+    assert (await service.search("directive", model="mistral:latest"))["results"] == []
+
+
+async def test_quoting_and_empty_queries(db, messages):
+    service = SearchService(db)
+    assert (await service.search("   "))["results"] == []
+    assert (await service.search('"'))["results"] == []
+    # FTS5 operators in plain queries are matched literally
+    found = await service.search('nginx) "proxy*')
+    assert {r["message_id"] for r in found["results"]} == {messages[0].id, messages[1].id}
+
+
+async def test_advanced_syntax(db, messages):
+    service = SearchService(db)
+    query = "caching -images" if db.bind.dialect.name == "postgresql" else "caching NOT images"
+    found = await service.search(query, syntax="advanced")
+    assert [r["message_id"] for r in found["results"]] == [messages[2].id]
+    found = await service.search('"reverse proxy"', syntax="advanced")
+    assert [r["message_id"] for r in found["results"]] == [messages[0].id]
+    if db.bind.dialect.name == "sqlite":
+        with pytest.raises(SearchQueryError):
+            await service.search('"unbalanced', syntax="advanced")
+
+
+async def test_index_follows_updates_and_deletes(db, messages, chat_session):
+    service = SearchService(db)
+    await db.execute(
+        update(Message).where(Message.id == messages[0].id).values(content="Kubernetes ingress question")
+    )
+    await db.commit()
+    found = await service.search("nginx")
+    assert [r["message_id"] for r in found["results"]] == [messages[1].id]
+    assert [r["message_id"] for r in (await service.search("kubernetes"))["results"]] == [messages[0].id]
+
+    await SessionService(db).delete_session(chat_session.id)
+    assert (await service.search("directive"))["results"] == []
+
+
+async def test_rebuild_index(db, messages):
+    await rebuild_index(db)
+    found = await SearchService(db).search("nginx")
+    assert len(found["results"]) == 2
+
+
+
+async def test_index_survives_renumbered_rowids(db, messages):
+    if db.bind.dialect.name != "sqlite":
+        pytest.skip("rowids are SQLite-specific")
+    # What VACUUM or a batch migration's table rebuild may do to messages
+    await db.execute(text("UPDATE messages SET rowid = rowid + 1000"))
+    await db.commit()
+
+    found = await SearchService(db).search("directive")
+    assert {r["message_id"] for r in found["results"]} == {messages[1].id, messages[3].id}
+    assert all("<mark>directive</mark>" in r["snippet"] for r in found["results"])
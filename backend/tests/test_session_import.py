@@ -0,0 +1,109 @@
+"""
+Importing conversation archives: line parsing and batched inserts.
+"""
+import gzip
+import json
+from datetime import datetime
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.models.database import Session, Message
+from app.services import session_import
+from app.services.session_import import InvalidLineError, SessionImporter, iter_lines, parse_session
+
+pytestmark = pytest.mark.anyio
+
+
+def test_parse_export_line_keeps_times_and_order():
+    session, messages = parse_session({
+        "name": "Proxy setup",
+        "model_name": "llama2:latest",
+        "endpoint_type": "chat",
+        "created_at": "2024-01-15T10:00:00+02:00",
+        "messages": [
+            {"role": "user", "content": "Hi", "timestamp": "2024-01-15T08:00:01Z"},
+            {"role": "assistant", "content": "Hello there"},
+            {"role": "user", "content": "Bye", "timestamp": 1705305700},
+        ],
+    })
+    assert session["name"] == "Proxy setup"
+    assert session["model_name"] == "llama2:latest"
+    # Stored as naive UTC
+    assert session["created_at"] == datetime(2024, 1, 15, 8, 0, 0)
+    assert [m["timestamp"] for m in messages] == [
+        datetime(2024, 1, 15, 8, 0, 1),
+        datetime(2024, 1, 15, 8, 0, 1, 1),
+        datetime(2024, 1, 15, 8, 1, 40),
+    ]
+    assert all(m["session_id"] == session["id"] for m in messages)
+    assert session["total_tokens"] == sum(m["token_count"] for m in messages)
+
+
+def test_parse_openai_record_with_content_parts():
+    session, messages = parse_session(
+        {"messages": [
+            {"role": "system", "content": None},
+            {"role": "user", "content": [
+                {"type": "text", "text": "Describe "},
+                {"type": "image_url", "image_url": {"url": "data:"}},
+                {"type": "text", "text": "this image please"},
+            ]},
+        ]},
+        default_model="llava:latest",
+    )
+    assert [m["content"] for m in messages] == ["", "Describe this image please"]
+    # Named after the first user message
+    assert session["name"] == "Describe this image please"
+    assert session["model_name"] == "llava:latest"
+    assert session["endpoint_type"] == "chat"
+
+
+@pytest.mark.parametrize("data, error", [
+    ([], "expected an object"),
+    ({"messages": "hi"}, "expected an object"),
+    ({"model": "m", "messages": [{"content": "x"}]}, "invalid message"),
+    ({"model": "m", "messages": [{"role": "user", "content": {"text": "x"}}]}, "invalid message"),
+    ({"messages": [{"role": "user", "content": "x"}]}, "no model given"),
+    ({"model": "m", "created_at": "yesterday", "messages": []}, "invalid time"),
+])
+def test_parse_rejects_invalid_lines(data, error):
+    with pytest.raises(InvalidLineError, match=error):
+        parse_session(data)
+
+
+async def chunked(data, size):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def test_iter_lines_across_chunks_and_gzip():
+    body = b'{"a": 1}\n\n{"b": 2}\n' + b"x" * 40 + b'\n{"c": 3}'
+    lines = [item async for item in iter_lines(chunked(body, 3), max_line_bytes=20)]
+    assert lines == [(1, b'{"a": 1}'), (3, b'{"b": 2}'), (4, None), (5, b'{"c": 3}')]
+    packed = [item async for item in iter_lines(chunked(gzip.compress(body), 5), 20, gzip=True)]
+    assert packed == lines
+
+
+async def test_import_stream_inserts_in_batches(db, db_engine, monkeypatch):
+    monkeypatch.setattr(
+        session_import, "AsyncSessionLocal",
+        async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+    )
+    lines = [
+        json.dumps({"model": "llama2:latest", "messages": [
+            {"role": "user", "content": f"question {i}"},
+            {"role": "assistant", "content": f"answer {i}"},
+        ]})
+        for i in range(7)
+    ]
+    lines.insert(3, "{not json")
+    body = ("\n".join(lines) + "\n").encode()
+
+    result = await SessionImporter(batch_size=4).import_stream(chunked(body, 10))
+    assert (result["sessions"], result["messages"], result["skipped"]) == (7, 14, 1)
+    assert result["errors"][0]["line"] == 4
+
+    names = (await db.execute(select(Session.name).order_by(Session.name))).scalars().all()
+    assert names == [f"question {i}" for i in range(7)]
+    count = len((await db.execute(select(Message.id))).all())
+    assert count == 14
@@ -0,0 +1,141 @@
+"""
+SessionService queries on each database backend.
+"""
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import select
+from app.models.database import Session, Message
+from app.services.context_manager import ContextManager
+from app.services.session_service import SessionService
+
+pytestmark = pytest.mark.anyio
+
+START = datetime(2024, 1, 15, 10, 0, 0)
+
+
+async def add_conversation(db, session_id, count, start=START):
+    """Insert count alternating user/assistant messages one minute apart."""
+    messages = [
+        Message(
+            session_id=session_id,
+            role="user" if i % 2 == 0 else "assistant",
+            content=f"message {i}",
+            timestamp=start + timedelta(minutes=i),
+            token_count=10,
+        )
+        for i in range(count)
+    ]
+    await SessionService(db).add_messages(messages)
+    return messages
+
+
+async def test_add_messages_updates_total_tokens(db, chat_session):
+    service = SessionService(db)
+    await add_conversation(db, chat_session.id, 4)
+    await service.add_message(chat_session.id, "user", "hello", token_count=7)
+
+    total = (await db.execute(
+        select(Session.total_tokens).where(Session.id == chat_session.id)
+    )).scalar_one()
+    assert total == 47
+    assert await service.get_message_count(chat_session.id) == 5
+
+
+async def test_get_messages_pages_with_cursors(db, chat_session):
+    service = SessionService(db)
+    messages = await add_conversation(db, chat_session.id, 10)
+    ids = [message.id for message in messages]
+
+    page, has_more = await service.get_message_page(chat_session.id, 3)
+    assert [m.id for m in page] == ids[-3:]
+    assert has_more
+    older, has_more = await service.get_message_page(chat_session.id, 3, before=ids[-3])
+    assert [m.id for m in older] == ids[4:7]
+    newer, has_more = await service.get_message_page(chat_session.id, 4, after=ids[5])
+    assert [m.id for m in newer] == ids[6:10]
+    assert not has_more
+    with pytest.raises(ValueError):
+        await service.get_messages(chat_session.id, 3, before="missing")
+
+
+async def test_iter_messages_reads_in_chunks(db, chat_session):
+    messages = await add_conversation(db, chat_session.id, 7)
+    chunks = [chunk async for chunk in SessionService(db).iter_messages(chat_session.id, chunk_size=3)]
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert [row.id for chunk in chunks for row in chunk] == [m.id for m in messages]
+
+
+async def test_context_window_stops_at_budget(db, chat_session):
+    service = SessionService(db)
+    db.add(Message(session_id=chat_session.id, role="system", content="be brief", timestamp=START, token_count=5))
+    await db.commit()
+    messages = await add_conversation(db, chat_session.id, 20, start=START + timedelta(seconds=1))
+
+    window = await service.get_context_window(chat_session.id, budget=200, batch_size=4)
+    assert window[0].role == "system"
+    recent = window[1:]
+    assert [m.id for m in recent] == [m.id for m in messages[-len(recent):]]
+    # Just enough messages, read over several batches
+    assert ContextManager.calculate_message_tokens(window) >= 200
+    assert ContextManager.calculate_message_tokens(window[:1] + recent[1:]) < 200
+    assert len(recent) > 4
+
+    capped = await service.get_context_window(chat_session.id, budget=10000, max_messages=3)
+    assert [m.id for m in capped[1:]] == [m.id for m in messages[-3:]]
+
+
+async def test_list_sessions_counts_messages(db, chat_session):
+    service = SessionService(db)
+    await add_conversation(db, chat_session.id, 3)
+    other = Session(name="Other", model_name="mistral:latest", endpoint_type="generate")
+    db.add(other)
+    await db.commit()
+
+    counts = {session.id: count for session, count in await service.list_sessions()}
+    assert counts == {chat_session.id: 3, other.id: 0}
+    filtered = await service.list_sessions(model_name="mistral:latest")
+    assert [session.id for session, _ in filtered] == [other.id]
+
+
+async def test_delete_session_removes_messages(db, chat_session):
+    service = SessionService(db)
+    await add_conversation(db, chat_session.id, 3)
+    assert await service.delete_session(chat_session.id)
+    remaining = (await db.execute(select(Message.id))).scalars().all()
+    assert remaining == []
+    assert not await service.delete_session(chat_session.id)
+
+
+async def test_generation_stats(db, chat_session):
+    service = SessionService(db)
+    for i, ttft in enumerate([100, 200, 300, 400, None]):
+        await service.add_message(
+            chat_session.id, "assistant", f"reply {i}",
+            model="llama2:latest" if i < 4 else "mistral:latest",
+            stats={
+                "eval_count": 50,
+                "eval_duration": 1_000_000_000,
+                "prompt_eval_count": 10,
+                "load_duration": 2_000_000,
+                "total_duration": 1_500_000_000,
+                "time_to_first_token": None if ttft is None else ttft * 1_000_000,
+            }
+        )
+    # Messages without Ollama statistics are not counted
+    await service.add_message(chat_session.id, "assistant", "no stats")
+
+    by_model = {row["key"]: row for row in await service.get_generation_stats()}
+    llama = by_model["llama2:latest"]
+    assert llama["responses"] == 4
+    assert llama["generated_tokens"] == 200
+    assert llama["total_tokens"] == 240
+    assert llama["avg_tokens_per_second"] == pytest.approx(50.0)
+    assert llama["avg_time_to_first_token_ms"] == pytest.approx(250.0)
+    assert llama["p95_time_to_first_token_ms"] == pytest.approx(400.0)
+    assert by_model["mistral:latest"]["avg_time_to_first_token_ms"] is None
+
+    by_day = await service.get_generation_stats(group_by="day")
+    assert [row["key"] for row in by_day] == [datetime.utcnow().date().isoformat()]
+    assert by_day[0]["responses"] == 5
+    with pytest.raises(ValueError):
+        await service.get_generation_stats(group_by="hour")
@@ -0,0 +1,128 @@
+"""
+Relaying Ollama streams: batching, cancellation and reading chunk text.
+"""
+import asyncio
+import json
+import pytest
+from app.services import ndjson
+from app.services.stream_registry import relay_batches, until_cancelled, StreamCancelled
+
+pytestmark = pytest.mark.anyio
+
+
+class Source:
+    """Async generator over items, recording whether it was closed."""
+
+    def __init__(self, items, delay=0.0, error=None):
+        self.items = items
+        self.delay = delay
+        self.error = error
+        self.closed = False
+
+    async def stream(self):
+        try:
+            for item in self.items:
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                yield item
+            if self.error:
+                raise self.error
+            # Like an upstream response that stays open
+            await asyncio.sleep(3600)
+        finally:
+            self.closed = True
+
+
+async def collect(batches):
+    return [batch async for batch in batches]
+
+
+async def finite(items):
+    for item in items:
+        yield item
+
+
+async def test_relays_every_item_in_order():
+    items = [f"line {i}".encode() for i in range(1000)]
+    batches = await collect(relay_batches(finite(items)))
+    assert [item for batch in batches for item in batch] == items
+    assert all(batches)
+
+
+async def test_max_bytes_bounds_batches():
+    items = [b"x" * 10 for _ in range(50)]
+    batches = await collect(relay_batches(finite(items), max_bytes=30))
+    assert [item for batch in batches for item in batch] == items
+    assert max(len(batch) for batch in batches) <= 3
+
+
+async def test_interval_collects_items_into_fewer_batches():
+    source = Source([b"a"] * 20, delay=0.005)
+    batches = []
+    async for batch in relay_batches(source.stream(), interval=0.05):
+        batches.append(batch)
+        if sum(map(len, batches)) == 20:
+            break
+    assert len(batches) < 10
+
+
+async def test_cancel_event_stops_the_relay_and_closes_the_source():
+    source = Source([b"a", b"b"])
+    cancelled = asyncio.Event()
+    received = []
+    with pytest.raises(StreamCancelled):
+        async for batch in relay_batches(source.stream(), cancelled):
+            received.extend(batch)
+            if len(received) == 2:
+                # The source is now waiting for a token that never comes
+                cancelled.set()
+    assert received == [b"a", b"b"]
+    assert source.closed
+
+
+async def test_consumer_leaving_closes_the_source():
+    source = Source([b"a", b"b", b"c"])
+    batches = relay_batches(source.stream())
+    await batches.__anext__()
+    await batches.aclose()
+    assert source.closed
+
+
+async def test_source_errors_reach_the_consumer():
+    source = Source([b"a"], error=RuntimeError("upstream failed"))
+    received = []
+    with pytest.raises(RuntimeError, match="upstream failed"):
+        async for batch in relay_batches(source.stream()):
+            received.extend(batch)
+    assert received == [b"a"]
+
+
+async def test_until_cancelled_yields_single_chunks():
+    chunks = [{"n": i} for i in range(5)]
+    assert [chunk async for chunk in until_cancelled(finite(chunks), None)] == chunks
+
+
+LINES = [
+    {"model": "m", "message": {"role": "assistant", "content": "Hello"}, "done": False},
+    {"model": "m", "response": "plain", "done": False},
+    {"model": "m", "message": {"role": "assistant", "content": 'say "hi"\\n\u00e9'}, "done": False},
+    {"model": "m", "message": {"role": "assistant", "content": "back\\"}, "done": False},
+    {"model": "m", "message": {"role": "assistant", "content": ""}, "done": False},
+    {"model": "m", "response": "", "done": True, "eval_count": 3},
+    {"model": "m", "done": False},
+]
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+@pytest.mark.parametrize("chunk", LINES)
+async def test_scan_chunk_matches_decoding(chunk, use_orjson, monkeypatch):
+    if not use_orjson:
+        # The byte-scanning path taken without orjson
+        monkeypatch.setattr(ndjson, "orjson", None)
+        monkeypatch.setattr(ndjson, "loads", json.loads)
+    line = json.dumps(chunk, separators=(",", ":"), ensure_ascii=False).encode()
+    text, decoded = ndjson.scan_chunk(line)
+    assert text == ndjson.chunk_content(chunk)
+    if chunk["done"]:
+        assert decoded == chunk
+    assert decoded is None or decoded == chunk
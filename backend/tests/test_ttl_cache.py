@@ -0,0 +1,105 @@
+"""
+AsyncTTLCache: expiry, single-flight loads and invalidation.
+"""
+import asyncio
+import pytest
+from app.services.ttl_cache import AsyncTTLCache
+
+pytestmark = pytest.mark.anyio
+
+
+class Loader:
+    """Counts calls and blocks each one until released."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        call = self.calls
+        await self.release.wait()
+        return f"value {call}"
+
+
+async def test_concurrent_misses_share_one_load():
+    cache = AsyncTTLCache(ttl=60)
+    loader = Loader()
+    waiters = [asyncio.create_task(cache.get_or_load("key", loader)) for _ in range(50)]
+    await asyncio.sleep(0)
+    loader.release.set()
+    assert await asyncio.gather(*waiters) == ["value 1"] * 50
+    assert loader.calls == 1
+    assert await cache.get_or_load("key", loader) == "value 1"
+    assert cache.hits == 1 and cache.misses == 50
+
+
+async def test_values_expire():
+    cache = AsyncTTLCache(ttl=0.05)
+    loader = Loader()
+    loader.release.set()
+    assert await cache.get_or_load("key", loader) == "value 1"
+    assert await cache.get_or_load("key", loader, ttl=60) == "value 1"
+    await asyncio.sleep(0.06)
+    assert await cache.get_or_load("key", loader) == "value 2"
+
+
+async def test_errors_are_shared_but_not_cached():
+    cache = AsyncTTLCache(ttl=60)
+    calls = 0
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(
+        *(cache.get_or_load("key", failing) for _ in range(5)), return_exceptions=True
+    )
+    assert calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    with pytest.raises(RuntimeError):
+        await cache.get_or_load("key", failing)
+    assert calls == 2
+
+
+async def test_cancelled_waiter_does_not_cancel_the_load():
+    cache = AsyncTTLCache(ttl=60)
+    loader = Loader()
+    first = asyncio.create_task(cache.get_or_load("key", loader))
+    second = asyncio.create_task(cache.get_or_load("key", loader))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    loader.release.set()
+    assert await second == "value 1"
+    assert first.cancelled()
+    assert loader.calls == 1
+
+
+async def test_invalidate_during_load_discards_the_result():
+    cache = AsyncTTLCache(ttl=60)
+    loader = Loader()
+    stale = asyncio.create_task(cache.get_or_load("key", loader))
+    await asyncio.sleep(0)
+    cache.invalidate("key")
+    # The next lookup does not join the detached load
+    fresh = asyncio.create_task(cache.get_or_load("key", loader))
+    await asyncio.sleep(0)
+    loader.release.set()
+    assert await stale == "value 1"
+    assert await fresh == "value 2"
+    assert loader.calls == 2
+    assert await cache.get_or_load("key", loader) == "value 2"
+
+
+async def test_oldest_entries_are_evicted():
+    cache = AsyncTTLCache(ttl=60, max_entries=2)
+
+    async def load_a():
+        return "a"
+
+    for key in ("x", "y", "z"):
+        await cache.get_or_load(key, load_a)
+    assert list(cache._entries) == ["y", "z"]
@@ -10,7 +10,7 @@ import ContextIndicator from './ContextIndicator';
 import ParametersDisplay from './ParametersDisplay';
 import { Message, Session } from '../../types/session';
 import { Parameters } from '../../types/parameters';
-import { streamGenerate } from '../../services/api';
+import { streamGenerate, cancelStream } from '../../services/api';
 import './ChatInterface.css';
 
 interface ChatInterfaceProps {
@@ -38,6 +38,7 @@ export default function ChatInterface({
 }: ChatInterfaceProps) {
   const [isGenerating, setIsGenerating] = useState(false);
   const [streamingMessage, setStreamingMessage] = useState('');
+  const streamIdRef = useRef<string | null>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
   const scrollToBottom = () => {
@@ -63,14 +64,19 @@ export default function ChatInterface({
         const response = await streamGenerate({
           model: currentSession.model_name,
           endpoint_type: currentSession.endpoint_type,
-          messages: [
-            ...messages.map(m => ({ role: m.role, content: m.content })),
-            { role: 'user', content }
-          ],
+          // History is rebuilt server-side from the stored session
+          messages: [{ role: 'user', content }],
           parameters,
           session_id: currentSession.id,
+          server_context: true,
         });
 
+        if (response.status === 429) {
+          alert('The model is busy right now. Please try again in a moment.');
+          return;
+        }
+
+        streamIdRef.current = response.headers.get('X-Stream-Id');
         const reader = response.body?.getReader();
         const decoder = new TextDecoder();
         let fullMessage = '';
@@ -86,7 +92,9 @@ export default function ChatInterface({
             for (const line of lines) {
               try {
                 const data = JSON.parse(line);
-                if (data.message?.content) {
+                if (data.status === 'queued') {
+                  setStreamingMessage(`Waiting for the model (position ${data.queue_position} in queue)...`);
+                } else if (data.message?.content) {
                   fullMessage += data.message.content;
                   setStreamingMessage(fullMessage);
                 } else if (data.response) {
@@ -109,11 +117,23 @@ export default function ChatInterface({
       console.error('Failed to generate response:', error);
       alert('Failed to generate response. Please try again.');
     } finally {
+      streamIdRef.current = null;
       setIsGenerating(false);
       setStreamingMessage('');
     }
   };
 
+  const handleStop = async () => {
+    // The backend stops the model and saves the partial reply
+    if (streamIdRef.current) {
+      try {
+        await cancelStream(streamIdRef.current);
+      } catch (error) {
+        console.error('Failed to stop generation:', error);
+      }
+    }
+  };
+
   return (
     <Container fluid className="chat-interface h-100 d-flex flex-column">
       <Row className="flex-shrink-0">
@@ -163,6 +183,7 @@ export default function ChatInterface({
             <Col>
               <InputArea
                 onSendMessage={handleSendMessage}
+                onStop={handleStop}
                 disabled={isGenerating}
                 placeholder={isGenerating ? 'Generating...' : 'Type your message...'}
               />
@@ -7,11 +7,12 @@ import './InputArea.css';
 
 interface InputAreaProps {
   onSendMessage: (content: string) => void;
+  onStop?: () => void;
   disabled?: boolean;
   placeholder?: string;
 }
 
-export default function InputArea({ onSendMessage, disabled, placeholder }: InputAreaProps) {
+export default function InputArea({ onSendMessage, onStop, disabled, placeholder }: InputAreaProps) {
   const [message, setMessage] = useState('');
 
   const handleSend = () => {
@@ -41,14 +42,20 @@ export default function InputArea({ onSendMessage, disabled, placeholder }: Inpu
           disabled={disabled}
           className="resize-none"
         />
-        <Button
-          variant="primary"
-          onClick={handleSend}
-          disabled={disabled || !message.trim()}
-          className="px-4"
-        >
-          {disabled ? 'Sending...' : 'Send'}
-        </Button>
+        {disabled && onStop ? (
+          <Button variant="outline-danger" onClick={onStop} className="px-4">
+            Stop
+          </Button>
+        ) : (
+          <Button
+            variant="primary"
+            onClick={handleSend}
+            disabled={disabled || !message.trim()}
+            className="px-4"
+          >
+            {disabled ? 'Sending...' : 'Send'}
+          </Button>
+        )}
       </InputGroup>
     </div>
   );
@@ -29,6 +29,7 @@ export default function Message({ message, isStreaming }: MessageProps) {
               {' · '}
               {formatTime(message.timestamp)}
               {isStreaming && ' · Generating...'}
+              {message.truncated && ' · Stopped'}
             </small>
           </div>
           <Card 
@@ -1,9 +1,9 @@
 /**
  * Model management component for downloading new Ollama models.
  */
-import { useState } from 'react';
+import { useEffect, useState } from 'react';
 import { Modal, Button, Form, ProgressBar, Alert, ListGroup, Badge, Tabs, Tab } from 'react-bootstrap';
-import { downloadModel } from '../../services/api';
+import { downloadModel, getDownloads } from '../../services/api';
 import './ModelManager.css';
 
 interface ModelManagerProps {
@@ -173,6 +173,22 @@ export default function ModelManager({ show, onHide, onModelDownloaded }: ModelM
     }
   };
 
+  // Downloads run on the server; pick up one still running after a page reload
+  useEffect(() => {
+    if (!show || downloading) return;
+    getDownloads()
+      .then((jobs) => {
+        const running = Object.entries(jobs).find(
+          ([, job]) => job.state === 'running' || job.state === 'queued'
+        );
+        if (running) {
+          handleDownload(running[0]);
+        }
+      })
+      .catch(() => {});
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [show]);
+
   const handleClose = () => {
     if (!downloading) {
       setCustomModelName('');
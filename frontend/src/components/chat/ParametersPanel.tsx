@@ -156,6 +156,24 @@ export default function ParametersPanel({
                     </Form.Text>
                   </Form.Group>
 
+                  {/* Keep Alive */}
+                  <Form.Group className="mb-3">
+                    <Form.Label>Keep Model Loaded (keep_alive)</Form.Label>
+                    <Form.Select
+                      value={parameters.keep_alive ?? ''}
+                      onChange={(e) => handleChange('keep_alive', e.target.value || undefined)}
+                    >
+                      <option value="">Server default</option>
+                      <option value="5m">5 minutes</option>
+                      <option value="30m">30 minutes</option>
+                      <option value="2h">2 hours</option>
+                      <option value="-1">Until unloaded</option>
+                    </Form.Select>
+                    <Form.Text className="text-muted">
+                      How long the model stays in memory after a reply
+                    </Form.Text>
+                  </Form.Group>
+
                   {/* Mirostat */}
                   <Form.Group className="mb-3">
                     <Form.Label>Mirostat</Form.Label>
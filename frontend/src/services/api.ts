@@ -55,6 +55,11 @@ export const downloadModel = async (modelName: string): Promise<Response> => {
   return response;
 };
 
+export const getDownloads = async (): Promise<Record<string, { state: string }>> => {
+  const response = await apiClient.get('/models/downloads');
+  return response.data;
+};
+
 export const deleteModel = async (modelName: string): Promise<void> => {
   await apiClient.delete(`/models/${modelName}`);
 };
@@ -70,9 +75,17 @@ export const createSession = async (data: CreateSessionRequest): Promise<Session
   return response.data;
 };
 
-export const getSession = async (id: string, contextSize?: number): Promise<SessionDetail> => {
+export const getSession = async (
+  id: string,
+  contextSize?: number,
+  cursor?: { before?: string; after?: string }
+): Promise<SessionDetail> => {
   const response = await apiClient.get(`/sessions/${id}`, {
-    params: contextSize ? { context_size: contextSize } : {},
+    params: {
+      ...(contextSize ? { context_size: contextSize } : {}),
+      ...(cursor?.before ? { before: cursor.before } : {}),
+      ...(cursor?.after ? { after: cursor.after } : {}),
+    },
   });
   return response.data;
 };
@@ -119,6 +132,10 @@ export const streamGenerate = async (request: GenerateRequest): Promise<Response
   return response;
 };
 
+export const cancelStream = async (streamId: string): Promise<void> => {
+  await apiClient.post(`/chat/${streamId}/cancel`);
+};
+
 // Export API
 export const exportSessionToPDF = async (sessionId: string): Promise<Blob> => {
   const response = await apiClient.post(
@@ -16,6 +16,7 @@ export interface Parameters {
   mirostat_tau: number;
   mirostat_eta: number;
   num_thread: number;
+  keep_alive?: number | string;
 }
 
 export interface ParameterPreset {
@@ -34,4 +35,6 @@ export interface GenerateRequest {
   }>;
   parameters: Parameters;
   session_id?: string;
+  server_context?: boolean;
+  context_size?: number;
 }
@@ -8,6 +8,7 @@ export interface Message {
   content: string;
   timestamp: string;
   parameters?: Record<string, any>;
+  truncated?: boolean;
 }
 
 export interface Session {
@@ -22,6 +23,7 @@ export interface Session {
 
 export interface SessionDetail extends Session {
   messages: Message[];
+  has_more: boolean;
 }
 
 export interface CreateSessionRequest {